@@ -5,16 +5,21 @@ Adam Ferencz
 VUT FIT 2022
 """
 
-import cv2
 from utils import *
 from abc import ABC, abstractmethod
 
+from PhotoQueue import PhotoQueue
+from TelemetryFetcher import TelemetryFetcher
+
 
 class AbstractDroneModel(ABC):
     """Abstract model of drone class. Used as a drone interface.
     
     The word drone in this class context can mean drone in the simulator or real drone.
 
+    Background threads need optional hooks, which a model implements when it supports them:
+    ``fetch_state(client)`` for ``start_telemetry``, ``fetch_frame(client)`` for ``start_video``
+    and ``fetch_photo(client)`` for ``start_photos``.
 
     """
 
@@ -44,6 +49,20 @@ class AbstractDroneModel(ABC):
 
         self.log_folder = "logs/general_log"
 
+        # Background fetching of the state, see ``start_telemetry``.
+        self.telemetry = None
+        self.telemetry_sequence = 0
+        # Position is extrapolated by the speed from the time of the snapshot to the update.
+        self.extrapolate = True
+        self.state_timestamp = None
+        self.state_age = 0
+
+        # Background capture of the camera video, see ``start_video``.
+        self.video = None
+
+        # Photos are fetched and saved by worker threads, see ``start_photos``.
+        self.photos = None
+
     @abstractmethod
     def connect(self):
         """Connect to the external simulator program or real drone."""
@@ -101,6 +120,98 @@ class AbstractDroneModel(ABC):
         """
         pass
 
+    def implements(self, hook):
+        """Checks whether the model implements the optional hook, e.g. ``fetch_state``.
+
+        :param hook: name of the method
+
+        """
+        return callable(getattr(self, hook, None))
+
+    def require(self, hook):
+        """Raises RuntimeError when the model does not implement the hook used by a background thread.
+
+        :param hook: name of the method
+
+        """
+        if not self.implements(hook):
+            raise RuntimeError("{} does not implement {}".format(type(self).__name__, hook))
+
+    def start_telemetry(self, rate=100):
+        """Starts background fetching of the state, ``update`` then reads the latest snapshot without blocking.
+
+        :param rate: maximal number of fetches per second (Default value = 100)
+
+        """
+        self.require('fetch_state')
+        self.telemetry = TelemetryFetcher(self.connect_telemetry, self.fetch_state, rate)
+        self.telemetry.start()
+
+    def stop_telemetry(self):
+        """Stops background fetching of the state, ``update`` fetches the state itself again."""
+        if self.telemetry is not None:
+            self.telemetry.stop()
+            self.telemetry = None
+
+    def connect_telemetry(self):
+        """Creates connection used by the telemetry thread."""
+        return self.client
+
+    def start_video(self, rate=30):
+        """Starts background capture of the camera video, ``display_video`` then draws the latest frame.
+
+        :param rate: maximal number of frames per second (Default value = 30)
+
+        """
+        self.require('fetch_frame')
+        # Imported here, headless models never load the pygame based video capture.
+        from VideoCapture import VideoCapture
+        self.video = VideoCapture(self.connect_telemetry, self.fetch_frame, rate)
+        self.video.start()
+
+    def stop_video(self):
+        """Stops background capture of the camera video."""
+        if self.video is not None:
+            self.video.stop()
+            self.video = None
+
+    def start_photos(self, workers=2, capacity=16):
+        """Starts workers which fetch and save the photos requested by ``take_photo``.
+
+        :param workers: number of worker threads (Default value = 2)
+        :param capacity: maximal number of waiting photos (Default value = 16)
+
+        """
+        self.require('fetch_photo')
+        self.photos = PhotoQueue(self.connect_telemetry, self.fetch_photo, workers, capacity)
+
+    def stop_photos(self):
+        """Saves the waiting photos and stops the workers."""
+        if self.photos is not None:
+            self.photos.stop()
+            self.photos = None
+
+    def get_pose(self):
+        """Gets position, orientation and GPS of the drone as dict, used to tag the photos."""
+        latitude = self.GPS.latitude if self.GPS is not None else 0
+        longitude = self.GPS.longitude if self.GPS is not None else 0
+        altitude = self.GPS.altitude if self.GPS is not None else 0
+        return {
+            'x': self.position[0], 'y': self.position[1], 'z': self.position[2],
+            'yaw': self.yaw, 'pitch': self.pitch, 'roll': self.roll,
+            'latitude': latitude, 'longitude': longitude, 'altitude': altitude,
+        }
+
+    def extrapolate_position(self, now):
+        """Moves position by the speed from the time of the state snapshot to ``now``.
+
+        :param now: time.perf_counter() of the update
+
+        """
+        self.state_age = now - self.state_timestamp
+        if self.extrapolate:
+            self.position = self.position + self.speed * self.state_age
+
     @abstractmethod
     def move(self, command, delta_time):
         """Send move command to the drone.
@@ -9,10 +9,11 @@ import airsim
 from airsim import *
 
 from AbstractDroneModel import AbstractDroneModel
+from RpcMonitor import RpcMonitor
+from VideoCapture import VideoCapture
 from utils import *
-import cv2
 import numpy as np
-from datetime import datetime
+import time
 
 
 class AirSimDroneModel(AbstractDroneModel):
@@ -25,22 +26,46 @@ class AirSimDroneModel(AbstractDroneModel):
 
     """
 
-    def __init__(self, surface, transformer):
+    def __init__(self, surface, transformer, ip="", port=41451):
+        """
+        :param surface: pygame surface for drawing
+        :param transformer: object ``Transformer``
+        :param ip: address of the simulator, empty for localhost (Default value = "")
+        :param port: RPC port of the simulator (Default value = 41451)
+
+        """
         AbstractDroneModel.__init__(self, surface, transformer)
 
+        self.ip = ip
+        self.port = port
+
         self.joystick_mapping = 5
         self.getTicksLastFrame = 0
         self.home = None
+        self.home_geo_point = None
+
+        # Number of state updates, for RPC calls per tick.
+        self.updates = 0
+
+        # Velocity command lasts this long (seconds) beyond two control steps, so it does not expire
+        # and the drone does not stop to hover when rendering delays the next step.
+        self.command_margin = 0.1
+
+        # Uncompressed scene frames for the video, surface is reused between frames.
+        self.video_request = [airsim.ImageRequest("0", airsim.ImageType.Scene, False, False)]
+        self.video_surface = None
 
     def connect(self):
         """Connect to the external simulator program or real drone."""
-        self.client = airsim.MultirotorClient()
+        self.client = RpcMonitor(airsim.MultirotorClient(self.ip, self.port))
         self.client.confirmConnection()
         self.client.enableApiControl(True)
         self.client.armDisarm(True)
 
-        lat = self.client.getHomeGeoPoint().latitude
-        lon = self.client.getHomeGeoPoint().longitude
+        # Home does not change during the flight, it is fetched just once.
+        self.home_geo_point = self.client.getHomeGeoPoint()
+        lat = self.home_geo_point.latitude
+        lon = self.home_geo_point.longitude
         self.home = [lat, lon]
         self.transform.center_latlon = [lat, lon]
 
@@ -50,7 +75,7 @@ class AirSimDroneModel(AbstractDroneModel):
         self.in_air = True
 
     def land(self):
-        """Sends command to land the drone."""
+        """Sends command to land the drone, waiting photos are saved by the workers on exit (``stop_photos``)."""
         self.client.landAsync(timeout_sec=5).join()
 
     def map_joystick_to_speed(self, joystick):
@@ -73,31 +98,56 @@ class AirSimDroneModel(AbstractDroneModel):
 
         return left_right, fwd_back, up_down, yaw * 10
 
+    def fetch_frame(self, client):
+        """Fetches uncompressed frame from the drone camera.
+
+        Returns np array (height, width, 3) of uint8 BGR pixels viewing the received buffer, None without frame.
+
+        :param client: client of the simulator
+
+        """
+        response = client.simGetImages(self.video_request)[0]
+        if response.width == 0 or response.height == 0:
+            return None
+        return np.frombuffer(response.image_data_uint8, np.uint8).reshape(response.height, response.width, 3)
+
     def display_video(self):
-        """Displays video from the drone camera to the GUI."""
-        result = self.client.simGetImage("0", airsim.ImageType.Scene)
-        rawImage = np.fromstring(result, np.int8)
-        frame = cv2.imdecode(rawImage, cv2.IMREAD_UNCHANGED)
+        """Displays video from the drone camera to the GUI.
+
+        With video capture running, the latest frame captured in the background is drawn.
+        Otherwise the frame is fetched now and copied just once, straight from the received
+        buffer to the reused surface.
 
-        # Source: https://gist.github.com/radames/1e7c794842755683162b
-        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        frame = frame.swapaxes(0, 1)
-        frame = pygame.surfarray.make_surface(frame)
-        self.surface.blit(frame, (10, 350))
+        """
+        if self.video is not None:
+            self.video.draw(self.surface, (10, 350))
+            return
+
+        frame = self.fetch_frame(self.client)
+        if frame is None:
+            return
+        self.video_surface = VideoCapture.to_surface(frame, self.video_surface)
+        self.surface.blit(self.video_surface, (10, 350))
 
     def take_photo(self):
-        """Saves actual frame from drone camera as png image file to ``self.log_folder`` path."""
-        result = self.client.simGetImage("0", airsim.ImageType.Scene)
-        rawImage = np.fromstring(result, np.int8)
-        png = cv2.imdecode(rawImage, cv2.IMREAD_UNCHANGED)
+        """Requests photo from drone camera, it is saved as png image file to ``self.log_folder`` path.
+
+        The photo is fetched and saved by the photo workers, the pose of the drone is taken now.
+
+        """
+        if self.photos is None:
+            self.start_photos()
+        name = self.photos.submit(self.log_folder + "/photos", self.get_pose())
+        if name is None:
+            print("photo dropped, queue is full")
 
-        now = datetime.now()
-        dt_string = now.strftime("%d-%m-%Y_%H-%M-%S")
-        print("date and time =", dt_string)
+    def fetch_photo(self, client):
+        """Fetches photo from drone camera, PNG bytes are saved without decoding.
 
-        path = self.log_folder + "/photos/" + dt_string + ".png"
-        print("path =", path)
-        cv2.imwrite(path, png)
+        :param client: client of the simulator
+
+        """
+        return client.simGetImage("0", airsim.ImageType.Scene)
 
     def update(self):
         """Get info about drone. Update it.
@@ -107,9 +157,47 @@ class AirSimDroneModel(AbstractDroneModel):
         ``self.yaw``, ``self.speed``, ``self.acceleration``,
         ``self.position``, ``self.GPS``
 
+        Everything is taken from one state snapshot, so there is one RPC call per update.
+        With telemetry running, the latest snapshot fetched in the background is used
+        instead and nothing blocks.
 
         """
-        state = self.client.getMultirotorState()
+        if self.telemetry is not None:
+            state, timestamp, sequence = self.telemetry.latest()
+            if state is None:
+                return
+            self.telemetry_sequence = sequence
+        else:
+            start = time.perf_counter()
+            state = self.fetch_state(self.client)
+            timestamp = (start + time.perf_counter()) / 2
+        self.updates += 1
+        self.apply_state(state, timestamp)
+        if self.telemetry is not None:
+            self.extrapolate_position(time.perf_counter())
+
+    def connect_telemetry(self):
+        """Creates own client for the telemetry or video thread, clients are not shared between threads."""
+        client = RpcMonitor(airsim.MultirotorClient(self.ip, self.port))
+        client.confirmConnection()
+        return client
+
+    def fetch_state(self, client):
+        """Fetches state snapshot of the drone, one RPC call.
+
+        :param client: client of the simulator
+
+        """
+        return client.getMultirotorState()
+
+    def apply_state(self, state, timestamp):
+        """Updates drone properties from the state snapshot.
+
+        :param state: ``airsim.MultirotorState``
+        :param timestamp: time.perf_counter() of the snapshot
+
+        """
+        self.state_timestamp = timestamp
         q = state.kinematics_estimated.orientation
         r, p, y = to_eularian_angles(q)
         self.yaw = np.rad2deg(y)
@@ -122,23 +210,23 @@ class AirSimDroneModel(AbstractDroneModel):
         lat = state.gps_location.latitude
         lon = state.gps_location.longitude
         x, y = self.transform.convert_latlon_metres_yx((lat, lon))
-        z = state.gps_location.altitude - self.client.getHomeGeoPoint().altitude
+        z = state.gps_location.altitude - self.home_geo_point.altitude
         self.position = np.array([x, y, z])
 
-        self.GPS = self.client.getMultirotorState().gps_location
+        self.GPS = state.gps_location
 
     def move(self, command, delta_time):
-        """
+        """Sends velocity command lasting twice the time between control steps plus ``command_margin``.
 
-        :param command: param delta_time:
-        :param delta_time: 
+        :param command: list of 4 floats [x_speed, y_speed, z_speed, yaw]
+        :param delta_time: time from the previous control step in seconds
 
         """
         if self.in_air:
             left_right, fwd_back, up_down, yaw = command
             command_ned = self.transform.utm2ned([left_right, fwd_back, up_down])
             vx, vy, vz = map_vec3_to_float_list(command_ned)
-            duration = delta_time * 2
+            duration = delta_time * 2 + self.command_margin
             self.client.moveByVelocityAsync(vx, vy, vz, duration, yaw_mode={'is_rate': True, 'yaw_or_rate': yaw})
 
     def plot_to_airsim(self, path, mouse):
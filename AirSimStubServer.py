@@ -0,0 +1,334 @@
+"""
+Local stand-in of the AirSim RPC server, serves the calls used by ``AirSimDroneModel``.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import math
+import random
+import threading
+import time
+
+import cv2
+import msgpack
+import msgpackrpc
+import numpy as np
+from msgpackrpc.server import AsyncResult
+from msgpackrpc.transport import tcp
+
+# Metres per degree of latitude, used for the flat approximation of the GPS.
+METRES_PER_DEGREE = 111320.0
+
+
+class BinaryServerSocket(tcp.ServerSocket):
+    """Connection which packs bytes as msgpack bin type as AirSim does, images would be decoded as str otherwise."""
+
+    def __init__(self, stream, transport, encodings):
+        tcp.ServerSocket.__init__(self, stream, transport, encodings)
+        self._packer = msgpack.Packer(encoding=encodings[0], use_bin_type=True, default=lambda x: x.to_msgpack())
+
+
+class BinaryMessagePackServer(tcp.MessagePackServer):
+    def handle_stream(self, stream, address):
+        BinaryServerSocket(stream, self._transport, self._encodings)
+
+
+class BinaryServerTransport(tcp.ServerTransport):
+    def listen(self, server):
+        self._server = server
+        self._mp_server = BinaryMessagePackServer(self, io_loop=self._server._loop._ioloop, encodings=self._encodings)
+        self._mp_server.listen(self._address.port, self._address.host)
+
+
+class binary_tcp:
+    """Transport builder of ``msgpackrpc.Server`` with ``BinaryServerTransport``."""
+    ServerTransport = BinaryServerTransport
+
+
+class AirSimStubServer:
+    """
+    Handler of the msgpack-RPC calls of ``airsim.MultirotorClient``.
+
+    Implements the endpoints used by ``AirSimDroneModel``: connection, arming, takeoff,
+    landing, state, velocity commands, camera images (PNG or raw) and plotting. Payloads have the
+    same structure as in AirSim. The drone is a point whose NED velocity follows the
+    last velocity command with a first-order response, images are a fixed frame.
+    Every response can be delayed by ``latency`` with random ``jitter``; delayed
+    responses do not block the server, so more clients are served concurrently.
+    """
+
+    def __init__(self, home=(49.2267, 16.5970, 230.0), latency=0.0, jitter=0.0, image_size=(256, 144),
+                 response_time=0.8, seed=None):
+        """
+        :param home: tuple (latitude, longitude, altitude) of the home point (Default value = (49.2267, 16.5970, 230.0))
+        :param latency: delay of every response in seconds (Default value = 0.0)
+        :param jitter: maximal random addition to the delay in seconds (Default value = 0.0)
+        :param image_size: tuple (width, height) of the camera images (Default value = (256, 144))
+        :param response_time: time constant of the velocity response in seconds (Default value = 0.8)
+        :param seed: seed of the jitter and of the image (Default value = None)
+
+        """
+        self.home = home
+        self.latency = latency
+        self.jitter = jitter
+        self.response_time = response_time
+        self.random = random.Random(seed)
+
+        # State of the drone in NED metres from home.
+        self.position = np.zeros(3)
+        self.velocity = np.zeros(3)
+        self.yaw = 0.0
+        self.command = np.zeros(3)
+        self.yaw_rate = 0.0
+        self.command_end = 0.0
+        self.last_step = time.perf_counter()
+        self.landed = True
+        self.api_control = False
+        self.armed = False
+
+        # Camera frame in BGR as in AirSim, raw and compressed once.
+        width, height = image_size
+        rng = np.random.default_rng(seed)
+        self.frame = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+        self.raw = self.frame.tobytes()
+        self.png = cv2.imencode('.png', self.frame)[1].tobytes()
+
+        # Method name -> number of calls.
+        self.calls = {}
+
+        self.server = None
+        self.thread = None
+        self.ready = threading.Event()
+
+    # Serving.
+
+    def serve(self, ip='127.0.0.1', port=41451):
+        """
+        Serves the calls until ``stop``, blocks.
+
+        :param ip: address to listen on (Default value = '127.0.0.1')
+        :param port: port to listen on, AirSim uses 41451 (Default value = 41451)
+
+        """
+        self.server = msgpackrpc.Server(self, builder=binary_tcp, pack_encoding='utf-8',
+                                        unpack_encoding='utf-8')
+        self.server.listen(msgpackrpc.Address(ip, port))
+        self.ready.set()
+        self.server.start()
+        self.server.close()
+
+    def start(self, ip='127.0.0.1', port=41451):
+        """
+        Serves the calls in a daemon thread, returns when the server listens.
+
+        :param ip: address to listen on (Default value = '127.0.0.1')
+        :param port: port to listen on (Default value = 41451)
+
+        """
+        self.ready.clear()
+        self.thread = threading.Thread(target=self.serve, args=(ip, port), name='airsim-stub', daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        """ Stops serving. """
+        if self.server is not None:
+            loop = self.server._loop._ioloop
+            loop.add_callback(loop.stop)
+        if self.thread is not None:
+            self.thread.join(1.0)
+            self.thread = None
+
+    def respond(self, name, value=None):
+        """
+        Counts the call and returns its value, delayed when latency is set.
+
+        :param name: name of the called method
+        :param value: returned value (Default value = None)
+
+        """
+        self.calls[name] = self.calls.get(name, 0) + 1
+        delay = self.latency + (self.random.uniform(0, self.jitter) if self.jitter > 0 else 0)
+        if delay <= 0:
+            return value
+        result = AsyncResult()
+        self.server._loop._ioloop.call_later(delay, result.set_result, value)
+        return result
+
+    # Simulation.
+
+    def step(self):
+        """ Advances the drone to the current time. """
+        now = time.perf_counter()
+        delta_time = now - self.last_step
+        self.last_step = now
+        if self.landed:
+            return
+
+        if now > self.command_end:
+            self.command[:] = 0
+            self.yaw_rate = 0.0
+        response = 1 - math.exp(-delta_time / self.response_time)
+        self.velocity += (self.command - self.velocity) * response
+        self.position += self.velocity * delta_time
+        self.yaw = (self.yaw + self.yaw_rate * delta_time + 180) % 360 - 180
+
+        # Ground, down is positive.
+        if self.position[2] > 0:
+            self.position[2] = 0
+            self.velocity[2] = min(self.velocity[2], 0)
+
+    def geo_point(self):
+        """ Gets GPS of the drone as the AirSim GeoPoint. """
+        latitude, longitude, altitude = self.home
+        north, east, down = self.position
+        return {
+            'latitude': latitude + north / METRES_PER_DEGREE,
+            'longitude': longitude + east / (METRES_PER_DEGREE * math.cos(math.radians(latitude))),
+            'altitude': altitude - down,
+        }
+
+    @staticmethod
+    def vector(values):
+        """
+        Gets the AirSim Vector3r.
+
+        :param values: list of 3 floats
+
+        """
+        return {'x_val': float(values[0]), 'y_val': float(values[1]), 'z_val': float(values[2])}
+
+    def quaternion(self):
+        """ Gets orientation of the drone as the AirSim Quaternionr, just the yaw is set. """
+        half = math.radians(self.yaw) / 2
+        return {'w_val': math.cos(half), 'x_val': 0.0, 'y_val': 0.0, 'z_val': math.sin(half)}
+
+    # Endpoints of the AirSim API.
+
+    def ping(self):
+        return self.respond('ping', True)
+
+    def getServerVersion(self):
+        return self.respond('getServerVersion', 1)
+
+    def getMinRequiredClientVersion(self):
+        return self.respond('getMinRequiredClientVersion', 1)
+
+    def enableApiControl(self, is_enabled, vehicle_name=''):
+        self.api_control = is_enabled
+        return self.respond('enableApiControl')
+
+    def isApiControlEnabled(self, vehicle_name=''):
+        return self.respond('isApiControlEnabled', self.api_control)
+
+    def armDisarm(self, arm, vehicle_name=''):
+        self.armed = arm
+        return self.respond('armDisarm', True)
+
+    def getHomeGeoPoint(self, vehicle_name=''):
+        latitude, longitude, altitude = self.home
+        return self.respond('getHomeGeoPoint', {'latitude': latitude, 'longitude': longitude, 'altitude': altitude})
+
+    def takeoff(self, timeout_sec=20, vehicle_name=''):
+        self.step()
+        self.landed = False
+        self.position[2] = min(self.position[2], -3.0)
+        return self.respond('takeoff', True)
+
+    def land(self, timeout_sec=60, vehicle_name=''):
+        self.step()
+        self.landed = True
+        self.position[2] = 0
+        self.velocity[:] = 0
+        return self.respond('land', True)
+
+    def moveByVelocity(self, vx, vy, vz, duration, drivetrain=0, yaw_mode=None, vehicle_name=''):
+        self.step()
+        self.command = np.array([vx, vy, vz], dtype=float)
+        self.yaw_rate = yaw_mode['yaw_or_rate'] if yaw_mode and yaw_mode.get('is_rate', True) else 0.0
+        self.command_end = self.last_step + duration
+        return self.respond('moveByVelocity', True)
+
+    def getMultirotorState(self, vehicle_name=''):
+        self.step()
+        zero = self.vector((0, 0, 0))
+        timestamp = time.time_ns()
+        state = {
+            'collision': {
+                'has_collided': False, 'normal': zero, 'impact_point': zero, 'position': zero,
+                'penetration_depth': 0.0, 'time_stamp': 0, 'object_name': '', 'object_id': -1,
+            },
+            'kinematics_estimated': {
+                'position': self.vector(self.position),
+                'orientation': self.quaternion(),
+                'linear_velocity': self.vector(self.velocity),
+                'angular_velocity': self.vector((0, 0, math.radians(self.yaw_rate))),
+                'linear_acceleration': zero,
+                'angular_acceleration': zero,
+            },
+            'gps_location': self.geo_point(),
+            'timestamp': timestamp,
+            'landed_state': 0 if self.landed else 1,
+            'rc_data': {
+                'timestamp': 0, 'pitch': 0.0, 'roll': 0.0, 'throttle': 0.0, 'yaw': 0.0,
+                'switch1': 0, 'switch2': 0, 'switch3': 0, 'switch4': 0,
+                'switch5': 0, 'switch6': 0, 'switch7': 0, 'switch8': 0,
+                'is_initialized': False, 'is_valid': False,
+            },
+            'ready': True,
+            'ready_message': '',
+            'can_arm': True,
+        }
+        return self.respond('getMultirotorState', state)
+
+    def simGetImage(self, camera_name, image_type, vehicle_name='', external=False):
+        return self.respond('simGetImage', self.png)
+
+    def simGetImages(self, requests, vehicle_name='', external=False):
+        self.step()
+        height, width, _ = self.frame.shape
+        responses = []
+        for request in requests:
+            responses.append({
+                'image_data_uint8': self.png if request['compress'] else self.raw,
+                'image_data_float': [],
+                'camera_position': self.vector(self.position),
+                'camera_orientation': self.quaternion(),
+                'time_stamp': time.time_ns(),
+                'message': '',
+                'pixels_as_float': False,
+                'compress': request['compress'],
+                'width': width,
+                'height': height,
+                'image_type': request['image_type'],
+            })
+        return self.respond('simGetImages', responses)
+
+    def simPlotLineList(self, points, color_rgba, thickness, duration, is_persistent):
+        return self.respond('simPlotLineList')
+
+    def simPlotPoints(self, points, color_rgba, size, duration, is_persistent):
+        return self.respond('simPlotPoints')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Serves the AirSim calls used by the app without the simulator.')
+    parser.add_argument('--ip', default='127.0.0.1', help='address to listen on')
+    parser.add_argument('--port', type=int, default=41451, help='port to listen on')
+    parser.add_argument('--home', type=float, nargs=3, default=(49.2267, 16.5970, 230.0),
+                        metavar=('LAT', 'LON', 'ALT'), help='home point of the drone')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of every response in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximal random addition to the delay in ms')
+    parser.add_argument('--width', type=int, default=256, help='width of the camera images')
+    parser.add_argument('--height', type=int, default=144, help='height of the camera images')
+    args = parser.parse_args()
+
+    stub = AirSimStubServer(home=tuple(args.home), latency=args.latency / 1000, jitter=args.jitter / 1000,
+                            image_size=(args.width, args.height))
+    print("Serving AirSim stub on {}:{}".format(args.ip, args.port))
+    try:
+        stub.serve(args.ip, args.port)
+    except KeyboardInterrupt:
+        pass
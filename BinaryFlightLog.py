@@ -0,0 +1,137 @@
+"""
+Binary flight log, one .npy file per column with a json header.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from FlightRecorder import LOG_FIELDS, RECORD_FIELDS
+
+# Version of the layout, stored in the header.
+FORMAT_VERSION = 1
+
+# Folder of the binary log inside the folder of the flight.
+LOG_FOLDER = 'log'
+
+
+class BinaryFlightLog:
+    """
+    Flight log stored as float64 columns in .npy files and ``header.json``.
+
+    Columns are the ``RECORD_FIELDS``, the date and time strings of log.csv are derived
+    from the ``timestamp`` column. Every column is opened by ``np.load`` with memory
+    mapping when it is accessed first, so opening is instant and reading costs just
+    the used columns. The header holds number of frames, columns and details of the
+    flight (mission, ranges, gains of the corrector).
+    """
+
+    def __init__(self, folder, mmap_mode='r'):
+        """
+        :param folder: folder of the binary log
+        :param mmap_mode: memory mapping of ``np.load``, None loads columns to memory (Default value = 'r')
+
+        """
+        self.folder = folder
+        self.mmap_mode = mmap_mode
+        with open(os.path.join(folder, 'header.json'), encoding='utf-8') as f:
+            self.header = json.load(f)
+        self.fields = self.header['fields']
+        self.cache = {}
+
+    def __len__(self):
+        return self.header['count']
+
+    def __contains__(self, name):
+        return name in self.fields or name in LOG_FIELDS[:2]
+
+    def __getitem__(self, name):
+        """
+        Gets the column as np array, memory mapped without copy.
+
+        :param name: name of the field
+
+        """
+        if name in self.cache:
+            return self.cache[name]
+        if name in LOG_FIELDS[:2]:
+            # Strings of log.csv, one formatting per distinct second.
+            timestamps = np.floor(self['timestamp'])
+            unique, inverse = np.unique(timestamps, return_inverse=True)
+            fmt = "%d/%m/%Y" if name == 'date' else "%H:%M:%S"
+            strings = np.array([datetime.fromtimestamp(t).strftime(fmt) for t in unique.tolist()])
+            column = strings[inverse]
+        elif name in self.fields:
+            column = np.load(os.path.join(self.folder, name + '.npy'), mmap_mode=self.mmap_mode)
+        else:
+            raise KeyError(name)
+        self.cache[name] = column
+        return column
+
+    @staticmethod
+    def write(folder, columns, header=None):
+        """
+        Writes the binary log.
+
+        :param folder: folder of the binary log, created when missing
+        :param columns: dict of np arrays of the ``RECORD_FIELDS`` with the same length
+        :param header: dict with details of the flight, e.g. mission, free_range, warning_range, gains (Default value = None)
+
+        """
+        os.makedirs(folder, exist_ok=True)
+        fields = list(columns)
+        count = len(columns[fields[0]]) if fields else 0
+        for name in fields:
+            np.save(os.path.join(folder, name + '.npy'), np.asarray(columns[name], dtype=np.float64))
+
+        content = dict(header or {})
+        content.update({'format_version': FORMAT_VERSION, 'count': count, 'fields': fields})
+        with open(os.path.join(folder, 'header.json'), 'w', encoding='utf-8') as f:
+            json.dump(content, f, ensure_ascii=False, indent=4)
+
+    @staticmethod
+    def from_csv(csv_filename, folder, header=None):
+        """
+        Converts log.csv to the binary log.
+
+        Timestamps are made from the date and time strings, so they have resolution of seconds.
+        Numbers are parsed exactly (round trip), so the columns hold the same values as the text.
+
+        :param csv_filename: path to log.csv
+        :param folder: folder of the binary log
+        :param header: dict with details of the flight (Default value = None)
+
+        """
+        df = pd.read_csv(csv_filename, skipinitialspace=True, usecols=LOG_FIELDS, float_precision='round_trip')
+        moments = (df['date'].astype(str) + ' ' + df['fly_time'].astype(str))
+        unique = moments.unique()
+        seconds = {m: datetime.strptime(m, "%d/%m/%Y %H:%M:%S").timestamp() for m in unique}
+
+        columns = {'timestamp': moments.map(seconds).to_numpy(dtype=np.float64)}
+        for name in RECORD_FIELDS[1:]:
+            columns[name] = df[name].to_numpy(dtype=np.float64)
+        content = dict(header or {})
+        content['source'] = os.path.basename(csv_filename)
+        BinaryFlightLog.write(folder, columns, content)
+
+    @staticmethod
+    def load(path, fields=LOG_FIELDS):
+        """
+        Opens the flight log in the folder of the flight, binary when it exists, log.csv otherwise.
+
+        Both results are indexed by the column name, e.g. ``log['d']``.
+
+        :param path: folder of the flight
+        :param fields: columns read from log.csv (Default value = LOG_FIELDS)
+
+        """
+        folder = os.path.join(path, LOG_FOLDER)
+        if os.path.exists(os.path.join(folder, 'header.json')):
+            return BinaryFlightLog(folder)
+        return pd.read_csv(os.path.join(path, 'log.csv'), skipinitialspace=True, usecols=fields)
@@ -6,15 +6,32 @@ Adam Ferencz
 VUT FIT 2022
 """
 
-from distances import *
+from collections import namedtuple
+
+from CorrectorRenderer import CorrectorRenderer
+from segments import SegmentGeometry
+from SegmentGrid import SegmentGrid
+from SegmentTracker import SegmentTracker
 from utils import *
 
+# Lightweight record of one correction step, drawn by ``CorrectorRenderer``.
+CorrectionVisualisation = namedtuple('CorrectionVisualisation', [
+    'location', 'velocity', 'command_speed', 'save_command_speed',
+    'local_correction_power', 'future_correction_power',
+    'nearest_point', 'nearest_segment', 'future_location', 'future_nearest_point'])
+
 
 class Corrector:
-    """ Control algorithm for correction pilot commands."""
+    """ Control algorithm for correction pilot commands.
+
+    Corrector only computes. When display is None it runs headless, otherwise
+    every step is drawn by ``CorrectorRenderer`` to the display.
+    """
 
     def __init__(self, display, transformer):
         self.display = display
+        self.renderer = CorrectorRenderer(display, transformer) if display is not None else None
+        self.visualisation = None
 
         # Current nearest point.
         self.nearest_point = None
@@ -38,27 +55,50 @@ class Corrector:
         # In free_range correction power is zero.
         self.free_range = 1
 
+        # Outside free_range the power is (dist - center) ** 3 / divisor + offset.
+        self.correction_cubic = (2, 10, 0.5)
+
         # Edge of the safe zone.
         self.warning_range = 2
 
         # Sets time for the predictive correction.
         self.future_time = 2
 
+        # Multi-horizon prediction, e.g. np.linspace(0.25, 3, 8). When None, only future_time is used.
+        self.future_horizons = None
+        # Weights of the horizons, normalized to sum 1 (Default None = uniform).
+        self.future_weights = None
+
         self.command = np.array([0, 0, 0])
         self.safe_command = np.array([0, 0, 0])
 
-    def draw_circle(self, color, metres_xy, size):
+        # Spatial index is used for paths with at least this number of segments.
+        self.segment_grid_threshold = 1000
+        self.segment_grid = None
+        self.segment_grid_path = None
+        self.segment_grid_version = None
+
+        # Tracking of the nearest segment between frames.
+        self.tracking = True
+        self.present_tracker = SegmentTracker()
+        self.future_tracker = SegmentTracker()
+
+        # Precomputed distance field of the fixed path, dropped when the path changes.
+        self.distance_field = None
+        self.distance_field_path = None
+        self.distance_field_version = None
+
+    def use_distance_field(self, field, path):
         """
-        Draw circle in 2D canvas described by 3D coordinates in metres.
+        Sets precomputed distance field used for nearest point queries of the path.
 
-        :param color:
-        :param size: 
-        :param metres_xy: coordinates in metres [x, y]
+        :param field: object ``DistanceField`` baked for the path, or None to disable it
+        :param path: object of ``Path``
 
         """
-        cm_xy = self.transform.metres2cm2D(metres_xy)
-        pixel_xy = self.transform.cm2pixels(cm_xy)
-        pygame.draw.circle(self.display, color, pixel_xy, size)
+        self.distance_field = field
+        self.distance_field_path = path
+        self.distance_field_version = path.segments_version
 
     def get_correction_power(self, dist, free_range=1, attack=50):
         """
@@ -69,13 +109,33 @@ class Corrector:
 
         """
         free_range = self.free_range
+        center, divisor, offset = self.correction_cubic
         if dist < free_range:
             power = 0
         else:
             x = dist
-            power = pow((x - 2), 3) / 10 + 0.5
+            power = pow((x - center), 3) / divisor + offset
         return power
 
+    def adjust_commands(self, locations, velocities, commands, path):
+        """
+        Batch version of ``adjust_command`` with the parameters of this corrector.
+
+        Does not change state of the corrector and draws nothing.
+        See ``adjust_commands_batch``.
+
+        :param locations: np array (M, 3) of positions
+        :param velocities: np array (M, 3) of velocities
+        :param commands: np array (M, 3) of pilot commands
+        :param path: object ``Path``
+
+        """
+        return adjust_commands_batch(locations, velocities, commands, path,
+                                     gain_command=self.gain_command, gain_lc=self.gain_lc, gain_fc=self.gain_fc,
+                                     free_range=self.free_range, correction_cubic=self.correction_cubic,
+                                     future_time=self.future_time,
+                                     future_horizons=self.future_horizons, future_weights=self.future_weights)
+
     def adjust_command(self, location, velocity, command_speed, path):
         """
         Computes state of the system and transforms input command to safe command.
@@ -91,25 +151,32 @@ class Corrector:
 
         """ Get nearest points """
         # Current nearest point.
-        self.nearest_point, self.nearest_point_dist, self.nearest_segment = self.get_nearest_point(location, path)
+        self.nearest_point, self.nearest_point_dist, self.nearest_segment = self.get_nearest_point(
+            location, path, self.present_tracker)
 
-        # Predicted nearest point.
-        future_location = location + self.future_time * np.array(velocity)
-        p, d, s = self.get_nearest_point(future_location, path)
-        self.future_nearest_point, self.future_nearest_point_dist, self.future_nearest_segment = p, d, s
+        if self.future_horizons is None:
+            # Predicted nearest point.
+            future_location = location + self.future_time * np.array(velocity)
+            p, d, s = self.get_nearest_point(future_location, path, self.future_tracker)
+            self.future_nearest_point, self.future_nearest_point_dist, self.future_nearest_segment = p, d, s
 
         """ Estimate correction powers. """
         # Direction.
         local_correction_power = self.nearest_point - location
-        future_correction_power = self.future_nearest_point - future_location
 
         # Magnitude.
         local_correction_mag = self.get_correction_power(self.nearest_point_dist)
-        future_correction_mag = self.get_correction_power(self.future_nearest_point_dist)
 
         # Result.
         local_correction_power = set_mag_vec3(local_correction_power, local_correction_mag)
-        future_correction_power = set_mag_vec3(future_correction_power, future_correction_mag)
+
+        if self.future_horizons is None:
+            future_correction_power = self.future_nearest_point - future_location
+            future_correction_mag = self.get_correction_power(self.future_nearest_point_dist)
+            future_correction_power = set_mag_vec3(future_correction_power, future_correction_mag)
+        else:
+            # Predicted nearest points of all horizons, combined into one correction.
+            future_location, future_correction_power = self.get_future_correction(location, velocity, path)
 
         """ Main calculation """
         # self.gain_command = self.get_command_gain(local_correction_power) # Experimental.
@@ -120,204 +187,222 @@ class Corrector:
 
         save_command_speed = self.gain_command_power + self.gain_present_correction_power + self.gain_future_correction_power
 
-        """ Draw visualisation. """
-
-        # Visualise top-down view 2D.
-        vectors = save_command_speed, command_speed, future_correction_power, local_correction_power, velocity
-        self.visualise_top_down_view(vectors)
-
-        # Visualise vertical difference.
-        self.visualise_vertical_difference(location, velocity, path, vectors)
-
-        # Draw points.
-        self.draw_circle(GRAY, (self.nearest_point[0], self.nearest_point[1]), 3)
-        location_pixel_xy = self.transform.metres2pixels(location)
-        nearest_point_pix = self.transform.metres2pixels(self.nearest_point)
-        pygame.draw.line(self.display, GRAY, location_pixel_xy, nearest_point_pix, 1)
-
-        self.draw_circle(GRAY, (future_location[0], future_location[1]), 5)
-        f_location_pixel_xy = self.transform.metres2pixels(future_location)
-        future_nearest_point_pix = self.transform.metres2pixels(self.future_nearest_point)
-        pygame.draw.line(self.display, GRAY, f_location_pixel_xy, future_nearest_point_pix, 1)
-        self.draw_circle((255, 100, 255), (self.future_nearest_point[0], self.future_nearest_point[1]), 3)
+        """ Store visualisation. """
+        self.visualisation = CorrectionVisualisation(
+            location=location, velocity=velocity, command_speed=command_speed,
+            save_command_speed=save_command_speed,
+            local_correction_power=local_correction_power, future_correction_power=future_correction_power,
+            nearest_point=self.nearest_point, nearest_segment=self.nearest_segment,
+            future_location=future_location, future_nearest_point=self.future_nearest_point)
+        if self.renderer is not None:
+            self.renderer.transform = self.transform
+            self.renderer.draw(self.visualisation, path)
 
         self.safe_command = np.array([save_command_speed[0], save_command_speed[1], save_command_speed[2]])
         return self.safe_command
 
-    def get_nearest_point(self, location, path):
-        """ Gets the nearest point to the whole path.
-
-        :param location: vector 3D [x, y, z] of location of drone
-        :param path: object of ``Path``
-
+    def get_future_correction(self, location, velocity, path):
         """
+        Computes the predictive correction from all look-ahead horizons.
 
-        segments = path.get_segments()
-        nearest_segment = None
-        min_mag = None
-        min_vec = None
-        for seg in segments:
+        Nearest points of all horizons are found in one batched query. Stores the
+        predicted nearest point of the horizon with the strongest correction.
+        Returns its predicted location and the combined correction.
 
-            # Get distance and vector from point to line segment.
-            mag, vec = pnt2line(location, seg[0], seg[1])
+        :param location: position as vector [x, y, z]
+        :param velocity: velocity as vector [x, y, z]
+        :param path: path object
 
-            if min_mag is None or mag < min_mag:
-                min_mag = mag
-                min_vec = vec
-                nearest_segment = seg
+        """
+        horizons = np.asarray(self.future_horizons, dtype=float)
+        future_locations = np.asarray(location, dtype=float) + horizons[:, None] * np.asarray(velocity, dtype=float)
+        dist, nearest, index = self.get_nearest_points(future_locations, path)
+
+        weights = horizon_weights(horizons, self.future_weights)
+        powers = correction_powers(dist, self.free_range, *self.correction_cubic)
+        corrections = set_mag_vec3_batch(nearest - future_locations, powers)
+        corrections *= weights[:, None]
+
+        strongest = int(np.argmax(np.linalg.norm(corrections, axis=1)))
+        starts, ends = path.get_segment_arrays()
+        self.future_nearest_point = nearest[strongest]
+        self.future_nearest_point_dist = dist[strongest]
+        self.future_nearest_segment = np.array([starts[index[strongest]], ends[index[strongest]]])
+        return future_locations[strongest], corrections.sum(axis=0)
+
+    def get_nearest_points(self, locations, path):
+        """
+        Gets the nearest points to the whole path for many locations at once.
 
-        # Draw the nearest point.
-        if min_vec is not None:
-            location_t = self.transform.cm2pixels(location)
-            min_vec_t = self.transform.cm2pixels(min_vec)
-            pygame.draw.line(self.display, (0, 0, 255), (location_t[0], location_t[1]), (min_vec_t[0], min_vec_t[1]))
-            pygame.draw.circle(self.display, (0, 0, 255), (min_vec_t[0], min_vec_t[1]), 5)
+        Returns np arrays of distances (K,), nearest points (K, 3) and segment indexes (K,).
+        Every backend (distance field, grid or scan) answers all locations in one batched query.
+        ``SegmentTracker`` is not used, it follows the drone and the horizons are spread far
+        apart along the velocity.
 
-        return min_vec, min_mag, nearest_segment
+        :param locations: np array (K, 3) of locations
+        :param path: object of ``Path``
 
-    def visualise_top_down_view(self, vectors):
         """
-        Draws visualization of 2D part of correction vectors.
+        starts, ends = path.get_segment_arrays()
+        if self.distance_field is not None and self.distance_field_path is path \
+                and self.distance_field_version == path.segments_version:
+            return self.distance_field.query_batch(locations)
+        if len(starts) >= self.segment_grid_threshold:
+            return self.get_segment_grid(path).query_batch(locations)
+        return path.get_segment_geometry().nearest_batch(locations)
+
+    def get_nearest_point(self, location, path, tracker=None):
+        """ Gets the nearest point to the whole path.
 
-        :param vectors: list of vectors
+        :param location: vector 3D [x, y, z] of location of drone
+        :param path: object of ``Path``
+        :param tracker: object ``SegmentTracker`` used when ``self.tracking`` is on (Default value = None)
 
         """
-        save_command_speed, command_speed, future_correction, correction_vector, velocity = vectors
-        starting_point = (650, 500)
-        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 5)
-        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 100, width=2)
-        self.visualise_vector_2D(starting_point, save_command_speed, (0, 0, 255), "save_command_speed", scale=5)
-        self.visualise_vector_2D(starting_point, command_speed, (255, 0, 255), "command_speed", scale=5)
-        self.visualise_vector_2D(starting_point, future_correction, (255, 200, 0), "FC", scale=5)
-        self.visualise_vector_2D(starting_point, correction_vector, (0, 255, 255), "correction_vector", scale=5)
-        self.visualise_vector_2D(starting_point, velocity, (255, 0, 0), "velocity", scale=50)
-
-    def visualise_vertical_difference(self, location, velocity, path, vectors):
-        """
-        Draws "side view". Displays drone height i comparison to path.
-
-        :param location: drone location vec3
-        :param path: object ``Path``
-        :param velocity: drone speed vec3
-        :param vectors: list of vectors vec3
 
-        """
+        starts, ends = path.get_segment_arrays()
+        if len(starts) == 0:
+            return None, None, None
+
+        if self.distance_field is not None:
+            if self.distance_field_path is path and self.distance_field_version == path.segments_version:
+                # Constant-time lookup in the precomputed field.
+                min_mag, min_vec, index = self.distance_field.query(location)
+                return min_vec, min_mag, np.array([starts[index], ends[index]])
+            self.distance_field = None
+
+        grid = self.get_segment_grid(path) if len(starts) >= self.segment_grid_threshold else None
+        if tracker is not None and self.tracking:
+            # Search around the nearest segment from the previous frame.
+            min_mag, min_vec, index = tracker.query(location, path, grid)
+        elif grid is not None:
+            # Long paths are queried through the spatial index.
+            min_mag, min_vec, index = grid.query(location)
+        else:
+            # All segments are evaluated in one vectorized pass.
+            min_mag, min_vec, index = path.get_segment_geometry().nearest(location)
+        nearest_segment = np.array([starts[index], ends[index]])
 
-        # Get all vectors to visualize.
-        save_command_speed, command_speed, future_correction, correction_vector, velocity = vectors
-
-        # Origin of the "side view" element.
-        sp = (50, 700)  # lower left corner
-
-        # Get extremes of height for current path to set the scale.
-        max_height = 0
-        min_height = 100000000000
-        for wp in path.waypoints:
-            if wp.metres_z > max_height:
-                max_height = wp.metres_z
-            if wp.metres_z < min_height:
-                min_height = wp.metres_z
-
-        # Constants.
-        visual_max_height = 200
-        visual_max_power = 100
-        visual_max_width = 200
-        real_max_height = max_height + 10
-
-        # Create pins for waypoints of the segment.
-        left_x = sp[0]
-        right_x = sp[0] + visual_max_width
-        pygame.draw.rect(self.display, (0, 255, 0),
-                         (left_x, sp[1] - visual_max_height, visual_max_width, visual_max_height), width=1),
-
-        left_height = self.nearest_segment[0][2]
-        right_height = self.nearest_segment[1][2]
-
-        left_y = sp[1] - map_value(left_height, 0, real_max_height, 0, visual_max_height)
-        right_y = sp[1] - map_value(right_height, 0, real_max_height, 0, visual_max_height)
-
-        pygame.draw.circle(self.display, (255, 150, 0), (left_x, left_y), 4)
-        pygame.draw.circle(self.display, (255, 150, 0), (right_x, right_y), 4)
-
-        # Display height info.
-        text(self.display, "{:.2f}".format(left_height), 20,
-             (left_x + 5, left_y + 5))
-        text(self.display, "{:.2f}".format(right_height), 20,
-             (right_x - 30, right_y + 5))
-
-        # Compute position on of nearest point on the segment.
-        # Get distance from left and right, then compute the ratio.
-        dist_from_left = distance(self.nearest_segment[0], self.nearest_point)
-        dist_from_right = distance(self.nearest_segment[1], self.nearest_point)
-
-        # Get visual distance from the left.
-        visual_length = 1
-        visual_dist_from_left = visual_length / (dist_from_left + dist_from_right) * dist_from_left
-
-        # Get exact position of the point on the visualisation of segment.
-        left = np.array([left_x, left_y])
-        right = np.array([right_x, right_y])
-        visual_vertical_vector = right - left
-        visual_vertical_location = left + visual_vertical_vector * visual_dist_from_left
-
-        # Draw segment line and location of the nearest point placed on the segment.
-        color = (255, 0, 0)
-        pygame.draw.line(self.display, color, (left_x, left_y), (right_x, right_y), 5)
-        pygame.draw.circle(self.display, (255, 0, 255), visual_vertical_location, 7)
-
-        # Get visual location of the drone relative to the segment.
-        visual_vertical_location2 = sp[1] - map_value(location[2], 0, real_max_height, 0, visual_max_height)  # *100
-
-        # Draw the drone and connection to the nearest point.
-        pygame.draw.line(self.display, color, visual_vertical_location,
-                         (visual_vertical_location[0], visual_vertical_location2), 5)
-        pygame.draw.circle(self.display, (255, 100, 100), (visual_vertical_location[0], visual_vertical_location2), 7)
-
-        # Display height info.
-        text(self.display, "{:.2f}".format(location[2]), 20,
-             (visual_vertical_location[0] + 5, visual_vertical_location2))
-
-        # Visualise vertical part of vectors used in the method.
-        starting_point = np.array([right_x + 10, visual_vertical_location2])
-        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 5)
-        self.visualise_vector_vertical(starting_point + np.array([10, 0]), save_command_speed, (0, 0, 255),
-                                       "sc")
-        self.visualise_vector_vertical(starting_point + np.array([60, 0]), command_speed, (255, 0, 255),
-                                       "oc")
-        self.visualise_vector_vertical(starting_point + np.array([90, 0]), future_correction, (255, 200, 0), "fc")
-        self.visualise_vector_vertical(starting_point + np.array([120, 0]), correction_vector, (0, 255, 255),
-                                       "pc")
-        self.visualise_vector_vertical(starting_point + np.array([150, 0]), velocity, (255, 0, 0), "v")
-
-    def visualise_vector_2D(self, start, vector, color, text, scale=10):
-        """ Visualises 3D vector ad 2D vector just by [x, y].
-
-        :param start: origin of the vector [x, y, z]
-        :param color: color
-        :param scale: Default value = 1.0) float scale factor
-        :param vector: input vector in metres [x, y, z]
-        :param text: text used for displaying info
+        return min_vec, min_mag, nearest_segment
 
+    def get_segment_grid(self, path):
         """
-        vector = [vector[0] * scale, vector[1] * scale]
-        end = (start[0] + vector[0], start[1] + vector[1])
-        pygame.draw.line(self.display, color, start, end, 5)
-        pygame.draw.circle(self.display, color, (600, 600), 3)
+        Gets spatial index of the path segments, updated only when the path changes.
 
-    def visualise_vector_vertical(self, start, vector_in, color, text):
-        """ Visualises vertical component of 3D vector.
-
-        :param start: origin of the vector [x, y, z]
-        :param color: color
-        :param vector_in: input vector in metres [x, y, z]
-        :param text: text used for displaying info
+        :param path: object of ``Path``
 
         """
-        vector = [0, -vector_in[2] * 10]
-        end = (start[0] + vector[0], start[1] + vector[1])
-        end_plus = (start[0] + vector[0] - 20, start[1] + vector[1] * 1.3)
-        pygame.draw.line(self.display, color, start, end, 20)
-        pygame.draw.circle(self.display, color, (600, 600), 3)
-        font = pygame.font.Font(None, 20)
-        text = font.render(str(text) + " " + str(round(-vector_in[2], 1)), 1, color)
-        self.display.blit(text, end_plus)
+        starts, ends = path.get_segment_arrays()
+        changed = None
+        if self.segment_grid is not None and self.segment_grid_path is path:
+            changed = path.get_changed_segments(self.segment_grid_version)
+
+        if changed is None:
+            self.segment_grid = SegmentGrid(starts, ends)
+        elif len(changed) > 0:
+            changed = np.array(sorted(changed))
+            if not self.segment_grid.update_segments(changed, starts[changed], ends[changed]):
+                self.segment_grid = SegmentGrid(starts, ends)
+        self.segment_grid_path = path
+        self.segment_grid_version = path.segments_version
+        return self.segment_grid
+
+
+
+def horizon_weights(horizons, weights=None):
+    """
+    Gets weights of the look-ahead horizons normalized to sum 1.
+
+    :param horizons: np array (K,) of horizons in seconds
+    :param weights: np array (K,) of weights (Default value = None, uniform)
+
+    """
+    if weights is None:
+        weights = np.ones(len(horizons))
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
+
+def correction_powers(dist, free_range=1, center=2, divisor=10, offset=0.5):
+    """
+    Vectorized version of ``Corrector.get_correction_power``.
+
+    :param dist: np array of distances from the path
+    :param free_range: in free_range correction power is zero (Default value = 1)
+    :param center: center of the cubic (Default value = 2)
+    :param divisor: divisor of the cubic (Default value = 10)
+    :param offset: power at the center (Default value = 0.5)
+
+    """
+    dist = np.asarray(dist, dtype=float)
+    return np.where(dist < free_range, 0.0, (dist - center) ** 3 / divisor + offset)
+
+
+def set_mag_vec3_batch(forces, mags):
+    """
+    Vectorized version of ``set_mag_vec3``, zero vectors stay zero.
+
+    :param forces: np array (M, 3)
+    :param mags: np array (M,) of magnitudes
+
+    """
+    norms = np.linalg.norm(forces, axis=1)
+    scale = np.divide(mags, norms, out=np.zeros_like(norms), where=norms != 0)
+    return forces * scale[:, None]
+
+
+def adjust_commands_batch(locations, velocities, commands, path,
+                          gain_command=1, gain_lc=1, gain_fc=5, free_range=1, correction_cubic=(2, 10, 0.5),
+                          future_time=2, future_horizons=None, future_weights=None):
+    """
+    Transforms many pilot commands to safe commands at once.
+
+    Pure NumPy equivalent of calling ``Corrector.adjust_command`` for every row.
+    Used for replaying and re-scoring whole flight logs.
+
+    Returns tuple of np arrays: safe commands (M, 3), nearest points (M, 3),
+    distances (M,), gain command powers (M, 3), gain present correction powers (M, 3)
+    and gain future correction powers (M, 3).
+
+    :param locations: np array (M, 3) of positions
+    :param velocities: np array (M, 3) of velocities
+    :param commands: np array (M, 3) of pilot commands
+    :param path: object ``Path`` or tuple of np arrays (N, 3) of segment starts and ends
+    :param gain_command: weight of the pilot command (Default value = 1)
+    :param gain_lc: weight of the present correction (Default value = 1)
+    :param gain_fc: weight of the future correction (Default value = 5)
+    :param free_range: in free_range correction power is zero (Default value = 1)
+    :param correction_cubic: (center, divisor, offset) of the correction power (Default value = (2, 10, 0.5))
+    :param future_time: time for the predictive correction in seconds (Default value = 2)
+    :param future_horizons: np array (K,) of look-ahead times, replaces future_time (Default value = None)
+    :param future_weights: np array (K,) of weights of the horizons (Default value = None, uniform)
+
+    """
+    geometry = path.get_segment_geometry() if hasattr(path, 'get_segment_geometry') else SegmentGeometry(*path)
+    locations = np.asarray(locations, dtype=float).reshape(-1, 3)
+    velocities = np.asarray(velocities, dtype=float).reshape(-1, 3)
+    commands = np.asarray(commands, dtype=float).reshape(-1, 3)
+
+    horizons = np.array([future_time] if future_horizons is None else future_horizons, dtype=float)
+    weights = horizon_weights(horizons, future_weights)
+
+    # Current and predicted nearest points of all horizons in one query.
+    future_locations = (locations[:, None, :] + horizons[None, :, None] * velocities[:, None, :]).reshape(-1, 3)
+    dist, nearest, _ = geometry.nearest_batch(np.concatenate((locations, future_locations)))
+    m = len(locations)
+    nearest_points, future_nearest_points = nearest[:m], nearest[m:]
+    nearest_dist, future_nearest_dist = dist[:m], dist[m:]
+
+    local_correction_power = set_mag_vec3_batch(nearest_points - locations,
+                                                correction_powers(nearest_dist, free_range, *correction_cubic))
+    future_correction_power = set_mag_vec3_batch(future_nearest_points - future_locations,
+                                                 correction_powers(future_nearest_dist, free_range, *correction_cubic))
+    future_correction_power = np.einsum('mkj,k->mj', future_correction_power.reshape(m, -1, 3), weights)
+
+    gain_command_power = gain_command * commands
+    gain_present_correction_power = gain_lc * local_correction_power
+    gain_future_correction_power = gain_fc * future_correction_power
+    safe_commands = gain_command_power + gain_present_correction_power + gain_future_correction_power
+
+    return (safe_commands, nearest_points, nearest_dist,
+            gain_command_power, gain_present_correction_power, gain_future_correction_power)
@@ -0,0 +1,228 @@
+"""
+Class for drawing visualisation of the correction algorithm.
+Corrector itself only computes, this class draws its results when a display is attached.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+from utils import *
+from vectors import distance
+
+
+class CorrectorRenderer:
+    """ Draws ``CorrectionVisualisation`` records produced by ``Corrector``."""
+
+    def __init__(self, display, transformer):
+        self.display = display
+
+        # For transformation between systems.
+        self.transform = transformer
+
+    def draw(self, visualisation, path):
+        """
+        Draws the whole visualisation of one correction step.
+
+        :param visualisation: record ``CorrectionVisualisation`` from ``Corrector``
+        :param path: object ``Path``
+
+        """
+        v = visualisation
+
+        # Nearest points.
+        self.draw_nearest_point(v.location, v.nearest_point)
+        self.draw_nearest_point(v.future_location, v.future_nearest_point)
+
+        # Visualise top-down view 2D.
+        vectors = v.save_command_speed, v.command_speed, v.future_correction_power, v.local_correction_power, v.velocity
+        self.visualise_top_down_view(vectors)
+
+        # Visualise vertical difference.
+        self.visualise_vertical_difference(v.location, v.velocity, path, vectors, v.nearest_point, v.nearest_segment)
+
+        # Draw points.
+        self.draw_circle(GRAY, (v.nearest_point[0], v.nearest_point[1]), 3)
+        location_pixel_xy = self.transform.metres2pixels(v.location)
+        nearest_point_pix = self.transform.metres2pixels(v.nearest_point)
+        pygame.draw.line(self.display, GRAY, location_pixel_xy, nearest_point_pix, 1)
+
+        self.draw_circle(GRAY, (v.future_location[0], v.future_location[1]), 5)
+        f_location_pixel_xy = self.transform.metres2pixels(v.future_location)
+        future_nearest_point_pix = self.transform.metres2pixels(v.future_nearest_point)
+        pygame.draw.line(self.display, GRAY, f_location_pixel_xy, future_nearest_point_pix, 1)
+        self.draw_circle((255, 100, 255), (v.future_nearest_point[0], v.future_nearest_point[1]), 3)
+
+    def draw_nearest_point(self, location, nearest_point):
+        """
+        Draws connection of the queried location and its nearest point of the path.
+
+        :param location: vector 3D [x, y, z]
+        :param nearest_point: vector 3D [x, y, z]
+
+        """
+        location_t = self.transform.cm2pixels(location)
+        min_vec_t = self.transform.cm2pixels(nearest_point)
+        pygame.draw.line(self.display, (0, 0, 255), (location_t[0], location_t[1]), (min_vec_t[0], min_vec_t[1]))
+        pygame.draw.circle(self.display, (0, 0, 255), (min_vec_t[0], min_vec_t[1]), 5)
+
+    def draw_circle(self, color, metres_xy, size):
+        """
+        Draw circle in 2D canvas described by 3D coordinates in metres.
+
+        :param color:
+        :param size: 
+        :param metres_xy: coordinates in metres [x, y]
+
+        """
+        cm_xy = self.transform.metres2cm2D(metres_xy)
+        pixel_xy = self.transform.cm2pixels(cm_xy)
+        pygame.draw.circle(self.display, color, pixel_xy, size)
+
+    def visualise_top_down_view(self, vectors):
+        """
+        Draws visualization of 2D part of correction vectors.
+
+        :param vectors: list of vectors
+
+        """
+        save_command_speed, command_speed, future_correction, correction_vector, velocity = vectors
+        starting_point = (650, 500)
+        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 5)
+        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 100, width=2)
+        self.visualise_vector_2D(starting_point, save_command_speed, (0, 0, 255), "save_command_speed", scale=5)
+        self.visualise_vector_2D(starting_point, command_speed, (255, 0, 255), "command_speed", scale=5)
+        self.visualise_vector_2D(starting_point, future_correction, (255, 200, 0), "FC", scale=5)
+        self.visualise_vector_2D(starting_point, correction_vector, (0, 255, 255), "correction_vector", scale=5)
+        self.visualise_vector_2D(starting_point, velocity, (255, 0, 0), "velocity", scale=50)
+
+    def visualise_vertical_difference(self, location, velocity, path, vectors, nearest_point, nearest_segment):
+        """
+        Draws "side view". Displays drone height i comparison to path.
+
+        :param location: drone location vec3
+        :param path: object ``Path``
+        :param velocity: drone speed vec3
+        :param vectors: list of vectors vec3
+        :param nearest_point: the nearest point of the path vec3
+        :param nearest_segment: the nearest segment of the path [start, end]
+
+        """
+
+        # Get all vectors to visualize.
+        save_command_speed, command_speed, future_correction, correction_vector, velocity = vectors
+
+        # Origin of the "side view" element.
+        sp = (50, 700)  # lower left corner
+
+        # Get extremes of height for current path to set the scale.
+        max_height = 0
+        min_height = 100000000000
+        for wp in path.waypoints:
+            if wp.metres_z > max_height:
+                max_height = wp.metres_z
+            if wp.metres_z < min_height:
+                min_height = wp.metres_z
+
+        # Constants.
+        visual_max_height = 200
+        visual_max_power = 100
+        visual_max_width = 200
+        real_max_height = max_height + 10
+
+        # Create pins for waypoints of the segment.
+        left_x = sp[0]
+        right_x = sp[0] + visual_max_width
+        pygame.draw.rect(self.display, (0, 255, 0),
+                         (left_x, sp[1] - visual_max_height, visual_max_width, visual_max_height), width=1),
+
+        left_height = nearest_segment[0][2]
+        right_height = nearest_segment[1][2]
+
+        left_y = sp[1] - map_value(left_height, 0, real_max_height, 0, visual_max_height)
+        right_y = sp[1] - map_value(right_height, 0, real_max_height, 0, visual_max_height)
+
+        pygame.draw.circle(self.display, (255, 150, 0), (left_x, left_y), 4)
+        pygame.draw.circle(self.display, (255, 150, 0), (right_x, right_y), 4)
+
+        # Display height info.
+        text(self.display, "{:.2f}".format(left_height), 20,
+             (left_x + 5, left_y + 5))
+        text(self.display, "{:.2f}".format(right_height), 20,
+             (right_x - 30, right_y + 5))
+
+        # Compute position on of nearest point on the segment.
+        # Get distance from left and right, then compute the ratio.
+        dist_from_left = distance(nearest_segment[0], nearest_point)
+        dist_from_right = distance(nearest_segment[1], nearest_point)
+
+        # Get visual distance from the left.
+        visual_length = 1
+        visual_dist_from_left = visual_length / (dist_from_left + dist_from_right) * dist_from_left
+
+        # Get exact position of the point on the visualisation of segment.
+        left = np.array([left_x, left_y])
+        right = np.array([right_x, right_y])
+        visual_vertical_vector = right - left
+        visual_vertical_location = left + visual_vertical_vector * visual_dist_from_left
+
+        # Draw segment line and location of the nearest point placed on the segment.
+        color = (255, 0, 0)
+        pygame.draw.line(self.display, color, (left_x, left_y), (right_x, right_y), 5)
+        pygame.draw.circle(self.display, (255, 0, 255), visual_vertical_location, 7)
+
+        # Get visual location of the drone relative to the segment.
+        visual_vertical_location2 = sp[1] - map_value(location[2], 0, real_max_height, 0, visual_max_height)  # *100
+
+        # Draw the drone and connection to the nearest point.
+        pygame.draw.line(self.display, color, visual_vertical_location,
+                         (visual_vertical_location[0], visual_vertical_location2), 5)
+        pygame.draw.circle(self.display, (255, 100, 100), (visual_vertical_location[0], visual_vertical_location2), 7)
+
+        # Display height info.
+        text(self.display, "{:.2f}".format(location[2]), 20,
+             (visual_vertical_location[0] + 5, visual_vertical_location2))
+
+        # Visualise vertical part of vectors used in the method.
+        starting_point = np.array([right_x + 10, visual_vertical_location2])
+        pygame.draw.circle(self.display, (0, 0, 255), starting_point, 5)
+        self.visualise_vector_vertical(starting_point + np.array([10, 0]), save_command_speed, (0, 0, 255),
+                                       "sc")
+        self.visualise_vector_vertical(starting_point + np.array([60, 0]), command_speed, (255, 0, 255),
+                                       "oc")
+        self.visualise_vector_vertical(starting_point + np.array([90, 0]), future_correction, (255, 200, 0), "fc")
+        self.visualise_vector_vertical(starting_point + np.array([120, 0]), correction_vector, (0, 255, 255),
+                                       "pc")
+        self.visualise_vector_vertical(starting_point + np.array([150, 0]), velocity, (255, 0, 0), "v")
+
+    def visualise_vector_2D(self, start, vector, color, text, scale=10):
+        """ Visualises 3D vector ad 2D vector just by [x, y].
+
+        :param start: origin of the vector [x, y, z]
+        :param color: color
+        :param scale: Default value = 1.0) float scale factor
+        :param vector: input vector in metres [x, y, z]
+        :param text: text used for displaying info
+
+        """
+        vector = [vector[0] * scale, vector[1] * scale]
+        end = (start[0] + vector[0], start[1] + vector[1])
+        pygame.draw.line(self.display, color, start, end, 5)
+        pygame.draw.circle(self.display, color, (600, 600), 3)
+
+    def visualise_vector_vertical(self, start, vector_in, color, text):
+        """ Visualises vertical component of 3D vector.
+
+        :param start: origin of the vector [x, y, z]
+        :param color: color
+        :param vector_in: input vector in metres [x, y, z]
+        :param text: text used for displaying info
+
+        """
+        vector = [0, -vector_in[2] * 10]
+        end = (start[0] + vector[0], start[1] + vector[1])
+        end_plus = (start[0] + vector[0] - 20, start[1] + vector[1] * 1.3)
+        pygame.draw.line(self.display, color, start, end, 20)
+        pygame.draw.circle(self.display, color, (600, 600), 3)
+        font = pygame.font.Font(None, 20)
+        text = font.render(str(text) + " " + str(round(-vector_in[2], 1)), 1, color)
+        self.display.blit(text, end_plus)
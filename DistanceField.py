@@ -0,0 +1,308 @@
+"""
+Precomputed 3D field of the nearest points around the path.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+import os
+
+import numpy as np
+
+from segments import SegmentGeometry
+from SegmentGrid import SegmentGrid
+
+
+class DistanceField:
+    """
+    Voxel grid baked around the bounding box of a fixed path.
+
+    Every node of the grid stores offset to its nearest point of the path, the distance
+    and the nearest segment. Query is a constant-time trilinear interpolation
+    in the cell around the queried point. Where the nodes of the cell disagree about the
+    nearest segment (near corners of the path), the query is refined on demand by exact
+    computation, which is also used outside of the field.
+    """
+
+    def __init__(self, starts, ends, resolution=0.5, margin=5.0, max_memory_mb=64, bake=True):
+        """
+        :param starts: np array (N, 3) of start points of the segments
+        :param ends: np array (N, 3) of end points of the segments
+        :param resolution: distance of the nodes in metres (Default value = 0.5)
+        :param margin: size of the field around the path in metres (Default value = 5.0)
+        :param max_memory_mb: resolution is lowered to fit the field to this memory (Default value = 64)
+        :param bake: compute the field now (Default value = True)
+
+        """
+        self.geometry = SegmentGeometry(starts, ends)
+        self.starts = self.geometry.starts
+        self.ends = self.geometry.ends
+        # Requested parameters, the cached field is reused only when they are the same.
+        self.parameters = (float(resolution), float(margin), float(max_memory_mb))
+
+        points = np.concatenate((self.starts, self.ends))
+        self.origin = points.min(axis=0) - margin
+        extent = points.max(axis=0) + margin - self.origin
+
+        # Offset (3 x float32), distance (float32) and key (int32) for every node.
+        max_nodes = max_memory_mb * 1024 * 1024 // 20
+        while np.prod(np.ceil(extent / resolution) + 1) > max_nodes:
+            resolution *= 1.25
+        self.resolution = resolution
+        self.shape = (np.ceil(extent / resolution) + 1).astype(int)
+
+        self.offsets = None
+        self.distances = None
+        self.keys = None
+        self.grid = None
+        if bake:
+            self.bake()
+
+    def bake(self, block=8):
+        """
+        Computes the nearest points for all nodes of the field.
+
+        Nodes are processed in blocks. Only segments which can be the nearest for some node
+        of the block are evaluated: the nearest distance of any node is at most the distance
+        of the block center plus the half diagonal h, so segments farther than that plus h
+        from the center are skipped.
+
+        :param block: number of nodes along the edge of the block (Default value = 8)
+
+        """
+        shape = tuple(self.shape)
+        self.offsets = np.empty(shape + (3,), dtype=np.float32)
+        self.distances = np.empty(shape, dtype=np.float32)
+        self.keys = np.empty(shape, dtype=np.int32)
+        half_diagonal = math.sqrt(3) * (block - 1) * self.resolution / 2
+
+        for x in range(0, shape[0], block):
+            for y in range(0, shape[1], block):
+                for z in range(0, shape[2], block):
+                    index = np.s_[x:x + block, y:y + block, z:z + block]
+                    axes = [self.origin[i] + np.arange(c, min(c + block, shape[i])) * self.resolution
+                            for i, c in enumerate((x, y, z))]
+                    grid = np.meshgrid(*axes, indexing='ij')
+                    nodes = np.stack(grid, axis=-1).reshape(-1, 3)
+
+                    center = np.array([(a[0] + a[-1]) / 2 for a in axes])
+                    dist_sq, _ = self.geometry.nearest_all(center)
+                    center_dist = math.sqrt(dist_sq.min())
+                    candidates = np.flatnonzero(dist_sq <= (center_dist + 2 * half_diagonal) ** 2)
+
+                    dist, nearest, segment = self.geometry.nearest_batch(nodes, candidates)
+
+                    # Key tells the nearest segment and whether the nearest point is its start,
+                    # inside or end. Inside one region the nearest point is an affine function of
+                    # the position, so the trilinear interpolation in cells with equal keys is exact.
+                    region = self.geometry.regions(nodes, segment)
+
+                    block_shape = grid[0].shape
+                    self.offsets[index] = (nearest - nodes).reshape(block_shape + (3,))
+                    self.distances[index] = dist.reshape(block_shape)
+                    self.keys[index] = (segment * 3 + region).reshape(block_shape)
+
+    def memory_usage(self):
+        """ Returns size of the baked arrays in bytes. """
+        return self.offsets.nbytes + self.distances.nbytes + self.keys.nbytes
+
+    def query(self, pnt):
+        """
+        Gets the nearest point of the path.
+
+        Returns the shortest distance, the nearest point and the index of the nearest segment.
+
+        :param pnt: free point [x, y, z]
+
+        """
+        pnt = np.asarray(pnt, dtype=float)
+        lx, ly, lz = (pnt - self.origin) / self.resolution
+        x, y, z = math.floor(lx), math.floor(ly), math.floor(lz)
+        nx, ny, nz = self.shape
+        if not (0 <= x < nx - 1 and 0 <= y < ny - 1 and 0 <= z < nz - 1):
+            return self.refine(pnt)
+
+        keys = self.keys[x:x + 2, y:y + 2, z:z + 2]
+        key = keys[0, 0, 0]
+        if (keys == key).all():
+            # Trilinear interpolation of the offset to the nearest point.
+            c = self.offsets[x:x + 2, y:y + 2, z:z + 2]
+            c = c[0] + (c[1] - c[0]) * (lx - x)
+            c = c[0] + (c[1] - c[0]) * (ly - y)
+            offset = c[0] + (c[1] - c[0]) * (lz - z)
+            return math.sqrt(np.dot(offset, offset)), pnt + offset, int(key // 3)
+
+        # Refinement near corners, where nodes of the cell disagree, by exact query.
+        return self.refine(pnt)
+
+    def query_batch(self, pnts):
+        """
+        Gets the nearest points of the path for many points at once, as ``query``.
+
+        Returns np arrays of the shortest distances (K,), the nearest points (K, 3) and the
+        indexes of the nearest segments (K,).
+
+        :param pnts: np array (K, 3) of free points
+
+        """
+        pnts = np.asarray(pnts, dtype=float).reshape(-1, 3)
+        local = (pnts - self.origin) / self.resolution
+        cell = np.floor(local).astype(int)
+        inside = np.flatnonzero(np.all((cell >= 0) & (cell < self.shape - 1), axis=1))
+
+        dist = np.empty(len(pnts))
+        nearest = np.empty((len(pnts), 3))
+        index = np.empty(len(pnts), dtype=int)
+        exact = np.ones(len(pnts), dtype=bool)
+
+        x, y, z = cell[inside].T
+        corners = list(np.ndindex(2, 2, 2))
+        keys = np.stack([self.keys[x + i, y + j, z + k] for i, j, k in corners], axis=1)
+        same = (keys == keys[:, :1]).all(axis=1)
+        interpolated = inside[same]
+        x, y, z = x[same], y[same], z[same]
+
+        # Trilinear interpolation of the offset to the nearest point, corners (2, 2, 2, M, 3).
+        c = np.stack([self.offsets[x + i, y + j, z + k] for i, j, k in corners]).reshape(2, 2, 2, -1, 3)
+        f = local[interpolated] - cell[interpolated]
+        c = c[0] + (c[1] - c[0]) * f[:, 0, None]
+        c = c[0] + (c[1] - c[0]) * f[:, 1, None]
+        offset = c[0] + (c[1] - c[0]) * f[:, 2, None]
+        dist[interpolated] = np.sqrt(np.einsum('ij,ij->i', offset, offset))
+        nearest[interpolated] = pnts[interpolated] + offset
+        index[interpolated] = keys[same, 0] // 3
+        exact[interpolated] = False
+
+        # Refinement outside of the field and near corners of the path.
+        exact = np.flatnonzero(exact)
+        if len(exact) > 0:
+            dist[exact], nearest[exact], index[exact] = self.refine_batch(pnts[exact])
+        return dist, nearest, index
+
+    def refine(self, pnt):
+        """
+        Exact query used outside of the field and in cells near corners of the path.
+
+        :param pnt: free point [x, y, z]
+
+        """
+        if len(self.starts) < 64:
+            return self.geometry.nearest(pnt)
+        if self.grid is None:
+            self.grid = SegmentGrid(self.starts, self.ends)
+        return self.grid.query(pnt)
+
+    def refine_batch(self, pnts):
+        """
+        Exact query of ``refine`` for many points at once.
+
+        :param pnts: np array (K, 3) of free points
+
+        """
+        if len(self.starts) < 64:
+            return self.geometry.nearest_batch(pnts)
+        if self.grid is None:
+            self.grid = SegmentGrid(self.starts, self.ends)
+        return self.grid.query_batch(pnts)
+
+    def distance_at(self, pnt):
+        """
+        Gets approximate distance from the path by trilinear interpolation of the stored distances.
+
+        :param pnt: free point [x, y, z]
+
+        """
+        pnt = np.asarray(pnt, dtype=float)
+        local = (pnt - self.origin) / self.resolution
+        cell = np.floor(local).astype(int)
+        if np.any(cell < 0) or np.any(cell >= self.shape - 1):
+            return self.refine(pnt)[0]
+
+        x, y, z = cell
+        f = local - cell
+        weights = np.einsum('i,j,k->ijk', (1 - f[0], f[0]), (1 - f[1], f[1]), (1 - f[2], f[2]))
+        return float(np.einsum('ijk,ijk->', weights, self.distances[x:x + 2, y:y + 2, z:z + 2]))
+
+    def matches(self, starts, ends, resolution=0.5, margin=5.0, max_memory_mb=64):
+        """
+        Checks whether the field was baked for these segments and parameters.
+
+        :param starts: np array (N, 3) of start points of the segments
+        :param ends: np array (N, 3) of end points of the segments
+        :param resolution: requested distance of the nodes in metres (Default value = 0.5)
+        :param margin: size of the field around the path in metres (Default value = 5.0)
+        :param max_memory_mb: memory limit of the field (Default value = 64)
+
+        """
+        return (self.parameters == (float(resolution), float(margin), float(max_memory_mb))
+                and self.starts.shape == np.shape(starts) and np.array_equal(self.starts, starts)
+                and np.array_equal(self.ends, ends))
+
+    def save(self, filename):
+        """
+        Saves baked field to the npz file.
+
+        :param filename: path to the file
+
+        """
+        np.savez_compressed(filename, starts=self.starts, ends=self.ends, origin=self.origin,
+                            parameters=self.parameters, resolution=self.resolution, shape=self.shape,
+                            offsets=self.offsets, distances=self.distances, keys=self.keys)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Loads baked field from the npz file.
+
+        :param filename: path to the file
+
+        """
+        data = np.load(filename)
+        field = cls.__new__(cls)
+        field.geometry = SegmentGeometry(data['starts'], data['ends'])
+        field.starts = field.geometry.starts
+        field.ends = field.geometry.ends
+        # Fields saved without the parameters never match and are baked again.
+        field.parameters = tuple(data['parameters'].tolist()) if 'parameters' in data.files else None
+        field.origin = data['origin']
+        field.resolution = float(data['resolution'])
+        field.shape = data['shape']
+        field.offsets = data['offsets']
+        field.distances = data['distances']
+        field.keys = data['keys']
+        field.grid = None
+        return field
+
+    @staticmethod
+    def cache_filename(mission_filename):
+        """
+        Gets name of the file with the field stored alongside the mission json.
+
+        :param mission_filename: path to the mission json
+
+        """
+        return os.path.splitext(mission_filename)[0] + '.field.npz'
+
+    @classmethod
+    def for_mission(cls, mission_filename, path, **kwargs):
+        """
+        Loads the field cached alongside the mission, or bakes and caches a new one.
+
+        Cached field is used only when it was baked for the same segments and parameters.
+
+        :param mission_filename: path to the mission json
+        :param path: object ``Path`` loaded from the mission
+        :param kwargs: parameters of the field used when baking
+
+        """
+        starts, ends = path.get_segment_arrays()
+        filename = cls.cache_filename(mission_filename)
+        if os.path.exists(filename):
+            field = cls.load(filename)
+            if field.matches(starts, ends, **kwargs):
+                return field
+
+        field = cls(starts, ends, **kwargs)
+        field.save(filename)
+        return field
@@ -0,0 +1,124 @@
+"""
+Fixed-rate scheduling of periodic work in the main loop.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import json
+import time
+
+import numpy as np
+
+
+class FixedRateScheduler:
+    """
+    Tells how many steps of a periodic task are due, keeping a fixed rate.
+
+    Steps are scheduled on an absolute time grid, so late steps do not shift the
+    following ones (no drift). Lateness of every step against its scheduled time is
+    recorded as jitter. Step which starts a whole period or more after its scheduled
+    time misses its deadline. When the loop falls behind more than ``max_catch_up``
+    steps, the oldest steps are skipped and also counted as missed.
+    """
+
+    def __init__(self, rate, max_catch_up=3, capacity=1024):
+        """
+        :param rate: steps per second
+        :param max_catch_up: maximal number of steps run at once after a delay (Default value = 3)
+        :param capacity: number of last steps kept for jitter statistics (Default value = 1024)
+
+        """
+        self.rate = rate
+        self.period_ns = int(1e9 / rate)
+        self.max_catch_up = max_catch_up
+        self.next_ns = None
+
+        # Statistics.
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.skipped = 0
+        self.lateness = np.zeros(capacity, dtype=np.int64)
+        self.index = 0
+        self.count = 0
+
+    @property
+    def period(self):
+        """ Period of the steps in seconds. """
+        return self.period_ns / 1e9
+
+    def reset(self):
+        """ Starts the schedule again at the next ``due`` call. """
+        self.next_ns = None
+
+    def due(self):
+        """ Gets number of steps which should run now. """
+        now = time.perf_counter_ns()
+        if self.next_ns is None:
+            self.next_ns = now
+        if now < self.next_ns:
+            return 0
+
+        steps = (now - self.next_ns) // self.period_ns + 1
+        if steps > self.max_catch_up:
+            skipped = steps - self.max_catch_up
+            self.skipped += skipped
+            self.missed_deadlines += skipped
+            self.next_ns += skipped * self.period_ns
+            steps = self.max_catch_up
+        return int(steps)
+
+    def tick(self):
+        """ Marks start of the step scheduled as the next one. """
+        lateness = time.perf_counter_ns() - self.next_ns
+        self.lateness[self.index] = lateness
+        self.index = (self.index + 1) % len(self.lateness)
+        self.count = min(self.count + 1, len(self.lateness))
+        if lateness >= self.period_ns:
+            self.missed_deadlines += 1
+
+        self.next_ns += self.period_ns
+        self.ticks += 1
+
+    def time_until_due(self):
+        """ Gets seconds until the next step, zero when it is already due. """
+        if self.next_ns is None:
+            return 0
+        return max(self.next_ns - time.perf_counter_ns(), 0) / 1e9
+
+    def stats(self):
+        """ Gets number of steps, missed deadlines and jitter in milliseconds. """
+        lateness = self.lateness[:self.count] / 1e6
+        p50, p95, p99 = np.percentile(lateness, [50, 95, 99]) if self.count > 0 else (0, 0, 0)
+        return {
+            'rate': self.rate,
+            'ticks': self.ticks,
+            'missed_deadlines': self.missed_deadlines,
+            'skipped': self.skipped,
+            'jitter_p50_ms': float(p50),
+            'jitter_p95_ms': float(p95),
+            'jitter_p99_ms': float(p99),
+            'jitter_max_ms': float(lateness.max()) if self.count > 0 else 0.0,
+        }
+
+    @staticmethod
+    def wait(*schedulers):
+        """
+        Sleeps until the nearest step of the schedulers is due.
+
+        :param schedulers: objects ``FixedRateScheduler``
+
+        """
+        delay = min(scheduler.time_until_due() for scheduler in schedulers)
+        if delay > 0:
+            time.sleep(delay)
+
+    def save(self, filename):
+        """
+        Saves statistics to the json file.
+
+        :param filename: path to the json file
+
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.stats(), f, ensure_ascii=False, indent=4)
@@ -0,0 +1,155 @@
+"""
+Columnar recording of the flight log.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+from datetime import datetime
+
+import numpy as np
+
+# Columns of the flight log (log.csv) in order.
+LOG_FIELDS = ['date', 'fly_time', 'fly_time_s', 'x', 'y', 'z', 'z_max', 'vx', 'vy', 'vz', 'vx_max', 'vy_max', 'vz_max',
+              'latitude', 'longitude', 'altitude', 'pitch', 'roll', 'yaw', 'cx', 'cy', 'cz', 'scx', 'scy', 'scz',
+              'd', 'dx', 'dy', 'dz', 'gc_pow_x', 'gc_pow_y', 'gc_pow_z', 'gpc_pow_x', 'gpc_pow_y', 'gpc_pow_z',
+              'gfc_pow_x', 'gfc_pow_y', 'gfc_pow_z']
+
+# Columns stored as numbers, date and fly_time are formatted from ``timestamp`` when saving.
+RECORD_FIELDS = ['timestamp'] + LOG_FIELDS[2:]
+
+
+def field_slice(first, last, fields=RECORD_FIELDS):
+    """
+    Gets slice of the neighbouring fields from ``first`` to ``last`` included, e.g. x, y, z.
+
+    :param first: name of the first field
+    :param last: name of the last field
+    :param fields: names of the fields (Default value = RECORD_FIELDS)
+
+    """
+    return slice(fields.index(first), fields.index(last) + 1)
+
+
+class FlightRecorder:
+    """
+    Stores frames of the flight log in preallocated float64 columns.
+
+    Memory is allocated in chunks of ``chunk_size`` frames, every chunk is an array
+    (fields, chunk_size), so every field is contiguous within a chunk. Values of a frame
+    are written by the caller (``Logger.update``) straight to the slot of the chunk
+    returned by ``next_frame``, no dict or other object is kept per frame.
+    """
+
+    def __init__(self, fields=RECORD_FIELDS, chunk_size=4096):
+        """
+        :param fields: names of the recorded attributes (Default value = RECORD_FIELDS)
+        :param chunk_size: number of frames in one chunk (Default value = 4096)
+
+        """
+        self.fields = list(fields)
+        self.index = {name: i for i, name in enumerate(self.fields)}
+        self.chunk_size = chunk_size
+
+        self.chunks = []
+        self.chunk = None
+        # Number of frames in the last chunk and in all chunks.
+        self.position = chunk_size
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def clear(self):
+        """ Drops all frames, allocated memory is released. """
+        self.chunks = []
+        self.chunk = None
+        self.position = self.chunk_size
+        self.count = 0
+
+    def next_frame(self):
+        """
+        Appends one frame, returns its slot as np array view (fields,) to be filled by the caller.
+
+        Values of the slot are undefined until they are written.
+        """
+        if self.position == self.chunk_size:
+            self.chunk = np.empty((len(self.fields), self.chunk_size))
+            self.chunks.append(self.chunk)
+            self.position = 0
+        frame = self.chunk[:, self.position]
+        self.position += 1
+        self.count += 1
+        return frame
+
+    def last_frame(self):
+        """ Gets the last frame as np array view (fields,), None without frames. """
+        if self.count == 0:
+            return None
+        return self.chunk[:, self.position - 1]
+
+    def column(self, name):
+        """
+        Gets all recorded values of the field as np array.
+
+        :param name: name of the field
+
+        """
+        i = self.index[name]
+        if not self.chunks:
+            return np.empty(0)
+        parts = [chunk[i] for chunk in self.chunks[:-1]] + [self.chunk[i, :self.position]]
+        return np.concatenate(parts)
+
+    def columns(self):
+        """ Gets all recorded frames as np array (fields, frames). """
+        if not self.chunks:
+            return np.empty((len(self.fields), 0))
+        return np.concatenate(self.chunks[:-1] + [self.chunk[:, :self.position]], axis=1)
+
+    def nbytes(self):
+        """ Gets bytes allocated for the frames. """
+        return sum(chunk.nbytes for chunk in self.chunks)
+
+    def frames(self, start, end):
+        """
+        Gets frames from ``start`` to ``end`` as list of np array views (fields, n), nothing is copied.
+
+        :param start: index of the first frame
+        :param end: index after the last frame
+
+        """
+        views = []
+        if end <= start:
+            return views
+        for i in range(start // self.chunk_size, (end - 1) // self.chunk_size + 1):
+            offset = i * self.chunk_size
+            views.append(self.chunks[i][:, max(start - offset, 0):min(end - offset, self.chunk_size)])
+        return views
+
+    def write_rows(self, writer, values):
+        """
+        Writes frames as rows with ``LOG_FIELDS`` columns.
+
+        :param writer: csv writer
+        :param values: np array (fields, n) of the frames
+
+        """
+        timestamps = values[self.index['timestamp']]
+        rows = values[[self.index[name] for name in LOG_FIELDS[2:]]].T.tolist()
+        for timestamp, row in zip(timestamps.tolist(), rows):
+            now = datetime.fromtimestamp(timestamp)
+            writer.writerow([now.strftime("%d/%m/%Y"), now.strftime("%H:%M:%S")] + row)
+
+    def save_csv(self, filename):
+        """
+        Saves the frames to the csv file with ``LOG_FIELDS`` columns.
+
+        :param filename: path to the csv file
+
+        """
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(LOG_FIELDS)
+            self.write_rows(writer, self.columns())
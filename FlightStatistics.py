@@ -0,0 +1,214 @@
+"""
+Online statistics of the flight, updated with every frame of the log.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+
+
+def make_summary(free_zone, warning_zone, statistics_d, statistics_df, statistics_dw):
+    """
+    Creates summary of the flight, content of summary.json.
+
+    :param free_zone: time in, time out, number of leaving and list of durations out of the free zone
+    :param warning_zone: time in, time out, number of leaving and list of durations out of the warning zone
+        (without zeros)
+    :param statistics_d: minimum, maximum, mean, variance and standard deviation of the distance from the path
+    :param statistics_df: statistics of the distance from the free zone
+    :param statistics_dw: statistics of the distance from the warning zone
+
+    """
+    time_in_free_zone, time_out_free_zone, free_zone_left_count, time_out_free_zone_list = free_zone
+    time_in_warning_zone, time_out_warning_zone, warning_zone_left_count, time_out_warning_zone_list = warning_zone
+    minimum_d, maximum_d, mean_d, variance_d, standard_deviation_d = statistics_d
+    minimum_df, maximum_df, mean_df, variance_df, standard_deviation_df = statistics_df
+    minimum_dw, maximum_dw, mean_dw, variance_dw, standard_deviation_dw = statistics_dw
+
+    summary = {
+        '1': '',
+        '--duration in and out of free_zone--': '--------------------',
+        'time_in_free_zone': time_in_free_zone,
+        'time_out_free_zone': time_out_free_zone,
+        '% time_in_free_zone': time_in_free_zone / (time_out_free_zone + time_in_free_zone) * 100,
+        '% time_out_free_zone': time_out_free_zone / (time_out_free_zone + time_in_free_zone) * 100,
+        'free_zone_left_count': free_zone_left_count,
+        'time_out_free_zone_list': time_out_free_zone_list,
+        'average_duration_out_free_zone': sum(time_out_free_zone_list) / len(time_out_free_zone_list),
+        '2': '',
+        '--duration in and out of warning_zone--': '--------------------',
+        'time_in_warning_zone': time_in_warning_zone,
+        'time_out_warning_zone': time_out_warning_zone,
+        '% time_in_warning_zone': time_in_warning_zone / (time_out_warning_zone + time_in_warning_zone) * 100,
+        '% time_out_warning_zone': time_out_warning_zone / (time_out_warning_zone + time_in_warning_zone) * 100,
+        'warning_zone_left_count': warning_zone_left_count,
+        'time_out_warning_zone_list': time_out_warning_zone_list,
+        'average_duration_out_warning_zone': (sum(time_out_warning_zone_list) / len(time_out_warning_zone_list)
+                                              if time_out_warning_zone_list else 0),
+        '3': '',
+        '--statistical data about distance from path--': '--------------------',
+        'minimum_d': minimum_d,
+        'maximum_d': maximum_d,
+        'mean_d': mean_d,
+        'variance_d': variance_d,
+        'standard_deviation_d': standard_deviation_d,
+        '4': '',
+        '--statistical data about distance from free_zone--': '------------------',
+        'minimum_df': minimum_df,
+        'maximum_df': maximum_df,
+        'mean_df': mean_df,
+        'variance_df': variance_df,
+        'standard_deviation_df': standard_deviation_df,
+        '5': '',
+        '--statistical data about distance from warning_zone--': '------------------',
+        'minimum_dw': minimum_dw,
+        'maximum_dw': maximum_dw,
+        'mean_dw': mean_dw,
+        'variance_dw': variance_dw,
+        'standard_deviation_dw': standard_deviation_dw,
+    }
+    return summary
+
+
+class RunningStatistics:
+    """ Minimum, maximum, mean and variance of values added one by one (Welford's algorithm). """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = None
+        self.mean = 0
+        self.m2 = 0
+
+    def update(self, value):
+        """
+        Adds value.
+
+        :param value: number
+
+        """
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if self.maximum is None or value > self.maximum:
+            self.maximum = value
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def variance(self):
+        """ Gets sample variance, 0 for less than two values. """
+        return self.m2 / (self.count - 1) if self.count > 1 else 0
+
+    def result(self):
+        """ Gets minimum, maximum, mean, variance and standard deviation as ``Logger.statistical_analysis``. """
+        variance = self.variance()
+        return self.minimum, self.maximum, self.total / self.count, variance, math.sqrt(variance)
+
+
+class ZoneStatistics:
+    """ Time in and out of the zone and durations of leaving the zone, as in ``Logger.compute_summary``. """
+
+    def __init__(self, zone_range):
+        """
+        :param zone_range: edge of the zone
+
+        """
+        self.zone_range = zone_range
+        self.is_in_zone = True
+        self.time_in_zone = 0
+        self.time_out_zone = 0
+        self.left_count = 0
+        # Duration of every leaving and zero at the end.
+        self.time_out_zone_list = [0]
+
+    def update(self, distance, delta_time):
+        """
+        Adds sample.
+
+        :param distance: distance from the path
+        :param delta_time: time from the previous sample
+
+        """
+        if distance < self.zone_range:
+            self.is_in_zone = True
+            self.time_in_zone += delta_time
+        else:
+            if self.is_in_zone is True:
+                self.left_count += 1
+                self.time_out_zone_list.append(0)
+                self.is_in_zone = False
+
+            self.time_out_zone += delta_time
+            self.time_out_zone_list[self.left_count - 1] += delta_time
+
+    def time_in_percent(self):
+        """ Gets percentage of the time in the zone, 100 before any time passed. """
+        total = self.time_in_zone + self.time_out_zone
+        return self.time_in_zone / total * 100 if total > 0 else 100
+
+    def result(self):
+        """ Gets time in, time out, number of leaving and list of durations out of the zone. """
+        return self.time_in_zone, self.time_out_zone, self.left_count, list(self.time_out_zone_list)
+
+
+class FlightStatistics:
+    """
+    Statistics of the distance from the path kept while flying.
+
+    Every frame updates the zone times and running statistics of the distance from
+    the path and from the free and warning zones. Memory does not grow with the
+    length of the flight (except one number per leaving of a zone), the summary is
+    available at any moment without reading the log.
+    """
+
+    def __init__(self, free_range, warning_range):
+        """
+        :param free_range: range of the free zone in metres
+        :param warning_range: range of the warning zone in metres
+
+        """
+        self.free_range = free_range
+        self.warning_range = warning_range
+        self.free_zone = ZoneStatistics(free_range)
+        self.warning_zone = ZoneStatistics(warning_range)
+        self.d = RunningStatistics()
+        self.df = RunningStatistics()
+        self.dw = RunningStatistics()
+        self.prev_fly_time_s = None
+
+    def update(self, d, fly_time_s):
+        """
+        Adds frame of the log.
+
+        :param d: distance from the path
+        :param fly_time_s: fly time in seconds
+
+        """
+        d = float(d)
+        if self.prev_fly_time_s is None:
+            self.prev_fly_time_s = fly_time_s
+        delta_time = fly_time_s - self.prev_fly_time_s
+        self.prev_fly_time_s = fly_time_s
+
+        self.free_zone.update(d, delta_time)
+        self.warning_zone.update(d, delta_time)
+
+        self.d.update(d)
+        # Distances within the zone are zero.
+        self.df.update(d - self.free_range if d - self.free_range > 0 else 0)
+        self.dw.update(d - self.warning_range if d - self.warning_range > 0 else 0)
+
+    def has_path_data(self):
+        """ Gets whether the summary can be made, at least two frames and some distance from the path. """
+        return self.d.count > 1 and self.d.total != 0
+
+    def summary(self):
+        """ Gets summary of the flight, same content as ``Logger.compute_summary``. """
+        time_in, time_out, left_count, time_out_list = self.warning_zone.result()
+        warning_zone = time_in, time_out, left_count, [i for i in time_out_list if i != 0]
+        return make_summary(self.free_zone.result(), warning_zone, self.d.result(), self.df.result(),
+                            self.dw.result())
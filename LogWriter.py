@@ -0,0 +1,118 @@
+"""
+Streaming of the flight log to the disk.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+import os
+import queue
+import threading
+
+from FlightRecorder import LOG_FIELDS
+
+
+class LogWriter:
+    """
+    Thread which appends batches of frames to log.csv.
+
+    Batches come through a bounded queue as views of the ``FlightRecorder`` chunks.
+    After every batch the file is flushed and synced to the disk (checkpoint), so
+    the log survives a crash up to the last batch. The file has the same layout
+    as the log written at once by ``FlightRecorder.save_csv``.
+    """
+
+    def __init__(self, filename, recorder, capacity=64, durable=True):
+        """
+        :param filename: path to the csv file
+        :param recorder: object ``FlightRecorder`` whose frames are written
+        :param capacity: maximal number of waiting batches (Default value = 64)
+        :param durable: every batch is synced to the disk by fsync (Default value = True)
+
+        """
+        self.filename = filename
+        self.recorder = recorder
+        self.durable = durable
+        self.batches = queue.Queue(capacity)
+        self.thread = None
+
+        # Statistics.
+        self.written = 0
+        self.checkpoints = 0
+        self.error = None
+
+    def start(self):
+        """ Creates the file with the header and starts the thread. """
+        self.file = open(self.filename, 'w', newline='')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(LOG_FIELDS)
+        self.checkpoint()
+        self.thread = threading.Thread(target=self.run, name='log-writer', daemon=True)
+        self.thread.start()
+
+    def is_alive(self):
+        """ Gets whether the thread is writing, False after a failure. """
+        return self.thread is not None and self.thread.is_alive() and self.error is None
+
+    def submit(self, views, block=False, timeout=1.0):
+        """
+        Queues batch of frames, returns False when the queue is full or the thread is not writing.
+
+        :param views: list of np arrays (fields, n) from ``FlightRecorder.frames``
+        :param block: waits for a free place in the queue (Default value = False)
+        :param timeout: maximal waiting in seconds (Default value = 1.0)
+
+        """
+        if not self.is_alive():
+            return False
+        try:
+            self.batches.put(views, block=block, timeout=timeout)
+        except queue.Full:
+            return False
+        return True
+
+    def stop(self, timeout=5.0):
+        """
+        Writes the waiting batches, closes the file and stops the thread.
+
+        Returns False when the thread did not finish in time.
+
+        :param timeout: seconds to wait for the queue and for the thread (Default value = 5.0)
+
+        """
+        if self.thread is None:
+            return True
+        if self.thread.is_alive():
+            try:
+                self.batches.put(None, timeout=timeout)
+            except queue.Full:
+                pass
+        self.thread.join(timeout)
+        finished = not self.thread.is_alive()
+        self.thread = None
+        return finished
+
+    def run(self):
+        """ Writes batches until ``None`` is received. """
+        try:
+            while True:
+                views = self.batches.get()
+                if views is None:
+                    break
+                for values in views:
+                    self.recorder.write_rows(self.writer, values)
+                    self.written += values.shape[1]
+                self.checkpoint()
+        except Exception as e:
+            self.error = e
+            print("Log writer stopped:", e)
+        finally:
+            self.file.close()
+
+    def checkpoint(self):
+        """ Flushes the file and syncs it to the disk. """
+        self.file.flush()
+        if self.durable:
+            os.fsync(self.file.fileno())
+        self.checkpoints += 1
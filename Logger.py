@@ -5,211 +5,225 @@ Adam Ferencz
 VUT FIT 2022
 """
 
-import csv
 import json
 import statistics
+import time
 from datetime import datetime
 
 import matplotlib.pyplot as plt
 
+from BinaryFlightLog import BinaryFlightLog, LOG_FOLDER
+from FlightRecorder import FlightRecorder, LOG_FIELDS, RECORD_FIELDS, field_slice
+from FlightStatistics import FlightStatistics, make_summary
+from LogWriter import LogWriter
 from utils import *
 
+# Fields of the frames of ``FlightRecorder``, written by ``Logger.update``.
+TIMESTAMP, FLY_TIME_S, Z, Z_MAX, D = (RECORD_FIELDS.index(name) for name in ('timestamp', 'fly_time_s', 'z', 'z_max', 'd'))
+POSITION = field_slice('x', 'z')
+VELOCITY = field_slice('vx', 'vz')
+VELOCITY_MAX = field_slice('vx_max', 'vz_max')
+GPS = field_slice('latitude', 'altitude')
+ORIENTATION = field_slice('pitch', 'yaw')
+COMMAND = field_slice('cx', 'cz')
+SAFE_COMMAND = field_slice('scx', 'scz')
+DISTANCE = field_slice('d', 'dz')
+GAIN_COMMAND_POWER = field_slice('gc_pow_x', 'gc_pow_z')
+GAIN_PRESENT_CORRECTION_POWER = field_slice('gpc_pow_x', 'gpc_pow_z')
+GAIN_FUTURE_CORRECTION_POWER = field_slice('gfc_pow_x', 'gfc_pow_z')
+
 
 class Logger:
     """ Class used to analyse flight and collect flight log."""
-    def __init__(self, free_range, warning_range, path='logs/general_log'):
+    def __init__(self, free_range, warning_range, path='logs/general_log', clock=None):
+        """
+        :param free_range: range of the free zone in metres
+        :param warning_range: range of the warning zone in metres
+        :param path: folder of the log (Default value = 'logs/general_log')
+        :param clock: function returning fly time in seconds, e.g. ``SimulatedDroneModel.clock``,
+            None for the wall clock (Default value = None)
+
+        """
         self.path = path
+        self.clock = clock
+        self.clock_start = clock() if clock is not None else 0
         self.is_logging = False
-        self.z_max = 0
-        self.date = 0
 
         self.fly_time_start = datetime.now()
-        self.fly_time = 0
-        self.fly_time_s = 0
-
-        self.x, self.y, self.z = 0, 0, 0
 
+        # Values carried between the frames, maximums and the last distance from the safe path
+        # [d, dx, dy, dz] (kept while the corrector has no nearest point).
         self.z_max = 0
+        self.velocity_max = np.zeros(3)
+        self.distance = np.zeros(4)
 
-        # Velocity.
-        self.vx, self.vy, self.vz = 0, 0, 0
-        self.vx_max, self.vy_max, self.vz_max = 0, 0, 0
-
-        self.latitude, self.longitude, self.altitude = 0, 0, 0
-
-        self.pitch, self.roll, self.yaw = 0, 0, 0
-
-        # Command.
-        self.cx, self.cy, self.cz = 0, 0, 0
-        # Save command.
-        self.scx, self.scy, self.scz = 0, 0, 0
-
-        # Distance from the safe path.
-        self.d = 0
-        self.dx, self.dy, self.dz = 0, 0, 0
-
-        # Powers in correction equations.
-        self.gc_pow_x, self.gc_pow_y, self.gc_pow_z = 0, 0, 0
-        self.gpc_pow_x, self.gpc_pow_y, self.gpc_pow_z = 0, 0, 0
-        self.gfc_pow_x, self.gfc_pow_y, self.gfc_pow_z = 0, 0, 0
+        # Frames of the flight log, values are written straight to the recorder by ``update``.
+        self.recorder = FlightRecorder()
 
-        self.data = []
+        # Streaming of the frames to log.csv, see ``start_logging``. Frames are handed to the
+        # writer every ``flush_records`` frames or ``flush_interval`` seconds.
+        self.writer = None
+        self.streamed = 0
+        self.last_flush = 0
+        self.flush_records = 250
+        self.flush_interval = 1.0
 
         # Range levels.
         self.free_range = free_range
         self.warning_range = warning_range
 
+        # Summary of the last logging kept while flying.
+        self.statistics = FlightStatistics(free_range, warning_range)
+
     def reset_logging(self):
         """ Resets properties. """
-        self.__init__(self.free_range, self.warning_range)
+        self.__init__(self.free_range, self.warning_range, clock=self.clock)
+
+    def start_logging(self, folder):
+        """
+        Starts logging, frames are streamed to log.csv in the folder while flying.
+
+        :param folder: folder of the log
+
+        """
+        self.path = folder
+        # Frames of the previous logging are already saved.
+        self.recorder.clear()
+        self.writer = LogWriter(self.path + '/log.csv', self.recorder)
+        self.writer.start()
+        self.statistics = FlightStatistics(self.free_range, self.warning_range)
+        self.streamed = 0
+        self.last_flush = time.perf_counter()
+        self.is_logging = True
+
+    def stop_logging(self):
+        """
+        Stops logging, the remaining frames are written and log.csv is closed.
+
+        When the writer failed, the whole log is saved again from the recorder.
+
+        """
+        self.is_logging = False
+        if self.writer is not None:
+            self.flush(force=True)
+            finished = self.writer.stop()
+            if self.writer.error is not None or self.writer.written < len(self.recorder):
+                # Unfinished writer may still hold log.csv.
+                filename = self.path + ('/log.csv' if finished else '/log_recovered.csv')
+                print("Log writer failed, log is saved to", filename)
+                self.recorder.save_csv(filename)
+            self.writer = None
+
+    def flush(self, force=False):
+        """
+        Hands the new frames to the writer when enough of them or enough time passed.
+
+        When the queue of the writer is full, the frames are handed over next time. Nothing is
+        handed to a failed writer, the frames stay in the recorder.
+
+        :param force: hands over the new frames now, waits for the queue (Default value = False)
 
-    def save(self, drone):
+        """
+        if self.writer is None:
+            return
+        count = len(self.recorder)
+        now = time.perf_counter()
+        if count > self.streamed and (force or count - self.streamed >= self.flush_records
+                                      or now - self.last_flush >= self.flush_interval):
+            if self.writer.submit(self.recorder.frames(self.streamed, count), block=force):
+                self.streamed = count
+                self.last_flush = now
+
+    def save(self, drone, header=None):
         """
         Saves log and creates summary.
 
+        With streaming, log.csv is just completed, otherwise it is written at once.
+        With the header, the binary log (``BinaryFlightLog``) is saved too.
+
         :param drone: object drone implementing ``AbstractDroneModel``
+        :param header: dict with details of the flight for the binary log, e.g. mission and gains,
+            None saves just log.csv (Default value = None)
+
+        """
+        if self.writer is not None:
+            self.stop_logging()
+        else:
+            self.path = drone.log_folder
+            self.recorder.save_csv(self.path + '/log.csv')
+
+        if header is not None:
+            self.save_binary(header)
+
+        self.save_summary()
 
+    def save_binary(self, header):
         """
-        log_dict = self.get_log_dict()
-        self.path = drone.log_folder
-        with open(self.path + '/log.csv', 'w', newline='') as csvfile:
-            fieldnames = log_dict.keys()
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
+        Saves frames of the last logging to the binary log in the folder of the log.
 
-            for d in self.data:
-                writer.writerow(d)
+        :param header: dict with details of the flight, free and warning ranges are added
 
-        self.create_summary()
+        """
+        values = self.recorder.columns()
+        columns = dict(zip(self.recorder.fields, values))
+        header = dict(header, free_range=self.free_range, warning_range=self.warning_range)
+        BinaryFlightLog.write(self.path + '/' + LOG_FOLDER, columns, header)
 
     def update(self, drone, corrector):
         """
-        Updates and computes collected values.
+        Records a frame of collected values, returns it as np array view (fields,) of the recorder.
+
+        Values are written from the drone and corrector vectors straight to the preallocated
+        frame, nothing is copied to the attributes and no object is kept per frame.
 
         :param drone: object drone implementing ``AbstractDroneModel``
         :param corrector: object ``Corrector``
 
         """
+        frame = self.recorder.next_frame()
         now = datetime.now()
-        dt_string = now.strftime("%d/%m/%Y")
-        self.date = dt_string
-
-        dt_string = now.strftime("%H:%M:%S")
-        self.time = dt_string
+        # Date and time strings are formatted from the timestamp when needed.
+        frame[TIMESTAMP] = now.timestamp()
 
-        delta_time = now - self.fly_time_start
-        self.fly_time_s = delta_time.total_seconds()
-
-        self.x = drone.position[0]
-        self.y = drone.position[1]
-        self.z = drone.position[2]
-
-        if self.z_max < self.z:
-            self.z_max = self.z
+        if self.clock is not None:
+            frame[FLY_TIME_S] = self.clock() - self.clock_start
+        else:
+            frame[FLY_TIME_S] = (now - self.fly_time_start).total_seconds()
 
-        self.vx = drone.speed[0]
-        self.vy = drone.speed[1]
-        self.vz = drone.speed[2]
+        frame[POSITION] = drone.position
+        if self.z_max < frame[Z]:
+            self.z_max = frame[Z]
+        frame[Z_MAX] = self.z_max
 
-        if self.vx_max < self.vx:
-            self.vx_max = self.vx
-        if self.vy_max < self.vy:
-            self.vy_max = self.vy
-        if self.vz_max < self.vz:
-            self.vz_max = self.vz
+        frame[VELOCITY] = drone.speed
+        np.maximum(self.velocity_max, frame[VELOCITY], out=self.velocity_max)
+        frame[VELOCITY_MAX] = self.velocity_max
 
         if drone.GPS is not None:
-            self.latitude = drone.GPS.latitude
-            self.longitude = drone.GPS.longitude
-            self.altitude = drone.GPS.altitude
+            frame[GPS] = drone.GPS.latitude, drone.GPS.longitude, drone.GPS.altitude
         else:
-            self.latitude = 0
-            self.longitude = 0
-            self.altitude = 0
+            frame[GPS] = 0
 
-        self.pitch = drone.pitch
-        self.roll = drone.roll
-        self.yaw = drone.yaw
+        frame[ORIENTATION] = drone.pitch, drone.roll, drone.yaw
 
-        self.cx = corrector.command[0]
-        self.cy = corrector.command[1]
-        self.cz = corrector.command[2]
-
-        self.scx = corrector.safe_command[0]
-        self.scy = corrector.safe_command[1]
-        self.scz = corrector.safe_command[2]
+        frame[COMMAND] = corrector.command
+        frame[SAFE_COMMAND] = corrector.safe_command
 
         if corrector.nearest_point is not None:
-            self.d = distance_np(corrector.nearest_point, drone.position)
-            self.dx = corrector.nearest_point[0] - drone.position[0]
-            self.dy = corrector.nearest_point[1] - drone.position[1]
-            self.dz = corrector.nearest_point[2] - drone.position[2]
-
-        self.gc_pow_x = corrector.gain_command_power[0]
-        self.gc_pow_y = corrector.gain_command_power[1]
-        self.gc_pow_z = corrector.gain_command_power[2]
-
-        self.gpc_pow_x = corrector.gain_present_correction_power[0]
-        self.gpc_pow_y = corrector.gain_present_correction_power[1]
-        self.gpc_pow_z = corrector.gain_present_correction_power[2]
+            np.subtract(corrector.nearest_point, drone.position, out=self.distance[1:])
+            self.distance[0] = distance_np(corrector.nearest_point, drone.position)
+        frame[DISTANCE] = self.distance
 
-        self.gfc_pow_x = corrector.gain_future_correction_power[0]
-        self.gfc_pow_y = corrector.gain_future_correction_power[1]
-        self.gfc_pow_z = corrector.gain_future_correction_power[2]
+        frame[GAIN_COMMAND_POWER] = corrector.gain_command_power
+        frame[GAIN_PRESENT_CORRECTION_POWER] = corrector.gain_present_correction_power
+        frame[GAIN_FUTURE_CORRECTION_POWER] = corrector.gain_future_correction_power
+        return frame
 
     def get_log_dict(self):
-        """ Prepare log dict for saving. """
-        return {
-            "date": self.date,
-
-            "fly_time": self.time,
-            "fly_time_s": self.fly_time_s,
-
-            "x": self.x,
-            "y": self.y,
-            "z": self.z,
-
-            "z_max": self.z_max,
-
-            "vx": self.vx,
-            "vy": self.vy,
-            "vz": self.vz,
-
-            "vx_max": self.vx_max,
-            "vy_max": self.vy_max,
-            "vz_max": self.vz_max,
-
-            "latitude": self.latitude,
-            "longitude": self.longitude,
-            "altitude": self.altitude,
-
-            "pitch": self.pitch,
-            "roll": self.roll,
-            "yaw": self.yaw,
-
-            "cx": self.cx,
-            "cy": self.cy,
-            "cz": self.cz,
-
-            "scx": self.scx,
-            "scy": self.scy,
-            "scz": self.scz,
-
-            "d": self.d,
-            "dx": self.dx,
-            "dy": self.dy,
-            "dz": self.dz,
-
-            "gc_pow_x": self.gc_pow_x,
-            "gc_pow_y": self.gc_pow_y,
-            "gc_pow_z": self.gc_pow_z,
-            "gpc_pow_x": self.gpc_pow_x,
-            "gpc_pow_y": self.gpc_pow_y,
-            "gpc_pow_z": self.gpc_pow_z,
-            "gfc_pow_x": self.gfc_pow_x,
-            "gfc_pow_y": self.gfc_pow_y,
-            "gfc_pow_z": self.gfc_pow_z,
-        }
+        """ Prepare log dict of the last update. """
+        values = self.recorder.last_frame().tolist()
+        now = datetime.fromtimestamp(values[TIMESTAMP])
+        return dict(zip(LOG_FIELDS, [now.strftime("%d/%m/%Y"), now.strftime("%H:%M:%S")] + values[1:]))
 
     def log(self, drone, corrector):
         """
@@ -220,23 +234,31 @@ class Logger:
 
         """
         if self.is_logging:
-            self.update(drone, corrector)
-            log_dict = self.get_log_dict()
-            self.data.append(log_dict)
+            frame = self.update(drone, corrector)
+            self.statistics.update(frame[D], frame[FLY_TIME_S])
+            self.flush()
 
     @staticmethod
     def statistical_analysis(values):
         """
         Return statistics.
 
-        :param values: list of values
+        Mean, sample variance and standard deviation are computed by numpy (pairwise summation), they
+        differ from the per-sample ``sum`` and ``statistics.variance`` only by rounding (relative
+        error about 1e-15 for the recorded flights, tests allow 1e-9).
+
+        :param values: list or np array of values
 
         """
-        minimum = min(values)
-        maximum = max(values)
-        mean = sum(values) / len(values)
-        variance = statistics.variance(values)
-        standard_deviation = statistics.stdev(values)
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) < 2:
+            raise statistics.StatisticsError('variance requires at least two data points')
+        minimum = values.min().item()
+        maximum = values.max().item()
+        mean = np.mean(values).item()
+        variance = np.var(values, ddof=1)
+        standard_deviation = np.sqrt(variance).item()
+        variance = variance.item()
 
         return minimum, maximum, mean, variance, standard_deviation
 
@@ -245,19 +267,48 @@ class Logger:
         """
         Return statistics. Changed by cutting level.
 
-        :param values: list of values
+        :param values: list or np array of values
         :param ideal_value: cutting level - everything below is zero
 
         """
-        new_vals = list(map(lambda i: i - ideal_value if i - ideal_value > 0 else 0, values))
-        minimum = min(new_vals)
-        maximum = max(new_vals)
-        mean = sum(new_vals) / len(new_vals)
-        variance = statistics.variance(new_vals)
-        standard_deviation = statistics.stdev(new_vals)
+        over = np.asarray(values, dtype=np.float64) - ideal_value
+        is_over = over > 0
+        minimum, maximum, mean, variance, standard_deviation = Logger.statistical_analysis(np.where(is_over, over, 0))
+
+        # Values below the level are integer zeros, as they were in the list.
+        if not is_over.all():
+            minimum = 0
+        if not is_over.any():
+            maximum, variance = 0, 0
 
         return minimum, maximum, mean, variance, standard_deviation
 
+    @staticmethod
+    def zone_analysis(d, delta_time, zone_range):
+        """
+        Return time in and out of the zone, number of leaving and list of durations out of the zone.
+
+        Samples out of the zone are grouped to runs, every run starts by leaving the zone.
+        The list has the duration of every run and zero at the end.
+
+        :param d: np array of distances from the path
+        :param delta_time: np array of times from the previous samples
+        :param zone_range: edge of the zone
+
+        """
+        is_in = d < zone_range
+        is_out = ~is_in
+        was_in = np.concatenate(([True], is_in[:-1]))
+        is_left = is_out & was_in
+        left_count = int(np.count_nonzero(is_left))
+
+        run = np.cumsum(is_left) - 1
+        durations = np.bincount(run[is_out], weights=delta_time[is_out], minlength=left_count)
+
+        time_in = np.sum(delta_time[is_in]).item()
+        time_out = np.sum(delta_time[is_out]).item()
+        return time_in, time_out, left_count, durations.tolist() + [0]
+
     def print_graph(self, x, y):
         """
         Creates graph of absolut distance.
@@ -291,123 +342,54 @@ class Logger:
         # plt.imsave('distance_graph.png')
         plt.savefig(self.path+'/distance_graph.png')
 
-    def create_summary(self):
-        """ Creates summary json file. """
-        # self.path = 'logs/12-04-2022_01-35-02'
-        import pandas as pd
-        fields = 'date,fly_time,fly_time_s,x,y,z,z_max,vx,vy,vz,vx_max,vy_max,vz_max,latitude,longitude,altitude,pitch,roll,yaw,cx,cy,cz,scx,scy,scz,d,dx,dy,dz,gc_pow_x,gc_pow_y,gc_pow_z,gpc_pow_x,gpc_pow_y,gpc_pow_z,gfc_pow_x,gfc_pow_y,gfc_pow_z'.split(
-            ',')
-        df = pd.read_csv(self.path + '/log.csv', skipinitialspace=True, usecols=fields)
+    @staticmethod
+    def compute_summary(d, fly_time_s, free_range, warning_range):
+        """
+        Computes summary of the flight from the distances from the path.
+
+        :param d: list of distances from the path
+        :param fly_time_s: list of times of the samples in seconds
+        :param free_range: edge of the free zone
+        :param warning_range: edge of the warning zone
 
+        """
         # počet opuštění zóny
         # poměr času letu mimo zónu
+        d = np.asarray(d, dtype=np.float64)
+        fly_time_s = np.asarray(fly_time_s, dtype=np.float64)
+        delta_time = np.diff(fly_time_s, prepend=fly_time_s[0])
 
         # Free zone
-        is_in_free_zone = True
-        time_in_free_zone = 0
-        time_out_free_zone = 0
-        free_zone_left_count = 0
-        time_out_free_zone_list = [0]
+        time_in_free_zone, time_out_free_zone, free_zone_left_count, time_out_free_zone_list = \
+            Logger.zone_analysis(d, delta_time, free_range)
 
         # Warning zone
-        is_in_warning_zone = True
-        time_in_warning_zone = 0
-        time_out_warning_zone = 0
-        warning_zone_left_count = 0
-        time_out_warning_zone_list = [0]
-
-        d = df['d'].tolist()
-
-        if sum(d) == 0:
-            print("No path data in the flight log.")
-            return
-        fly_time_s = df['fly_time_s'].tolist()
-        prev_fly_time_s = fly_time_s[0]
-        for (distance, curr_fly_time_s) in zip(d, fly_time_s):
-            print(distance, curr_fly_time_s)
-
-            delta_time = curr_fly_time_s - prev_fly_time_s
-
-            if distance < self.free_range:
-                is_in_free_zone = True
-                time_in_free_zone += delta_time
-
-
-            else:
-                if is_in_free_zone is True:
-                    free_zone_left_count += 1
-                    time_out_free_zone_list.append(0)
-                    is_in_free_zone = False
-
-                time_out_free_zone += delta_time
-                time_out_free_zone_list[free_zone_left_count - 1] += delta_time
-
-            if distance < self.warning_range:
-                is_in_warning_zone = True
-                time_in_warning_zone += delta_time
-
-            else:
-                if is_in_warning_zone is True:
-                    warning_zone_left_count += 1
-                    time_out_warning_zone_list.append(0)
-                    is_in_warning_zone = False
-
-                time_out_warning_zone += delta_time
-                time_out_warning_zone_list[warning_zone_left_count - 1] += delta_time
-
-            prev_fly_time_s = curr_fly_time_s
+        time_in_warning_zone, time_out_warning_zone, warning_zone_left_count, time_out_warning_zone_list = \
+            Logger.zone_analysis(d, delta_time, warning_range)
 
+        # Only the warning list is without zeros.
         time_out_warning_zone_list = [i for i in time_out_warning_zone_list if i != 0]
-        time_out_warning_zone_list = [i for i in time_out_warning_zone_list if i != 0]
-        print('minimum, maximum, mean, variance, standard_deviation')
-        minimum_d, maximum_d, mean_d, variance_d, standard_deviation_d = self.statistical_analysis(d)
-        minimum_df, maximum_df, mean_df, variance_df, standard_deviation_df = self.statistical_analysis_ideal(d,
-                                                                                                              self.free_range)
-        minimum_dw, maximum_dw, mean_dw, variance_dw, standard_deviation_dw = self.statistical_analysis_ideal(d,
-                                                                                                              self.warning_range)
-
-        summary = {
-            '1': '',
-            '--duration in and out of free_zone--': '--------------------',
-            'time_in_free_zone': time_in_free_zone,
-            'time_out_free_zone': time_out_free_zone,
-            '% time_in_free_zone': time_in_free_zone / (time_out_free_zone + time_in_free_zone) * 100,
-            '% time_out_free_zone': time_out_free_zone / (time_out_free_zone + time_in_free_zone) * 100,
-            'free_zone_left_count': free_zone_left_count,
-            'time_out_free_zone_list': time_out_free_zone_list,
-            'average_duration_out_free_zone': sum(time_out_free_zone_list) / len(time_out_free_zone_list),
-            '2': '',
-            '--duration in and out of warning_zone--': '--------------------',
-            'time_in_warning_zone': time_in_warning_zone,
-            'time_out_warning_zone': time_out_warning_zone,
-            '% time_in_warning_zone': time_in_warning_zone / (time_out_warning_zone + time_in_warning_zone) * 100,
-            '% time_out_warning_zone': time_out_warning_zone / (time_out_warning_zone + time_in_warning_zone) * 100,
-            'warning_zone_left_count': warning_zone_left_count,
-            'time_out_warning_zone_list': time_out_warning_zone_list,
-            'average_duration_out_warning_zone': sum(time_out_warning_zone_list) / len(time_out_warning_zone_list),
-            '3': '',
-            '--statistical data about distance from path--': '--------------------',
-            'minimum_d': minimum_d,
-            'maximum_d': maximum_d,
-            'mean_d': mean_d,
-            'variance_d': variance_d,
-            'standard_deviation_d': standard_deviation_d,
-            '4': '',
-            '--statistical data about distance from free_zone--': '------------------',
-            'minimum_df': minimum_df,
-            'maximum_df': maximum_df,
-            'mean_df': mean_df,
-            'variance_df': variance_df,
-            'standard_deviation_df': standard_deviation_df,
-            '5': '',
-            '--statistical data about distance from warning_zone--': '------------------',
-            'minimum_dw': minimum_dw,
-            'maximum_dw': maximum_dw,
-            'mean_dw': mean_dw,
-            'variance_dw': variance_dw,
-            'standard_deviation_dw': standard_deviation_dw,
-        }
+        minimum_d, maximum_d, mean_d, variance_d, standard_deviation_d = Logger.statistical_analysis(d)
+        minimum_df, maximum_df, mean_df, variance_df, standard_deviation_df = Logger.statistical_analysis_ideal(d,
+                                                                                                                free_range)
+        minimum_dw, maximum_dw, mean_dw, variance_dw, standard_deviation_dw = Logger.statistical_analysis_ideal(d,
+                                                                                                                warning_range)
+
+        summary = make_summary(
+            (time_in_free_zone, time_out_free_zone, free_zone_left_count, time_out_free_zone_list),
+            (time_in_warning_zone, time_out_warning_zone, warning_zone_left_count, time_out_warning_zone_list),
+            (minimum_d, maximum_d, mean_d, variance_d, standard_deviation_d),
+            (minimum_df, maximum_df, mean_df, variance_df, standard_deviation_df),
+            (minimum_dw, maximum_dw, mean_dw, variance_dw, standard_deviation_dw))
+        return summary
+
+    def write_summary(self, summary):
+        """
+        Prints summary and saves it to summary.json.
 
+        :param summary: dict from ``Logger.compute_summary`` or ``FlightStatistics.summary``
+
+        """
         # https://stackoverflow.com/questions/44689546/how-to-print-out-a-dictionary-nicely-in-python
         def print_inventory(dct):
             """
@@ -427,6 +409,29 @@ class Logger:
         with open(self.path + '/summary.json', 'w', encoding='utf-8') as f:
             json.dump(summary, f, ensure_ascii=False, indent=4)
 
+    def save_summary(self):
+        """ Saves summary of the last logging from the statistics kept while flying, the log is not read. """
+        if not self.statistics.has_path_data():
+            print("No path data in the flight log.")
+            return
+        self.write_summary(self.statistics.summary())
+        self.print_graph(self.recorder.column('d'), self.recorder.column('fly_time_s'))
+
+    def create_summary(self):
+        """ Creates summary json file from the saved log. """
+        # self.path = 'logs/12-04-2022_01-35-02'
+        log = BinaryFlightLog.load(self.path)
+
+        d = np.asarray(log['d'])
+
+        if not d.any():
+            print("No path data in the flight log.")
+            return
+        fly_time_s = np.asarray(log['fly_time_s'])
+        print('minimum, maximum, mean, variance, standard_deviation')
+        summary = self.compute_summary(d, fly_time_s, self.free_range, self.warning_range)
+        self.write_summary(summary)
+
         self.print_graph(d, fly_time_s)
 
 
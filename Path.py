@@ -9,6 +9,7 @@ import json
 import os
 from datetime import datetime
 
+from segments import SegmentGeometry
 from Waypoint import *
 from utils import *
 
@@ -25,12 +26,28 @@ class Path:
         self.saved = True
         self.mission_folder = "missions"
         self.selected_wp = None
+        # Index of the selected waypoint, the dragged segments are updated without searching the list.
+        self.selected_index = None
         self.selected_wp_locked = False
         self.transformer = transformer
 
         self.redraw_timer = 60
         self.actual_height = 2
 
+        # Cached segments, rebuilt only when waypoints change.
+        self.segment_starts = np.empty((0, 3))
+        self.segment_ends = np.empty((0, 3))
+        self.segments_valid = True
+
+        # Every change of the segments increments the version and is recorded
+        # as a set of changed segment indexes (None when everything changed).
+        self.segments_version = 0
+        self.segment_changes = []
+
+        # Precomputed geometry of the segments, rebuilt when the version changes.
+        self.segment_geometry = None
+        self.segment_geometry_version = None
+
     def add_waypoint_by_pixel(self, pixel_xy):
         """
         Adds new waypoint by clicking in GUI.
@@ -44,6 +61,7 @@ class Path:
         lat, lon = self.transformer.pixels2latlon(pixel_xy)
         wp = Waypoint(self.transformer, lat, lon, metres_x, metres_y, metres_z)
         self.waypoints.append(wp)
+        self.invalidate_segments()
         self.saved = False
         self.redraw_timer = 0
 
@@ -102,6 +120,10 @@ class Path:
     def delete_path(self):
         """ Resets current path. """
         self.waypoints = []
+        self.selected_wp = None
+        self.selected_index = None
+        self.selected_wp_locked = False
+        self.invalidate_segments()
         self.saved = True
 
     def load_path_json(self, json_file):
@@ -127,6 +149,7 @@ class Path:
 
             self.waypoints.append(Waypoint(self.transformer, lat, lon, metres_x, metres_y, metres_z))
 
+        self.invalidate_segments()
 
     def update(self, mouse):
         """
@@ -137,22 +160,120 @@ class Path:
         mouseX, mouseY = mouse
         if not self.selected_wp_locked:
             self.selected_wp = None
-        for wp in self.waypoints:
+            self.selected_index = None
+        for i, wp in enumerate(self.waypoints):
             mouse = np.array(mouse)
             wp_coords = wp.position_visual()
             dist = distance_np(mouse, wp_coords)
             if dist < 5:
                 self.selected_wp = wp
+                self.selected_index = i
 
         if self.selected_wp_locked:
             self.selected_wp.update_by_visual_xy(mouse)
+            self.invalidate_waypoint(self.selected_index)
             self.redraw_timer = 0
 
+    def change_waypoint_height(self, index, delta):
+        """
+        Changes height of the waypoint.
+
+        :param index: index of the waypoint in this path
+        :param delta: change of height in metres
+
+        """
+        self.waypoints[index].metres_z += delta
+        self.invalidate_waypoint(index)
+
+    def invalidate_segments(self):
+        """ Marks all segments for rebuild, used when waypoints are added or removed. """
+        self.segments_valid = False
+        self.record_segment_change(None)
+
+    def invalidate_waypoint(self, i):
+        """
+        Updates just the two segments connected to the moved waypoint.
+
+        :param i: index of the moved waypoint
+
+        """
+        if not self.segments_valid:
+            return
+        position = self.waypoints[i].position_metres()
+        changed = set()
+        if i > 0:
+            self.segment_ends[i - 1] = position
+            changed.add(i - 1)
+        if i < len(self.segment_starts):
+            self.segment_starts[i] = position
+            changed.add(i)
+        self.record_segment_change(changed)
+
+    def record_segment_change(self, changed):
+        """
+        Increments version of the segments and remembers which of them changed.
+
+        :param changed: set of segment indexes or None for all segments
+
+        """
+        self.segments_version += 1
+        self.segment_changes.append((self.segments_version, changed))
+        del self.segment_changes[:-100]
+
+    def get_changed_segments(self, since_version):
+        """
+        Gets indexes of segments changed after the given version.
+
+        Returns None when all segments have to be considered as changed.
+
+        :param since_version: int version of segments known by the caller
+
+        """
+        if since_version is None or since_version < self.segments_version - len(self.segment_changes):
+            return None
+        result = set()
+        for version, changed in self.segment_changes:
+            if version <= since_version:
+                continue
+            if changed is None:
+                return None
+            result |= changed
+        return result
+
+    def get_segment_arrays(self):
+        """
+        Gets cached segments as np arrays (N, 3) of start points and end points.
+
+        Arrays are owned by the path and updated in place while dragging waypoints,
+        callers get read-only views of them.
+        """
+        if not self.segments_valid:
+            positions = np.array([wp.position_metres() for wp in self.waypoints], dtype=float).reshape(-1, 3)
+            self.segment_starts = positions[:-1].copy()
+            self.segment_ends = positions[1:].copy()
+            self.segments_valid = True
+        starts, ends = self.segment_starts.view(), self.segment_ends.view()
+        starts.flags.writeable = False
+        ends.flags.writeable = False
+        return starts, ends
+
+    def get_segment_geometry(self):
+        """ Gets cached ``SegmentGeometry`` of the segments, updated only when the path changes. """
+        starts, ends = self.get_segment_arrays()
+        if self.segment_geometry is not None and self.segment_geometry_version != self.segments_version:
+            changed = self.get_changed_segments(self.segment_geometry_version)
+            if changed is None or len(self.segment_geometry) != len(starts):
+                self.segment_geometry = None
+            elif len(changed) > 0:
+                changed = np.array(sorted(changed))
+                self.segment_geometry.update(changed, starts[changed], ends[changed])
+        if self.segment_geometry is None:
+            self.segment_geometry = SegmentGeometry(starts, ends)
+        self.segment_geometry_version = self.segments_version
+        return self.segment_geometry
 
     def get_segments(self):
         """ Transforms path to list of segments. """
-        result = []
-        for i in range(len(self.waypoints) - 1):
-            result.append([self.waypoints[i].position_metres(), self.waypoints[i + 1].position_metres()])
-        return result
+        starts, ends = self.get_segment_arrays()
+        return [[start, end] for start, end in zip(starts, ends)]
 
@@ -0,0 +1,171 @@
+"""
+Asynchronous taking and saving of the photos from the drone camera.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+# Columns of the photo index, pose of the drone at the moment of the request.
+INDEX_FIELDS = ['name', 'date', 'time', 'x', 'y', 'z', 'yaw', 'pitch', 'roll', 'latitude', 'longitude', 'altitude']
+
+
+class PhotoQueue:
+    """
+    Bounded queue of photo requests served by worker threads.
+
+    ``submit`` only stores the request with the drone pose and returns, every worker
+    has its own connection and fetches, saves and indexes the photos. Saved photos
+    are listed in ``index.csv`` in the folder of the photos. When the queue is full,
+    the request is dropped, so the control loop never waits.
+    """
+
+    def __init__(self, connect, fetch, workers=2, capacity=16):
+        """
+        :param connect: function called in every worker, returns connection for ``fetch``
+        :param fetch: function fetch(connection) returning encoded image bytes
+        :param workers: number of worker threads (Default value = 2)
+        :param capacity: maximal number of waiting requests (Default value = 16)
+
+        """
+        self.connect = connect
+        self.fetch = fetch
+        self.requests = queue.Queue(capacity)
+        self.index_lock = threading.Lock()
+        self.workers = [threading.Thread(target=self.run, name='photo-{}'.format(i), daemon=True)
+                        for i in range(workers)]
+
+        # Statistics.
+        self.submitted = 0
+        self.saved = 0
+        self.dropped = 0
+        self.failed = 0
+
+        self.last_name = None
+        self.name_count = 0
+
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, folder, pose):
+        """
+        Requests photo, returns its file name or None when the queue is full.
+
+        :param folder: folder of the photos
+        :param pose: dict of the ``INDEX_FIELDS`` values except name, date and time
+
+        """
+        now = datetime.now()
+        name = now.strftime("%d-%m-%Y_%H-%M-%S")
+        # More photos in one second get a number.
+        if name == self.last_name:
+            self.name_count += 1
+        else:
+            self.last_name, self.name_count = name, 0
+        if self.name_count > 0:
+            name += "_{}".format(self.name_count)
+        name += ".png"
+
+        row = dict(pose, name=name, date=now.strftime("%d/%m/%Y"), time=now.strftime("%H:%M:%S.%f"))
+        try:
+            self.requests.put_nowait((folder, row))
+        except queue.Full:
+            self.dropped += 1
+            return None
+        self.submitted += 1
+        return name
+
+    def run(self):
+        """ Serves the requests until ``None`` is received. """
+        try:
+            connection = self.connect()
+        except Exception as e:
+            print("Photo worker stopped:", e)
+            connection = None
+
+        while True:
+            request = self.requests.get()
+            try:
+                if request is None:
+                    return
+                if connection is None:
+                    self.failed += 1
+                    continue
+                self.save(connection, *request)
+            except Exception as e:
+                self.failed += 1
+                print("Photo failed:", e)
+            finally:
+                self.requests.task_done()
+
+    def save(self, connection, folder, row):
+        """
+        Fetches and saves one photo and adds it to the index.
+
+        :param connection: connection of the worker
+        :param folder: folder of the photos
+        :param row: dict of the ``INDEX_FIELDS`` values
+
+        """
+        image = self.fetch(connection)
+        os.makedirs(folder, exist_ok=True)
+        with open(os.path.join(folder, row['name']), 'wb') as f:
+            f.write(image)
+
+        index_filename = os.path.join(folder, 'index.csv')
+        with self.index_lock:
+            new = not os.path.exists(index_filename)
+            with open(index_filename, 'a', newline='') as csvfile:
+                writer = csv.DictWriter(csvfile, fieldnames=INDEX_FIELDS)
+                if new:
+                    writer.writeheader()
+                writer.writerow(row)
+            self.saved += 1
+        print("photo =", os.path.join(folder, row['name']))
+
+    def drain(self, timeout=None):
+        """
+        Waits until all submitted photos are saved, returns number of photos left unsaved.
+
+        :param timeout: maximal waiting in seconds, None waits without limit (Default value = None)
+
+        """
+        if timeout is None:
+            self.requests.join()
+            return 0
+        deadline = time.monotonic() + timeout
+        with self.requests.all_tasks_done:
+            while self.requests.unfinished_tasks:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.requests.all_tasks_done.wait(remaining)
+            left = self.requests.unfinished_tasks
+        if left:
+            print("Photos left unsaved:", left)
+        return left
+
+    def stop(self, timeout=5.0):
+        """
+        Saves the waiting photos and stops the workers, returns number of photos left unsaved.
+
+        Workers stuck in fetching (e.g. lost simulator) are left behind as daemon threads.
+
+        :param timeout: seconds to wait for the photos and for every worker (Default value = 5.0)
+
+        """
+        left = self.drain(timeout)
+        for _ in self.workers:
+            try:
+                self.requests.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self.workers:
+            worker.join(timeout if not left else 0)
+        return left
@@ -0,0 +1,145 @@
+"""
+Lightweight per-stage timing of the main loop.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+import time
+
+import numpy as np
+
+from utils import *
+
+
+class Profiler:
+    """
+    Records durations of the stages of every frame into a fixed-size ring buffer.
+
+    Frame starts by ``begin_frame``, every ``mark`` stores time elapsed since the previous
+    mark under the stage name and ``end_frame`` closes the row. Monotonic nanosecond clock
+    is used. When disabled, every call returns immediately.
+    """
+
+    def __init__(self, capacity=1024, max_stages=16, enabled=False):
+        """
+        :param capacity: number of frames kept in the ring buffer (Default value = 1024)
+        :param max_stages: maximal number of different stages (Default value = 16)
+        :param enabled: records timing (Default value = False)
+
+        """
+        self.enabled = enabled
+        self.capacity = capacity
+        self.durations = np.zeros((capacity, max_stages + 1), dtype=np.int64)
+        self.stages = {}
+
+        # Ring buffer state.
+        self.frame = 0
+        self.count = 0
+        self.last = 0
+
+        # Statistics shown in the overlay, recomputed every ``overlay_period`` frames.
+        self.overlay_period = 30
+        self.overlay_stats = None
+
+    def begin_frame(self):
+        """ Starts timing of a new frame. """
+        if not self.enabled:
+            return
+        self.durations[self.frame] = 0
+        self.last = time.perf_counter_ns()
+        self.durations[self.frame, -1] = self.last
+
+    def mark(self, stage):
+        """
+        Stores duration of the stage which ends now.
+
+        :param stage: str name of the stage
+
+        """
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        column = self.stages.get(stage)
+        if column is None:
+            if len(self.stages) >= self.durations.shape[1] - 1:
+                return
+            column = self.stages[stage] = len(self.stages)
+        self.durations[self.frame, column] += now - self.last
+        self.last = now
+
+    def end_frame(self):
+        """ Closes the frame, stores its total duration and moves in the ring buffer. """
+        if not self.enabled:
+            return
+        self.durations[self.frame, -1] = time.perf_counter_ns() - self.durations[self.frame, -1]
+        self.frame = (self.frame + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def set_enabled(self, enabled):
+        """
+        Enables or disables recording, recorded frames are dropped and a new frame begins.
+
+        :param enabled: bool
+
+        """
+        self.enabled = enabled
+        self.frame, self.count = 0, 0
+        self.overlay_stats = None
+        self.begin_frame()
+
+    def frames(self):
+        """ Gets recorded durations in nanoseconds, one row per frame from the oldest. """
+        if self.count < self.capacity:
+            return self.durations[:self.count]
+        return np.roll(self.durations, -self.frame, axis=0)
+
+    def stats(self):
+        """
+        Gets p50, p95, p99 and max of every stage and of the whole frame in milliseconds.
+
+        Returns dict of stage name to tuple (p50, p95, p99, max).
+        """
+        if self.count == 0:
+            return {}
+        frames = self.frames() / 1e6
+        columns = list(self.stages.items()) + [('frame', -1)]
+        result = {}
+        for stage, column in columns:
+            p50, p95, p99 = np.percentile(frames[:, column], [50, 95, 99])
+            result[stage] = (p50, p95, p99, frames[:, column].max())
+        return result
+
+    def draw(self, display, xy, size=20):
+        """
+        Draws table of the statistics.
+
+        :param display: pygame display
+        :param xy: list of two ints, top left corner
+        :param size: int size of the font (Default value = 20)
+
+        """
+        if not self.enabled:
+            return
+        if self.overlay_stats is None or self.frame % self.overlay_period == 0:
+            self.overlay_stats = self.stats()
+
+        x, y = xy
+        text(display, "stage [ms]: p50 p95 p99 max", size, (x, y))
+        for stage, values in self.overlay_stats.items():
+            y += size * 3 // 4
+            text(display, "{}: {:.2f} {:.2f} {:.2f} {:.2f}".format(stage, *values), size, (x, y))
+
+    def save(self, filename):
+        """
+        Saves statistics of the stages to the csv file, e.g. timing.csv next to log.csv.
+
+        :param filename: path to the csv file
+
+        """
+        with open(filename, 'w', newline='') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(['stage', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'frames'])
+            for stage, values in self.stats().items():
+                writer.writerow([stage, *values, self.count])
@@ -0,0 +1,96 @@
+"""
+Counting of the RPC calls to the simulator and their latency.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import json
+import time
+
+
+class RpcMonitor:
+    """
+    Wraps the client of the simulator and measures every called method.
+
+    Every method call is a blocking msgpack-RPC round trip (async methods just send
+    the request), so the number of calls and their latency tell the cost of a tick.
+    Attributes which are not methods are passed through.
+    """
+
+    def __init__(self, client):
+        """
+        :param client: client of the simulator, e.g. ``airsim.MultirotorClient``
+
+        """
+        self.client = client
+
+        # Method name -> [calls, total ns, max ns].
+        self.calls = {}
+
+    def __getattr__(self, name):
+        attribute = getattr(self.client, name)
+        if not callable(attribute):
+            return attribute
+
+        def measured(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                record = self.calls.setdefault(name, [0, 0, 0])
+                record[0] += 1
+                record[1] += elapsed
+                record[2] = max(record[2], elapsed)
+
+        return measured
+
+    def reset(self):
+        """ Clears the statistics. """
+        self.calls = {}
+
+    def total_calls(self):
+        """ Gets number of all measured calls. """
+        return sum(record[0] for record in self.calls.values())
+
+    def report(self, ticks=None):
+        """
+        Gets statistics of every method: calls, calls per tick, mean and max latency in milliseconds.
+
+        :param ticks: number of ticks (updates) for the per-tick counts (Default value = None)
+
+        """
+        result = {}
+        for name, (calls, total, maximum) in sorted(self.calls.items()):
+            result[name] = {
+                'calls': calls,
+                'calls_per_tick': calls / ticks if ticks else None,
+                'mean_ms': total / calls / 1e6,
+                'max_ms': maximum / 1e6,
+            }
+        return result
+
+    def print_report(self, ticks=None):
+        """
+        Prints statistics of the calls.
+
+        :param ticks: number of ticks (updates) for the per-tick counts (Default value = None)
+
+        """
+        print("\nRPC calls:")
+        for name, values in self.report(ticks).items():
+            per_tick = "" if values['calls_per_tick'] is None else " ({:.2f}/tick)".format(values['calls_per_tick'])
+            print("{} : {}{} mean {:.3f} ms, max {:.3f} ms".format(
+                name, values['calls'], per_tick, values['mean_ms'], values['max_ms']))
+
+    def save(self, filename, ticks=None):
+        """
+        Saves statistics of the calls to the json file.
+
+        :param filename: path to the json file
+        :param ticks: number of ticks (updates) for the per-tick counts (Default value = None)
+
+        """
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.report(ticks), f, ensure_ascii=False, indent=4)
@@ -0,0 +1,273 @@
+"""
+Spatial index over path segments for fast nearest point queries.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+
+import numpy as np
+
+from segments import SegmentGeometry
+
+
+class SegmentGrid:
+    """
+    Uniform 3D grid with segments bucketed into the cells they pass through.
+
+    Query searches growing cubes of cells around the queried point and stops as soon as
+    no segment outside the searched cube can be closer than the best one found.
+    Results are the same as ``SegmentGeometry.nearest`` over the whole path.
+    """
+
+    def __init__(self, starts, ends, cell_size=None, max_cells=1000000, max_radius=3):
+        """
+        :param starts: np array (N, 3) of start points of the segments
+        :param ends: np array (N, 3) of end points of the segments
+        :param cell_size: edge of the cell in metres (Default value = None, median segment length)
+        :param max_cells: upper limit of the number of cells, cell_size is enlarged to keep it
+        :param max_radius: search radius in cells, full scan is used beyond it
+
+        """
+        self.geometry = SegmentGeometry(starts, ends)
+        self.starts = self.geometry.starts
+        self.ends = self.geometry.ends
+        self.max_radius = max_radius
+        self.offsets = {}
+
+        points = np.concatenate((self.starts, self.ends))
+        self.origin = points.min(axis=0)
+        extent = points.max(axis=0) - self.origin
+
+        if cell_size is None:
+            lengths = self.geometry.length
+            cell_size = float(np.median(lengths)) if len(lengths) > 0 else 1.0
+        cell_size = max(cell_size, 1e-3)
+        while np.prod(np.floor(extent / cell_size) + 1) > max_cells:
+            cell_size *= 2
+        self.cell_size = cell_size
+        self.shape = (np.floor(extent / cell_size) + 1).astype(int)
+
+        self.build()
+
+    def build(self):
+        """ Buckets all segments into the cells. """
+        cells, segment_ids = self.cells_of_segments(np.arange(len(self.starts)))
+        self.store(cells, segment_ids)
+
+    def store(self, cells, segment_ids):
+        """
+        Stores pairs of cells and segments in compressed layout.
+
+        Segments of cell i are ``cell_segments[cell_start[i]:cell_start[i + 1]]``.
+
+        :param cells: np array of cell indexes
+        :param segment_ids: np array of segment indexes
+
+        """
+        order = np.lexsort((segment_ids, cells))
+        self.cell_items = cells[order]
+        self.cell_segments = segment_ids[order]
+        counts = np.bincount(self.cell_items, minlength=int(np.prod(self.shape)))
+        self.cell_start = np.concatenate(([0], np.cumsum(counts)))
+
+    def update_segments(self, segment_ids, starts, ends):
+        """
+        Moves some of the segments, other segments stay in their cells.
+
+        Returns False when the segments leave the grid and the index has to be rebuilt.
+
+        :param segment_ids: np array of segment indexes
+        :param starts: np array (M, 3) of new start points
+        :param ends: np array (M, 3) of new end points
+
+        """
+        segment_ids = np.asarray(segment_ids, dtype=int)
+        points = np.concatenate((starts, ends)).reshape(-1, 3)
+        if np.any(points < self.origin) or np.any(self.cell_of(points) >= self.shape):
+            return False
+
+        self.geometry.update(segment_ids, starts, ends)
+        keep = ~np.isin(self.cell_segments, segment_ids)
+        cells, ids = self.cells_of_segments(segment_ids)
+        self.store(np.concatenate((self.cell_items[keep], cells)), np.concatenate((self.cell_segments[keep], ids)))
+        return True
+
+    def cells_of_segments(self, segment_ids):
+        """
+        Gets all cells touched by the segments.
+
+        Every segment is cut into pieces not longer than one cell, so the bounding box
+        of each piece spans at most two cells per axis.
+
+        :param segment_ids: np array of segment indexes
+
+        """
+        starts = self.starts[segment_ids]
+        ends = self.ends[segment_ids]
+        lengths = self.geometry.length[segment_ids]
+        pieces = np.maximum(np.ceil(lengths / self.cell_size), 1).astype(int)
+
+        owner = np.repeat(np.arange(len(segment_ids)), pieces)
+        piece = np.arange(len(owner)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+        t0 = (piece / pieces[owner])[:, None]
+        t1 = ((piece + 1) / pieces[owner])[:, None]
+        line_vec = (ends - starts)[owner]
+        a = self.cell_of(starts[owner] + line_vec * t0)
+        b = self.cell_of(starts[owner] + line_vec * t1)
+        low = np.minimum(a, b)
+        high = np.maximum(a, b)
+
+        cells = []
+        ids = []
+        for offset in np.ndindex(2, 2, 2):
+            cell = np.minimum(low + offset, high)
+            cells.append(self.linear_index(cell))
+            ids.append(segment_ids[owner])
+
+        # Remove duplicates of the same cell and segment.
+        pairs = np.unique(np.stack((np.concatenate(cells), np.concatenate(ids))), axis=1)
+        return pairs[0], pairs[1]
+
+    def cell_of(self, points):
+        """
+        Gets integer cell coordinates of the points (can be outside of the grid).
+
+        :param points: np array (M, 3)
+
+        """
+        return np.floor((points - self.origin) / self.cell_size).astype(int)
+
+    def linear_index(self, cells):
+        """
+        Converts integer cell coordinates to the index of the cell.
+
+        :param cells: np array (M, 3) of cell coordinates inside the grid
+
+        """
+        cells = np.clip(cells, 0, self.shape - 1)
+        return (cells[:, 2] * self.shape[1] + cells[:, 1]) * self.shape[0] + cells[:, 0]
+
+    def cube_offsets(self, radius):
+        """
+        Gets cached integer offsets of all cells of the cube with the given radius.
+
+        :param radius: half edge of the cube in cells
+
+        """
+        if radius not in self.offsets:
+            axis = np.arange(-radius, radius + 1)
+            self.offsets[radius] = np.stack(np.meshgrid(axis, axis, axis, indexing='ij'), axis=-1).reshape(-1, 3)
+        return self.offsets[radius]
+
+    def segments_in_cube(self, center, radius):
+        """
+        Gets sorted unique indexes of segments bucketed in the cube of cells.
+
+        :param center: integer cell coordinates of the cube center
+        :param radius: half edge of the cube in cells
+
+        """
+        return self.segments_in_cubes(np.asarray(center)[None, :], radius)
+
+    def segments_in_cubes(self, centers, radius):
+        """
+        Gets sorted unique indexes of segments bucketed in the union of cubes of cells.
+
+        :param centers: np array (K, 3) of integer cell coordinates of the cube centers
+        :param radius: half edge of the cubes in cells
+
+        """
+        cube = (centers[:, None, :] + self.cube_offsets(radius)[None, :, :]).reshape(-1, 3)
+        inside = np.all((cube >= 0) & (cube < self.shape), axis=1)
+        cells = np.unique(self.linear_index(cube[inside]))
+
+        first = self.cell_start[cells]
+        counts = self.cell_start[cells + 1] - first
+        total = counts.sum()
+        if total == 0:
+            return np.empty(0, dtype=int)
+        items = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(total)
+        return np.unique(self.cell_segments[items])
+
+    def query(self, pnt, exclude=None):
+        """
+        Gets the nearest point of the path.
+
+        Returns the shortest distance, the nearest point and the index of the nearest segment.
+        When every segment is excluded, the distance is infinite and the rest is None.
+
+        :param pnt: free point [x, y, z]
+        :param exclude: (low, high) range of segment indexes to skip (Default value = None)
+
+        """
+        pnt = np.asarray(pnt, dtype=float)
+        center = self.cell_of(pnt[None, :])[0]
+
+        # Distance from the point to the walls of its own cell.
+        local = pnt - self.origin - center * self.cell_size
+        wall_dist = min(local.min(), (self.cell_size - local).min())
+
+        for radius in range(self.max_radius + 1):
+            covers_grid = np.all(center - radius <= 0) and np.all(center + radius >= self.shape - 1)
+            candidates = self.segments_in_cube(center, radius)
+            if exclude is not None:
+                candidates = candidates[(candidates < exclude[0]) | (candidates >= exclude[1])]
+            if len(candidates) == 0:
+                if covers_grid:
+                    break
+                continue
+
+            dist, nearest, index = self.geometry.nearest(pnt, candidates)
+
+            # No segment outside of the cube can be closer than the cube boundary.
+            if covers_grid or dist <= radius * self.cell_size + wall_dist:
+                return dist, nearest, index
+
+        candidates = np.arange(len(self.starts))
+        if exclude is not None:
+            candidates = candidates[(candidates < exclude[0]) | (candidates >= exclude[1])]
+        if len(candidates) == 0:
+            return math.inf, None, None
+        return self.geometry.nearest(pnt, candidates)
+
+    def query_batch(self, pnts):
+        """
+        Gets the nearest points of the path for many points at once.
+
+        Every radius evaluates the union of the cubes of all unresolved points in one batch.
+        The union contains the own cube of every point, so the stopping rule of ``query`` holds.
+        Returns np arrays of the shortest distances (K,), the nearest points (K, 3) and the
+        indexes of the nearest segments (K,).
+
+        :param pnts: np array (K, 3) of free points
+
+        """
+        pnts = np.asarray(pnts, dtype=float).reshape(-1, 3)
+        centers = self.cell_of(pnts)
+        local = pnts - self.origin - centers * self.cell_size
+        wall_dist = np.minimum(local.min(axis=1), (self.cell_size - local).min(axis=1))
+
+        dist = np.empty(len(pnts))
+        nearest = np.empty((len(pnts), 3))
+        index = np.empty(len(pnts), dtype=int)
+        pending = np.arange(len(pnts))
+        for radius in range(self.max_radius + 1):
+            if len(pending) == 0:
+                break
+            candidates = self.segments_in_cubes(centers[pending], radius)
+            if len(candidates) == 0:
+                continue
+            covers_grid = (np.all(centers[pending] - radius <= 0, axis=1)
+                           & np.all(centers[pending] + radius >= self.shape - 1, axis=1))
+            d, n, i = self.geometry.nearest_batch(pnts[pending], candidates)
+
+            # No segment outside of the own cube can be closer than the cube boundary.
+            done = covers_grid | (d <= radius * self.cell_size + wall_dist[pending])
+            dist[pending[done]], nearest[pending[done]], index[pending[done]] = d[done], n[done], i[done]
+            pending = pending[~done]
+
+        if len(pending) > 0:
+            dist[pending], nearest[pending], index[pending] = self.geometry.nearest_batch(pnts[pending])
+        return dist, nearest, index
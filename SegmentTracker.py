@@ -0,0 +1,99 @@
+"""
+Temporally coherent tracking of the nearest path segment.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+
+import numpy as np
+
+
+class SegmentTracker:
+    """
+    Tracks the nearest segment of the path between frames.
+
+    Between frames the drone moves just centimetres, so the nearest segment stays the same
+    or moves to the neighbour. Only a window of segments around the last nearest segment
+    is searched. Global search remembers the distance to the closest segment outside of the
+    window, so by the triangle inequality the window result is exact while
+    ``local distance < outside distance - distance moved since the global search``.
+    Otherwise the global search is repeated. Results are the same as the exhaustive scan.
+    """
+
+    def __init__(self, window=2):
+        """
+        :param window: number of segments searched on each side of the tracked segment
+
+        """
+        self.window = window
+
+        # State of the last global search.
+        self.path = None
+        self.version = None
+        self.anchor = None
+        self.low, self.high = 0, 0
+        self.outside_dist = 0
+
+        # Statistics.
+        self.local_searches = 0
+        self.global_searches = 0
+
+    def reset(self):
+        """ Forces global search in the next query. """
+        self.path = None
+
+    def query(self, pnt, path, grid=None):
+        """
+        Gets the nearest point of the path.
+
+        Returns the shortest distance, the nearest point and the index of the nearest segment.
+
+        :param pnt: free point [x, y, z]
+        :param path: object of ``Path``
+        :param grid: object ``SegmentGrid`` of the path used for global search (Default value = None)
+
+        """
+        pnt = np.asarray(pnt, dtype=float)
+        geometry = path.get_segment_geometry()
+
+        if self.path is path and self.version == path.segments_version:
+            moved = math.sqrt(np.dot(pnt - self.anchor, pnt - self.anchor))
+            dist, nearest, index = geometry.nearest(pnt, slice(self.low, self.high))
+            if dist < self.outside_dist - moved:
+                self.local_searches += 1
+                return dist, nearest, index
+
+        return self.search(pnt, path, geometry, grid)
+
+    def search(self, pnt, path, geometry, grid=None):
+        """
+        Global search, places the window around the nearest segment.
+
+        :param pnt: free point [x, y, z]
+        :param path: object of ``Path``
+        :param geometry: object ``SegmentGeometry`` of the path
+        :param grid: object ``SegmentGrid`` of the path (Default value = None)
+
+        """
+        self.global_searches += 1
+        if grid is not None:
+            dist, nearest, index = grid.query(pnt)
+        else:
+            dist_sq, nearest_points = geometry.nearest_all(pnt)
+            index = int(np.argmin(dist_sq))
+            dist, nearest = math.sqrt(dist_sq[index]), nearest_points[index]
+
+        self.low = max(index - self.window, 0)
+        self.high = min(index + self.window + 1, len(geometry))
+        if grid is not None:
+            self.outside_dist = grid.query(pnt, exclude=(self.low, self.high))[0]
+        else:
+            dist_sq[self.low:self.high] = math.inf
+            self.outside_dist = math.sqrt(dist_sq.min())
+
+        self.path = path
+        self.version = path.segments_version
+        self.anchor = pnt.copy()
+        return dist, nearest, index
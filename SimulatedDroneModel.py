@@ -0,0 +1,218 @@
+"""
+Drone model with simple kinematic simulation, runs without simulator or display.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import collections
+import time
+
+import numpy as np
+
+from AbstractDroneModel import AbstractDroneModel
+
+
+def velocity_response_step(positions, velocities, commanded_velocities, delta_time, response_time):
+    """
+    Advances positions and velocities in place, velocity follows the command as first-order response.
+
+    Works for one drone (vectors [x, y, z] and float delta_time) and for many drones at once
+    (np arrays (M, 3) and np array (M,) of delta times).
+
+    :param positions: np array (3,) or (M, 3) of positions in metres
+    :param velocities: np array (3,) or (M, 3) of velocities in m/s
+    :param commanded_velocities: np array (3,) or (M, 3) of commanded velocities in m/s
+    :param delta_time: seconds, float or np array (M,)
+    :param response_time: time constant of the velocity response in seconds
+
+    """
+    delta_time = np.asarray(delta_time, dtype=float)[..., None]
+    response = 1 - np.exp(-delta_time / response_time)
+    velocities += (commanded_velocities - velocities) * response
+    positions += velocities * delta_time
+
+
+class SimulatedDroneModel(AbstractDroneModel):
+    """Drone model with simulated first-order response of the velocity to the commands.
+
+    Velocity follows the commanded velocity with the time constant ``response_time``.
+    Commands can be delayed by ``latency`` and observed state can be delayed and noisy.
+    Simulation time advances by fixed ``time_step`` in every ``update``, so flights run
+    faster than real time. With ``time_step`` None it follows the wall clock.
+    Defaults are rough guesses of the AirSim quadcopter response, they were not fitted.
+    """
+
+    def __init__(self, surface, transformer, time_step=None, response_time=0.8, max_speed=10,
+                 takeoff_altitude=3.0, latency=0.0, position_noise=0.0, velocity_noise=0.0, seed=None):
+        """
+        :param surface: pygame surface for drawing, can be None
+        :param transformer: object ``Transformer``
+        :param time_step: seconds of simulation per update, None for wall clock (Default value = None)
+        :param response_time: time constant of the velocity response in seconds (Default value = 0.8)
+        :param max_speed: commands are limited to this speed in m/s (Default value = 10)
+        :param takeoff_altitude: altitude after takeoff in metres (Default value = 3.0)
+        :param latency: delay of the commands and of the observed state in seconds (Default value = 0.0)
+        :param position_noise: standard deviation of the observed position in metres (Default value = 0.0)
+        :param velocity_noise: standard deviation of the observed velocity in m/s (Default value = 0.0)
+        :param seed: seed of the noise generator (Default value = None)
+
+        """
+        AbstractDroneModel.__init__(self, surface, transformer)
+
+        self.time_step = time_step
+        self.response_time = response_time
+        self.max_speed = max_speed
+        self.takeoff_altitude = takeoff_altitude
+        self.latency = latency
+        self.position_noise = position_noise
+        self.velocity_noise = velocity_noise
+        self.rng = np.random.default_rng(seed)
+
+        # Simulation time in seconds.
+        self.time = 0.0
+        self.wall_time = None
+
+        # True state, ``position`` and ``speed`` are the observed state.
+        self.true_position = np.zeros(3)
+        self.true_velocity = np.zeros(3)
+        self.yaw_rate = 0.0
+        self.commanded_velocity = np.zeros(3)
+
+        # Commands waiting for the latency and history of the true state for delayed observation.
+        self.pending_commands = collections.deque()
+        self.history = collections.deque()
+
+        self.updates = 0
+
+    def connect(self):
+        """Nothing to connect, the simulation is local."""
+        self.home = list(self.transform.center_latlon)
+
+    def takeoff(self):
+        """Moves the drone to ``takeoff_altitude``."""
+        self.true_position[2] = max(self.true_position[2], self.takeoff_altitude)
+        self.in_air = True
+
+    def land(self):
+        """Puts the drone to the ground and stops it."""
+        self.true_position[2] = 0
+        self.true_velocity[:] = 0
+        self.commanded_velocity[:] = 0
+        self.in_air = False
+
+    def reset(self, position=(0, 0, 0), velocity=(0, 0, 0)):
+        """Sets the true state and restarts the simulation time.
+
+        :param position: vector [x, y, z] in metres (Default value = (0, 0, 0))
+        :param velocity: vector [x, y, z] in m/s (Default value = (0, 0, 0))
+
+        """
+        self.time = 0.0
+        self.wall_time = None
+        self.true_position = np.array(position, dtype=float)
+        self.true_velocity = np.array(velocity, dtype=float)
+        self.commanded_velocity = np.zeros(3)
+        self.yaw_rate = 0.0
+        self.yaw = 0
+        self.pending_commands.clear()
+        self.history.clear()
+        self.position = self.true_position.copy()
+        self.speed = self.true_velocity.copy()
+        self.in_air = self.true_position[2] > 0
+
+    def map_joystick_to_speed(self, joystick):
+        """Maps input vector from the joystick controller to the command vector, same as in ``AirSimDroneModel``.
+
+        :param joystick: list of 4 floats
+
+        """
+        joystick = list(map(lambda x: 0 if abs(x) < 0.1 else x, joystick))
+        joystick = [joystick[0], -1 * joystick[1], joystick[2], -1 * joystick[3]]
+        left_right = int(joystick[2] * self.joystick_mapping)
+        fwd_back = int(joystick[3] * self.joystick_mapping)
+        up_down = int(joystick[1] * self.joystick_mapping)
+        yaw = int(joystick[0] * self.joystick_mapping)
+
+        return left_right, fwd_back, up_down, yaw * 10
+
+    def clock(self):
+        """Gets simulation time in seconds, used as the clock of ``Logger``."""
+        return self.time
+
+    def display_video(self):
+        """There is no camera in the simulation."""
+        pass
+
+    def take_photo(self):
+        """There is no camera in the simulation."""
+        pass
+
+    def step(self, delta_time):
+        """Advances the simulation.
+
+        :param delta_time: seconds
+
+        """
+        self.time += delta_time
+        while self.pending_commands and self.pending_commands[0][0] <= self.time:
+            _, self.commanded_velocity, self.yaw_rate = self.pending_commands.popleft()
+
+        if self.in_air:
+            velocity_response_step(self.true_position, self.true_velocity, self.commanded_velocity,
+                                   delta_time, self.response_time)
+            self.yaw = (self.yaw + self.yaw_rate * delta_time + 180) % 360 - 180
+
+            # Ground.
+            if self.true_position[2] < 0:
+                self.true_position[2] = 0
+                self.true_velocity[2] = max(self.true_velocity[2], 0)
+
+        if self.latency > 0:
+            self.history.append((self.time, self.true_position.copy(), self.true_velocity.copy()))
+            while len(self.history) > 1 and self.history[1][0] <= self.time - self.latency:
+                self.history.popleft()
+
+    def update(self):
+        """Advances the simulation and observes the state.
+
+        Update here:
+
+        ``self.yaw``, ``self.speed``, ``self.position``
+
+        """
+        if self.time_step is not None:
+            self.step(self.time_step)
+        else:
+            now = time.perf_counter()
+            if self.wall_time is not None:
+                self.step(now - self.wall_time)
+            self.wall_time = now
+        self.updates += 1
+
+        if self.latency > 0 and self.history:
+            _, position, velocity = self.history[0]
+        else:
+            position, velocity = self.true_position, self.true_velocity
+
+        self.position = position.copy()
+        self.speed = velocity.copy()
+        if self.position_noise > 0:
+            self.position += self.rng.normal(0, self.position_noise, 3)
+        if self.velocity_noise > 0:
+            self.speed += self.rng.normal(0, self.velocity_noise, 3)
+
+    def move(self, command, delta_time):
+        """Sends velocity command, it takes effect after ``latency``.
+
+        :param command: list of 4 floats [x_speed, y_speed, z_speed, yaw]
+        :param delta_time: time from previous update (not used)
+
+        """
+        velocity = np.array(command[:3], dtype=float)
+        speed = np.linalg.norm(velocity)
+        if speed > self.max_speed:
+            velocity *= self.max_speed / speed
+        self.pending_commands.append((self.time + self.latency, velocity, float(command[3])))
+        if self.latency <= 0:
+            self.step(0)
@@ -0,0 +1,100 @@
+"""
+Background fetching of the drone state.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import threading
+import time
+
+
+class TelemetryFetcher:
+    """
+    Thread which keeps the latest timestamped state snapshot of the drone ready.
+
+    The control loop reads the snapshot without blocking, so the round trip to the
+    simulator overlaps with computation. The thread uses its own connection, clients
+    of the simulator are not shared between threads.
+    """
+
+    def __init__(self, connect, fetch, rate=100):
+        """
+        :param connect: function called in the thread, returns connection for ``fetch``
+        :param fetch: function fetch(connection) returning the state snapshot
+        :param rate: maximal number of fetches per second, None for back-to-back fetching (Default value = 100)
+
+        """
+        self.connect = connect
+        self.fetch = fetch
+        self.period = 1 / rate if rate else 0
+        self.connection = None
+
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.running = False
+        self.thread = None
+
+        # Latest snapshot, its timestamp (time.perf_counter in the middle of the round trip)
+        # and number of fetched snapshots.
+        self.state = None
+        self.timestamp = None
+        self.sequence = 0
+        self.error = None
+
+    def start(self):
+        """ Starts the thread. """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='telemetry', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stops the thread.
+
+        :param timeout: seconds to wait for the thread (Default value = 1.0)
+
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def run(self):
+        """ Fetches snapshots until stopped. """
+        try:
+            self.connection = self.connect()
+            next_time = time.perf_counter()
+            while self.running:
+                start = time.perf_counter()
+                state = self.fetch(self.connection)
+                end = time.perf_counter()
+                with self.lock:
+                    self.state = state
+                    self.timestamp = (start + end) / 2
+                    self.sequence += 1
+                self.ready.set()
+
+                next_time = max(next_time + self.period, end)
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            self.error = e
+            self.running = False
+            self.ready.set()
+            print("Telemetry stopped:", e)
+
+    def latest(self):
+        """ Gets the latest (state, timestamp, sequence), state is None before the first fetch. """
+        with self.lock:
+            return self.state, self.timestamp, self.sequence
+
+    def wait_ready(self, timeout=None):
+        """
+        Blocks until the first snapshot is fetched.
+
+        :param timeout: seconds (Default value = None)
+
+        """
+        return self.ready.wait(timeout)
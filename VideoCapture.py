@@ -0,0 +1,158 @@
+"""
+Background capture of the camera video of the drone.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import collections
+import threading
+import time
+
+import numpy as np
+import pygame
+
+
+class VideoCapture:
+    """
+    Thread which fetches camera frames into a double buffer, keeping just the latest frame.
+
+    The thread fills the back buffer and swaps it with the front one, the render loop
+    copies the front buffer to a reused surface only when a new frame is ready. Frame
+    replaced before it was drawn is counted as dropped. The thread uses its own
+    connection, clients of the simulator are not shared between threads.
+    """
+
+    def __init__(self, connect, fetch, rate=30):
+        """
+        :param connect: function called in the thread, returns connection for ``fetch``
+        :param fetch: function fetch(connection) returning np array (height, width, 3) of BGR uint8 or None
+        :param rate: maximal number of fetches per second, None for back-to-back fetching (Default value = 30)
+
+        """
+        self.connect = connect
+        self.fetch = fetch
+        self.period = 1 / rate if rate else 0
+        self.connection = None
+
+        self.lock = threading.Lock()
+        self.running = False
+        self.thread = None
+
+        # Double buffer, the thread writes to ``back`` only.
+        self.front = None
+        self.back = None
+        self.front_sequence = 0
+
+        # Surface with the last drawn frame.
+        self.surface = None
+        self.drawn_sequence = 0
+
+        # Statistics.
+        self.fetched = 0
+        self.drawn = 0
+        self.dropped = 0
+        self.fetch_times = collections.deque(maxlen=30)
+        self.error = None
+
+    def start(self):
+        """ Starts the thread. """
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name='video', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """
+        Stops the thread.
+
+        :param timeout: seconds to wait for the thread (Default value = 1.0)
+
+        """
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout)
+            self.thread = None
+
+    def run(self):
+        """ Fetches frames until stopped. """
+        try:
+            self.connection = self.connect()
+            next_time = time.perf_counter()
+            while self.running:
+                frame = self.fetch(self.connection)
+                if frame is not None:
+                    self.store(frame)
+
+                end = time.perf_counter()
+                next_time = max(next_time + self.period, end)
+                delay = next_time - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+        except Exception as e:
+            self.error = e
+            self.running = False
+            print("Video stopped:", e)
+
+    def store(self, frame):
+        """
+        Copies the frame to the back buffer and swaps the buffers.
+
+        :param frame: np array (height, width, 3) of BGR uint8
+
+        """
+        if self.back is None or self.back.shape != frame.shape:
+            self.back = np.empty_like(frame)
+        np.copyto(self.back, frame)
+
+        with self.lock:
+            self.front, self.back = self.back, self.front
+            if self.front_sequence > self.drawn_sequence:
+                self.dropped += 1
+            self.fetched += 1
+            self.front_sequence = self.fetched
+            self.fetch_times.append(time.perf_counter())
+
+    def fps(self):
+        """ Gets frames fetched per second over the last frames. """
+        times = list(self.fetch_times)
+        if len(times) < 2 or times[-1] == times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def draw(self, surface, xy):
+        """
+        Blits the newest frame, the front buffer is copied only when it changed.
+
+        :param surface: pygame surface
+        :param xy: list of two ints, top left corner
+
+        """
+        with self.lock:
+            if self.front is not None and self.front_sequence > self.drawn_sequence:
+                self.surface = self.to_surface(self.front, self.surface)
+                self.drawn_sequence = self.front_sequence
+                self.drawn += 1
+        if self.surface is not None:
+            surface.blit(self.surface, xy)
+
+    @staticmethod
+    def to_surface(frame, surface=None):
+        """
+        Copies BGR frame to the surface, the surface is reused when its size fits.
+
+        Returns the surface.
+
+        :param frame: np array (height, width, 3) of BGR uint8
+        :param surface: surface from the previous call (Default value = None)
+
+        """
+        height, width, _ = frame.shape
+        if surface is None or surface.get_size() != (width, height):
+            # 24-bit surface stores pixels as BGR bytes, so the copy below is a plain memory copy.
+            surface = pygame.Surface((width, height), depth=24)
+
+        # Surface is indexed [x, y] and BGR is reversed to RGB, both just change strides of the view.
+        pixels = pygame.surfarray.pixels3d(surface)
+        pixels[...] = frame.swapaxes(0, 1)[:, :, ::-1]
+        del pixels
+        return surface
@@ -0,0 +1,130 @@
+"""
+Script for measuring the RPC overhead of ``AirSimDroneModel`` against the local AirSim stub.
+
+The stub server (``AirSimStubServer.py``) runs in its own process, so it does not share
+the interpreter with the measured client. Every tick updates the drone state and sends
+a velocity command as the main loop does; camera frames and plotting of the path are
+added every few ticks. Ticks per second and per-method statistics of ``RpcMonitor``
+are printed, so changes of the RPC usage can be compared with the same latency.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+
+import pygame
+
+from AirSimDroneModel import AirSimDroneModel
+from replay_flights import load_mission
+
+
+def start_stub(port, home, latency_ms, jitter_ms, image_size=(256, 144), timeout=10.0):
+    """
+    Starts the stub server in a new process and waits until it listens.
+
+    :param port: port of the server
+    :param home: list (latitude, longitude, altitude) of the home point
+    :param latency_ms: delay of every response in milliseconds
+    :param jitter_ms: maximal random addition to the delay in milliseconds
+    :param image_size: tuple (width, height) of the camera images (Default value = (256, 144))
+    :param timeout: seconds to wait for the server (Default value = 10.0)
+
+    """
+    process = subprocess.Popen([sys.executable, 'AirSimStubServer.py', '--port', str(port),
+                                '--home', *map(str, home),
+                                '--latency', str(latency_ms), '--jitter', str(jitter_ms),
+                                '--width', str(image_size[0]), '--height', str(image_size[1])])
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("AirSim stub did not start on port {}".format(port))
+
+
+def run_ticks(drone, path, ticks, video_every=0, plot_every=0, rate=0):
+    """
+    Runs ticks of the main loop without the corrector and GUI, returns elapsed seconds.
+
+    :param drone: connected object ``AirSimDroneModel``
+    :param path: object ``Path`` plotted to the simulator
+    :param ticks: number of ticks
+    :param video_every: fetch camera frame every n ticks, 0 for never (Default value = 0)
+    :param plot_every: plot path every n ticks, 0 for never (Default value = 0)
+    :param rate: ticks per second, 0 for back-to-back ticks (Default value = 0)
+
+    """
+    period = 1 / rate if rate else 0
+    mouse = [drone.transform.width // 2, drone.transform.height // 2]
+    start = time.perf_counter()
+    for tick in range(ticks):
+        drone.update()
+        drone.move((1, 1, 0, 0), 0.02)
+        if video_every and tick % video_every == 0:
+            drone.display_video()
+        if plot_every and tick % plot_every == 0:
+            drone.plot_to_airsim(path, mouse)
+        if period:
+            delay = start + (tick + 1) * period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measures RPC overhead of the drone model against the AirSim stub.')
+    parser.add_argument('--mission', default='missions/test1-14-04-2022_13-51-55.json', help='mission json')
+    parser.add_argument('--port', type=int, default=41452, help='port of the stub')
+    parser.add_argument('--external', action='store_true', help='use already running stub or simulator')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of every response of the stub in ms')
+    parser.add_argument('--jitter', type=float, default=0.0, help='random addition to the delay in ms')
+    parser.add_argument('--ticks', type=int, default=2000, help='number of measured ticks')
+    parser.add_argument('--rate', type=float, default=0, help='ticks per second, 0 for back-to-back')
+    parser.add_argument('--video-every', type=int, default=0, help='fetch camera frame every n ticks')
+    parser.add_argument('--plot-every', type=int, default=0, help='plot path every n ticks')
+    parser.add_argument('--telemetry', action='store_true', help='fetch state in the background thread')
+    parser.add_argument('--video-thread', action='store_true', help='capture video in the background thread')
+    parser.add_argument('--width', type=int, default=256, help='width of the camera images of the stub')
+    parser.add_argument('--height', type=int, default=144, help='height of the camera images of the stub')
+    args = parser.parse_args()
+
+    path, transformer = load_mission(args.mission)
+    home = list(transformer.center_latlon) + [0.0]
+    process = None if args.external else start_stub(args.port, home, args.latency, args.jitter,
+                                                    (args.width, args.height))
+    try:
+        surface = pygame.Surface((transformer.width, transformer.height))
+        drone = AirSimDroneModel(surface, transformer, port=args.port)
+        drone.connect()
+        drone.takeoff()
+        if args.telemetry:
+            drone.start_telemetry()
+            drone.telemetry.wait_ready()
+        if args.video_thread:
+            drone.start_video()
+        drone.client.reset()
+
+        elapsed = run_ticks(drone, path, args.ticks, args.video_every, args.plot_every, args.rate)
+
+        print("\n{} ticks in {:.2f} s, {:.1f} ticks/s, {:.3f} ms/tick".format(
+            args.ticks, elapsed, args.ticks / elapsed, elapsed / args.ticks * 1000))
+        drone.client.print_report(args.ticks)
+        if drone.telemetry is not None:
+            print("telemetry snapshots: {}".format(drone.telemetry.sequence))
+            drone.stop_telemetry()
+        if drone.video is not None:
+            print("video: {} fetched, {} drawn, {} dropped, {:.1f} FPS".format(
+                drone.video.fetched, drone.video.drawn, drone.video.dropped, drone.video.fps()))
+            drone.stop_video()
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
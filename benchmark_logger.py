@@ -0,0 +1,114 @@
+"""
+Microbenchmark of recording the flight log.
+
+Compares the former list of dicts (``Logger.get_log_dict`` appended every frame)
+with ``FlightRecorder`` used by ``Logger.log``. Time per record is measured with
+the update of the logger included and memory per record with tracemalloc.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+
+from Logger import Logger
+
+
+def fake_state(seed=0):
+    """
+    Gets drone and corrector with values of the attributes read by ``Logger.update``.
+
+    :param seed: seed of the values (Default value = 0)
+
+    """
+    rng = np.random.default_rng(seed)
+    drone = SimpleNamespace(position=rng.normal(size=3), speed=rng.normal(size=3),
+                            GPS=SimpleNamespace(latitude=49.2, longitude=16.6, altitude=230.0),
+                            pitch=0.1, roll=0.2, yaw=30.0)
+    corrector = SimpleNamespace(command=[1, 2, 0], safe_command=rng.normal(size=3),
+                                nearest_point=rng.normal(size=3), gain_command_power=rng.normal(size=3),
+                                gain_present_correction_power=rng.normal(size=3),
+                                gain_future_correction_power=rng.normal(size=3))
+    return drone, corrector
+
+
+def record_dicts(logger, drone, corrector, frames):
+    """
+    Former recording, returns the list of dicts.
+
+    The update records the frame, the dict is built from it. Frames are dropped after every
+    chunk, so just the dicts are kept.
+
+    :param logger: object ``Logger``
+    :param drone: drone
+    :param corrector: corrector
+    :param frames: number of frames
+
+    """
+    data = []
+    for _ in range(frames):
+        logger.update(drone, corrector)
+        data.append(logger.get_log_dict())
+        if len(logger.recorder) == logger.recorder.chunk_size:
+            logger.recorder.clear()
+    return data
+
+
+def record_columns(logger, drone, corrector, frames):
+    """
+    Recording by ``Logger.log``, returns the recorder.
+
+    :param logger: object ``Logger``
+    :param drone: drone
+    :param corrector: corrector
+    :param frames: number of frames
+
+    """
+    logger.is_logging = True
+    for _ in range(frames):
+        logger.log(drone, corrector)
+    return logger.recorder
+
+
+def measure(function, frames):
+    """
+    Gets microseconds and bytes per record.
+
+    :param function: function(logger, drone, corrector, frames)
+    :param frames: number of frames
+
+    """
+    drone, corrector = fake_state()
+
+    logger = Logger(1, 2)
+    gc.collect()
+    start = time.perf_counter()
+    result = function(logger, drone, corrector, frames)
+    elapsed = time.perf_counter() - start
+    del result
+
+    logger = Logger(1, 2)
+    gc.collect()
+    tracemalloc.start()
+    result = function(logger, drone, corrector, frames)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return elapsed / frames * 1e6, current / frames
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measures time and memory per record of the flight log.')
+    parser.add_argument('--frames', type=int, default=180000, help='number of records, 1 hour at 50 Hz by default')
+    args = parser.parse_args()
+
+    for name, function in [("list of dicts", record_dicts), ("columnar recorder", record_columns)]:
+        us, size = measure(function, args.frames)
+        print("{:20} {:8.2f} us/record {:8.0f} B/record {:8.1f} MB total".format(
+            name, us, size, size * args.frames / 1e6))
@@ -0,0 +1,101 @@
+"""
+Script for benchmarking the corrector and the logger in closed-loop flights without the simulator.
+
+Logged pilot commands of the recorded flights are replayed to ``SimulatedDroneModel``
+through the same steps as in the main loop of the app: update of the drone, corrector,
+move and logging. Simulation time advances by the control period, so flights run
+faster than real time. Flights per minute and summaries of the flights are printed.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import glob
+import time
+
+import numpy as np
+import pandas as pd
+
+from Corrector import Corrector
+from Logger import Logger
+from SimulatedDroneModel import SimulatedDroneModel
+from replay_flights import INPUT_FIELDS, load_mission
+from utils import map_vec3_to_int_list
+
+
+def simulate_flight(drone, corrector, path, logger, times, commands, start_position, control_rate=50):
+    """
+    Flies one flight with the logged pilot commands and returns its summary.
+
+    :param drone: object ``SimulatedDroneModel``
+    :param corrector: object ``Corrector``
+    :param path: object ``Path``
+    :param logger: object ``Logger`` using ``drone.clock``
+    :param times: np array (T,) of times of the logged commands in seconds
+    :param commands: np array (T, 3) of the logged pilot commands
+    :param start_position: vector [x, y, z] of the first logged position
+    :param control_rate: updates per second (Default value = 50)
+
+    """
+    drone.time_step = 1 / control_rate
+    drone.reset(start_position)
+    logger.reset_logging()
+    logger.is_logging = True
+
+    times = times - times[0]
+    for k in range(int(times[-1] * control_rate) + 1):
+        drone.update()
+        command_speed = commands[min(np.searchsorted(times, drone.time, side='right'), len(times)) - 1]
+        save_command_speed = corrector.adjust_command(drone.position, drone.speed, command_speed, path)
+        left_right, fwd_back, up_down = map_vec3_to_int_list(save_command_speed[:3])
+        drone.move((left_right, fwd_back, up_down, 0), drone.time_step)
+        logger.log(drone, corrector)
+
+    d = logger.recorder.column('d').tolist()
+    fly_time_s = logger.recorder.column('fly_time_s').tolist()
+    summary = Logger.compute_summary(d, fly_time_s, logger.free_range, logger.warning_range)
+    summary['fly_time_s'] = fly_time_s[-1]
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmarks closed-loop flights with the simulated drone.')
+    parser.add_argument('--logs', default='logs/test_users/*/*/log.csv', help='glob of the flight logs')
+    parser.add_argument('--mission', default='missions/test1-14-04-2022_13-51-55.json', help='mission json')
+    parser.add_argument('--repeat', type=int, default=1, help='number of flights per log')
+    parser.add_argument('--rate', type=float, default=50, help='control rate in Hz')
+    parser.add_argument('--response-time', type=float, default=0.8, help='time constant of the drone in seconds')
+    parser.add_argument('--latency', type=float, default=0.0, help='latency of the commands and state in seconds')
+    parser.add_argument('--position-noise', type=float, default=0.0, help='noise of the position in metres')
+    parser.add_argument('--velocity-noise', type=float, default=0.0, help='noise of the velocity in m/s')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the noise')
+    args = parser.parse_args()
+
+    path, transformer = load_mission(args.mission)
+    corrector = Corrector(None, transformer)
+    drone = SimulatedDroneModel(None, transformer, response_time=args.response_time, latency=args.latency,
+                                position_noise=args.position_noise, velocity_noise=args.velocity_noise,
+                                seed=args.seed)
+    drone.connect()
+    logger = Logger(corrector.free_range, corrector.warning_range, clock=drone.clock)
+
+    log_filenames = sorted(glob.glob(args.logs))
+    flights = [pd.read_csv(f, skipinitialspace=True, usecols=INPUT_FIELDS) for f in log_filenames]
+
+    summaries = []
+    simulated_time = 0
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for df in flights:
+            summaries.append(simulate_flight(drone, corrector, path, logger, df['fly_time_s'].to_numpy(),
+                                             df[['cx', 'cy', 'cz']].to_numpy(dtype=float),
+                                             df[['x', 'y', 'z']].to_numpy(dtype=float)[0], args.rate))
+            simulated_time += drone.time
+    elapsed = time.perf_counter() - start
+
+    table = pd.DataFrame(summaries)
+    print(table[['fly_time_s', '% time_out_warning_zone', 'warning_zone_left_count', 'mean_d', 'maximum_d']]
+          .describe().to_string())
+    print("\n{} flights in {:.1f} s, {:.1f} flights/min, {:.0f}x real time".format(
+        len(summaries), elapsed, len(summaries) / elapsed * 60, simulated_time / elapsed))
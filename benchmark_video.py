@@ -0,0 +1,109 @@
+"""
+Script for measuring frames per second of the camera video of ``AirSimDroneModel``.
+
+Compares the former frame path (compressed PNG from ``simGetImage``, decoded, converted
+and made into a new surface every frame) with ``display_video`` (uncompressed frame from
+``simGetImages`` copied once into a reused surface). Both are measured end to end against
+the AirSim stub and also just the processing of an already received frame.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import time
+
+import airsim
+import cv2
+import numpy as np
+import pygame
+
+from AirSimDroneModel import AirSimDroneModel
+from Transformer import Transformer
+from VideoCapture import VideoCapture
+from benchmark_airsim_rpc import start_stub
+
+
+def show_png(drone, result):
+    """
+    Former processing of the compressed frame, kept for comparison.
+
+    :param drone: object ``AirSimDroneModel``
+    :param result: PNG bytes from ``simGetImage``
+
+    """
+    rawImage = np.frombuffer(result, np.int8).copy()
+    frame = cv2.imdecode(rawImage, cv2.IMREAD_UNCHANGED)
+    frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    frame = frame.swapaxes(0, 1)
+    frame = pygame.surfarray.make_surface(frame)
+    drone.surface.blit(frame, (10, 350))
+
+
+def display_video_png(drone):
+    """
+    Former ``display_video``.
+
+    :param drone: object ``AirSimDroneModel``
+
+    """
+    show_png(drone, drone.client.simGetImage("0", airsim.ImageType.Scene))
+
+
+def measure(function, frames):
+    """
+    Gets frames per second and mean milliseconds per frame.
+
+    :param function: function called once per frame
+    :param frames: number of frames
+
+    """
+    function()
+    start = time.perf_counter()
+    for _ in range(frames):
+        function()
+    elapsed = time.perf_counter() - start
+    return frames / elapsed, elapsed / frames * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measures FPS of the camera video against the AirSim stub.')
+    parser.add_argument('--port', type=int, default=41453, help='port of the stub')
+    parser.add_argument('--external', action='store_true', help='use already running stub or simulator')
+    parser.add_argument('--width', type=int, default=1280, help='width of the camera images of the stub')
+    parser.add_argument('--height', type=int, default=720, help='height of the camera images of the stub')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of every response of the stub in ms')
+    parser.add_argument('--frames', type=int, default=200, help='number of measured frames')
+    args = parser.parse_args()
+
+    transformer = Transformer(1000, 1000, 17, [49.2267, 16.5970])
+    home = list(transformer.center_latlon) + [0.0]
+    process = None if args.external else start_stub(args.port, home, args.latency, 0,
+                                                    (args.width, args.height))
+    try:
+        drone = AirSimDroneModel(pygame.Surface((transformer.width, transformer.height)), transformer,
+                                 port=args.port)
+        drone.connect()
+
+        png = drone.client.simGetImage("0", airsim.ImageType.Scene)
+        response = drone.client.simGetImages(drone.video_request)[0]
+        frame = np.frombuffer(response.image_data_uint8, np.uint8).reshape(response.height, response.width, 3)
+
+        def show_raw():
+            drone.video_surface = VideoCapture.to_surface(frame, drone.video_surface)
+            drone.surface.blit(drone.video_surface, (10, 350))
+
+        print("frame {}x{}, PNG {} kB, raw {} kB".format(response.width, response.height,
+                                                          len(png) // 1024, len(response.image_data_uint8) // 1024))
+        rows = [
+            ("before: simGetImage + imdecode", measure(lambda: display_video_png(drone), args.frames)),
+            ("after: simGetImages raw", measure(drone.display_video, args.frames)),
+            ("before: processing only", measure(lambda: show_png(drone, png), args.frames)),
+            ("after: processing only", measure(show_raw, args.frames)),
+        ]
+        for name, (fps, ms) in rows:
+            print("{:32} {:8.1f} FPS {:8.3f} ms/frame".format(name, fps, ms))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
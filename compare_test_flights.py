@@ -10,7 +10,7 @@ import os
 import csv
 import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
+from BinaryFlightLog import BinaryFlightLog
 from pathlib import Path
 
 # Selected flights from folder "safe_flight_assistant/logs/test_users/"
@@ -152,10 +152,8 @@ if __name__ == "__main__":
                 writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
                 writer.writerow(useful_data)
 
-            # Read flight log.
-            fields = 'date,fly_time,fly_time_s,x,y,z,z_max,vx,vy,vz,vx_max,vy_max,vz_max,latitude,longitude,altitude,pitch,roll,yaw,cx,cy,cz,scx,scy,scz,d,dx,dy,dz,gc_pow_x,gc_pow_y,gc_pow_z,gpc_pow_x,gpc_pow_y,gpc_pow_z,gfc_pow_x,gfc_pow_y,gfc_pow_z'.split(
-                ',')
-            df = pd.read_csv(path + '/log.csv', skipinitialspace=True, usecols=fields)
+            # Read flight log, binary when converted (convert_logs.py), log.csv otherwise.
+            df = BinaryFlightLog.load(path)
             test_user_flight_logs[-1]['log'] = df
 
             # Plot absolut distance from the path.
@@ -0,0 +1,63 @@
+"""
+Script for converting flight logs (log.csv) to the binary log.
+
+The binary log is saved to the ``log`` folder next to log.csv, where it is found by
+``BinaryFlightLog.load``. Reading of the distance column from both formats is timed.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from BinaryFlightLog import BinaryFlightLog, LOG_FOLDER
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Converts flight logs to the binary log.')
+    parser.add_argument('--logs', default='logs/test_users/*/*/log.csv', help='glob of the flight logs')
+    parser.add_argument('--mission', default='missions/test1-14-04-2022_13-51-55.json',
+                        help='mission json stored in the header')
+    parser.add_argument('--free-range', type=float, default=1, help='free range stored in the header')
+    parser.add_argument('--warning-range', type=float, default=2, help='warning range stored in the header')
+    parser.add_argument('--output', default=None,
+                        help='output folder keeping the tester/flight structure, next to log.csv by default')
+    args = parser.parse_args()
+
+    # Gains of the corrector are not in log.csv.
+    header = {'mission': args.mission, 'free_range': args.free_range, 'warning_range': args.warning_range,
+              'gains': None}
+
+    total_csv, total_binary = 0.0, 0.0
+    for log_filename in sorted(glob.glob(args.logs)):
+        flight_folder = os.path.dirname(log_filename)
+        if args.output is None:
+            output_folder = flight_folder
+        else:
+            test_user, flight_name = os.path.basename(os.path.dirname(flight_folder)), os.path.basename(flight_folder)
+            output_folder = os.path.join(args.output, test_user, flight_name)
+        BinaryFlightLog.from_csv(log_filename, os.path.join(output_folder, LOG_FOLDER), header)
+
+        start = time.perf_counter()
+        d_csv = pd.read_csv(log_filename, skipinitialspace=True, usecols=['d'])['d'].to_numpy()
+        csv_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        log = BinaryFlightLog.load(output_folder)
+        # Copy reads the whole column from the memory mapped file.
+        d_binary = np.array(log['d'])
+        binary_time = time.perf_counter() - start
+
+        total_csv += csv_time
+        total_binary += binary_time
+        print("{}: {} frames, d equal: {}, csv {:.2f} ms, binary {:.2f} ms".format(
+            output_folder, len(log), bool((d_csv == d_binary).all()), csv_time * 1e3, binary_time * 1e3))
+
+    if total_binary > 0:
+        print("\nReading d: csv {:.1f} ms, binary {:.1f} ms, {:.0f}x faster".format(
+            total_csv * 1e3, total_binary * 1e3, total_csv / total_binary))
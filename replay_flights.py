@@ -0,0 +1,132 @@
+"""
+Script for replaying recorded flights through the corrector without the simulator.
+
+Every log is streamed in chunks through ``Corrector.adjust_commands``, recomputed
+safe commands, distances and gain powers are saved and compared with the logged ones.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from pathlib import Path as FilePath
+
+import numpy as np
+import pandas as pd
+
+from Corrector import Corrector
+from Path import Path
+from Transformer import Transformer
+
+# Columns read from the flight log.
+INPUT_FIELDS = ['fly_time_s', 'x', 'y', 'z', 'vx', 'vy', 'vz', 'cx', 'cy', 'cz']
+
+# Columns recomputed by the corrector, same names as in the flight log.
+OUTPUT_FIELDS = ['scx', 'scy', 'scz', 'd', 'dx', 'dy', 'dz',
+                 'gc_pow_x', 'gc_pow_y', 'gc_pow_z',
+                 'gpc_pow_x', 'gpc_pow_y', 'gpc_pow_z',
+                 'gfc_pow_x', 'gfc_pow_y', 'gfc_pow_z']
+
+
+def load_mission(filename):
+    """
+    Loads path and its transformer from the mission json.
+
+    :param filename: path to the mission json
+
+    """
+    with open(filename) as f:
+        data = json.load(f)
+    header = data[0]
+    transformer = Transformer(header["transformer.width"], header["transformer.height"],
+                              header["transformer.zoom"], header["transformer.center_latlon"])
+    path = Path(transformer)
+    path.load_path_json(data)
+    return path, transformer
+
+
+def replay_chunk(corrector, path, df):
+    """
+    Recomputes output columns for one chunk of the flight log.
+
+    :param corrector: object ``Corrector``
+    :param path: object ``Path``
+    :param df: pandas DataFrame with ``INPUT_FIELDS``
+
+    """
+    locations = df[['x', 'y', 'z']].to_numpy(dtype=float)
+    velocities = df[['vx', 'vy', 'vz']].to_numpy(dtype=float)
+    commands = df[['cx', 'cy', 'cz']].to_numpy(dtype=float)
+    safe_commands, nearest_points, dist, gc_pow, gpc_pow, gfc_pow = corrector.adjust_commands(
+        locations, velocities, commands, path)
+
+    columns = np.column_stack((safe_commands, dist, nearest_points - locations, gc_pow, gpc_pow, gfc_pow))
+    result = pd.DataFrame(columns, columns=OUTPUT_FIELDS, index=df.index)
+    result.insert(0, 'fly_time_s', df['fly_time_s'].to_numpy())
+    return result
+
+
+def replay_flight(log_filename, corrector, path, output_filename=None, chunk_size=10000):
+    """
+    Streams one flight log through the corrector.
+
+    Returns number of samples, replay time in seconds and maximal absolute
+    difference of the distance ``d`` from the logged one.
+
+    :param log_filename: path to the log.csv
+    :param corrector: object ``Corrector``
+    :param path: object ``Path``
+    :param output_filename: path to the csv with recomputed columns (Default value = None, not saved)
+    :param chunk_size: number of rows processed at once (Default value = 10000)
+
+    """
+    samples, elapsed, max_d_diff = 0, 0.0, 0.0
+    header = True
+    for df in pd.read_csv(log_filename, skipinitialspace=True, usecols=INPUT_FIELDS + ['d'], chunksize=chunk_size):
+        start = time.perf_counter()
+        result = replay_chunk(corrector, path, df)
+        elapsed += time.perf_counter() - start
+
+        samples += len(df)
+        if len(df) > 0:
+            max_d_diff = max(max_d_diff, float(np.abs(result['d'] - df['d']).max()))
+        if output_filename is not None:
+            result.to_csv(output_filename, mode='w' if header else 'a', header=header, index=False)
+            header = False
+    return samples, elapsed, max_d_diff
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Replays recorded flights through the corrector.')
+    parser.add_argument('--logs', default='logs/test_users/*/*/log.csv', help='glob of the flight logs')
+    parser.add_argument('--mission', default='missions/test1-14-04-2022_13-51-55.json', help='mission json')
+    parser.add_argument('--output', default='logs/test_users_results/replay', help='output folder')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='rows processed at once')
+    args = parser.parse_args()
+
+    path, transformer = load_mission(args.mission)
+    corrector = Corrector(None, transformer)
+
+    total_samples, total_elapsed = 0, 0.0
+    for log_filename in sorted(glob.glob(args.logs)):
+        # Output keeps the tester/flight structure of the logs.
+        flight_folder = os.path.dirname(log_filename)
+        test_user, flight_name = os.path.basename(os.path.dirname(flight_folder)), os.path.basename(flight_folder)
+        output_folder = os.path.join(args.output, test_user)
+        FilePath(output_folder).mkdir(parents=True, exist_ok=True)
+
+        samples, elapsed, max_d_diff = replay_flight(log_filename, corrector, path,
+                                                     os.path.join(output_folder, flight_name + '.csv'),
+                                                     args.chunk_size)
+        total_samples += samples
+        total_elapsed += elapsed
+        print("{}/{}: {} samples, {:.0f} samples/s, max |d - logged d| = {:.2e}".format(
+            test_user, flight_name, samples, samples / elapsed if elapsed > 0 else 0, max_d_diff))
+
+    if total_elapsed > 0:
+        print("\nTotal: {} samples in {:.3f} s, {:.0f} samples/s".format(
+            total_samples, total_elapsed, total_samples / total_elapsed))
@@ -11,6 +11,8 @@ VUT FIT 2022
 
 from __future__ import print_function
 
+import time
+
 import pygame_gui
 
 from pygame.locals import *
@@ -19,13 +21,29 @@ from pygame_gui.windows import UIFileDialog
 
 from AirSimDroneModel import *
 from Corrector import *
+from CorrectorRenderer import CorrectorRenderer
+from DistanceField import DistanceField
+from FixedRateScheduler import FixedRateScheduler
 from Logger import *
 from Path import *
+from Profiler import Profiler
 
 if __name__ == "__main__":
     enable_assistant = False
     enable_video = False
     VISUALISER = False
+    DISTANCE_FIELD = False
+    PROFILER = False
+    # Drone state is fetched by a background thread, the control loop does not wait for the simulator.
+    TELEMETRY_THREAD = True
+    # Camera frames are fetched by a background thread, the GUI draws the latest one.
+    VIDEO_THREAD = True
+    # Flight log is saved also as binary columns (log/ folder) with details of the flight.
+    BINARY_LOG = True
+
+    # Rates of the control pipeline and of the rendering in Hz.
+    CONTROL_RATE = 50
+    RENDER_RATE = 60
 
     pygame.init()
     pygame.joystick.init()
@@ -74,36 +92,125 @@ if __name__ == "__main__":
     # Create and connect drone.
     drone = AirSimDroneModel(dis, transformer)
     drone.connect()
+    if TELEMETRY_THREAD:
+        drone.start_telemetry()
 
     # Update center of transformations by drones home position.
     transformer = drone.transform
     center_latlon = transformer.center_latlon
 
-    # Init corrector, path and logger.
-    corrector = Corrector(dis, transformer)
+    # Init corrector, path and logger. Corrector runs headless, its results are drawn by the renderer.
+    corrector = Corrector(None, transformer)
+    corrector_renderer = CorrectorRenderer(dis, transformer)
     path = Path(transformer)
     logger = Logger(corrector.free_range, corrector.warning_range)
+    # File of the loaded mission, stored in the header of the binary log.
+    mission_path = None
+
+    # Per-stage timing of the main loop, toggled by key T.
+    profiler = Profiler(enabled=PROFILER)
 
 
     def switch_logging():
         """ Enables and disables logging. Saves dhe logs."""
         if logger.is_logging is True:
-            logger.save(drone)
+            header = None
+            if BINARY_LOG:
+                header = {'mission': mission_path,
+                          'gains': {'gain_command': corrector.gain_command, 'gain_lc': corrector.gain_lc,
+                                    'gain_fc': corrector.gain_fc, 'correction_cubic': corrector.correction_cubic,
+                                    'future_time': corrector.future_time}}
+            logger.save(drone, header)
+            if profiler.enabled:
+                profiler.save(drone.log_folder + '/timing.csv')
+            control_scheduler.save(drone.log_folder + '/scheduler.json')
+            drone.client.save(drone.log_folder + '/rpc.json', drone.updates)
             logger.is_logging = False
             log_button.set_text("Logging OFF")
         else:
-            logger.is_logging = True
             log_button.set_text("Logging ON")
             now = datetime.now()
             dt_string = now.strftime("%d-%m-%Y_%H-%M-%S")
             drone.log_folder = "logs/" + dt_string
             os.mkdir(drone.log_folder)
             os.mkdir(drone.log_folder + "/photos")
-
-    getTicksLastFrame = 0
-
+            logger.start_logging(drone.log_folder)
+
+    # Control pipeline runs at fixed rate, rendering independently at the display rate.
+    # Control steps missed during a slow render are dropped (and counted), not run back to back
+    # with the same stale joystick input.
+    control_scheduler = FixedRateScheduler(CONTROL_RATE, max_catch_up=1)
+    render_scheduler = FixedRateScheduler(RENDER_RATE, max_catch_up=1)
+    original_command = command = [0, 0, 0, 0]
+    # Time of the previous control step, lifetime of the velocity command is derived from it.
+    last_control_time = None
+
+    profiler.begin_frame()
     while not app_over:
-        time_delta = clock.tick(60) / 1000.0
+        FixedRateScheduler.wait(control_scheduler, render_scheduler)
+        profiler.mark('wait')
+
+        """ CONTROL PHASE """
+        for _ in range(control_scheduler.due()):
+            control_scheduler.tick()
+            # Real time from the previous step, longer than the period after dropped steps.
+            now = time.perf_counter()
+            control_delta = control_scheduler.period
+            if last_control_time is not None:
+                control_delta = max(now - last_control_time, control_delta)
+            last_control_time = now
+
+            """ UPDATE PHASE """
+            drone.update()
+            profiler.mark('drone.update')
+
+            # Get pilot command.
+            left_right, fwd_back, up_down, yaw = drone.map_joystick_to_speed(joystick)
+
+            """ ROTATION """
+            left_right, fwd_back = drone.rotate_command_by_yaw([left_right, fwd_back])
+            original_command = [left_right, fwd_back, up_down, yaw]
+
+            """ CORRECTOR PHASE """
+
+            command_speed = np.array([left_right, fwd_back, up_down])
+
+            velocity = drone.speed
+            location = drone.position
+
+            profiler.mark('command')
+
+            # Compute block.
+            if len(path.waypoints) > 1:
+                save_command_speed = corrector.adjust_command(location, velocity, command_speed, path)
+                save_command_speed = np.array([save_command_speed[0], save_command_speed[1], save_command_speed[2]])
+                profiler.mark('corrector')
+            else:
+                save_command_speed = command_speed
+
+            """ SEND COMMAND """
+            if not enable_assistant:
+                left_right, fwd_back, up_down, yaw = original_command
+            else:
+                _, _, _, yaw = original_command
+                left_right, fwd_back, up_down = map_vec3_to_int_list(save_command_speed)
+
+            command = left_right, fwd_back, up_down, yaw
+
+            # Send command to drone.
+            drone.move(command, control_delta)
+            profiler.mark('drone.move')
+
+            # Logging.
+            logger.log(drone, corrector)
+            profiler.mark('logger')
+
+        """ RENDER PHASE """
+        if not render_scheduler.due():
+            continue
+        render_scheduler.tick()
+
+        time_delta = clock.tick() / 1000.0
         dis.fill((255, 255, 255))
 
         # Get mouse position.
@@ -135,15 +242,19 @@ if __name__ == "__main__":
                     transformer = Transformer(dis_width, dis_height, zoom, center_latlon)
                     drone.transform = transformer
                     corrector.transform = transformer
+                    corrector_renderer.transform = transformer
                     path.transformer = transformer
                     for wp in path.waypoints:
                         wp.transformer = transformer
                     carrot.transform = transformer
+                elif event.key == pygame.K_t:
+                    profiler.set_enabled(not profiler.enabled)
                 elif event.key == pygame.K_m:
                     zoom *= 0.8
                     transformer = Transformer(dis_width, dis_height, zoom, center_latlon)
                     drone.transform = transformer
                     corrector.transform = transformer
+                    corrector_renderer.transform = transformer
                     path.transformer = transformer
                     for wp in path.waypoints:
                         wp.transformer = transformer
@@ -176,6 +287,11 @@ if __name__ == "__main__":
 
                 if event.button == 6:  # OO
                     enable_video = not enable_video
+                    if VIDEO_THREAD:
+                        if enable_video:
+                            drone.start_video()
+                        else:
+                            drone.stop_video()
 
                 if event.button == 7:  # ==
                     switch_logging()
@@ -201,7 +317,7 @@ if __name__ == "__main__":
             elif event.type == pygame.MOUSEWHEEL:
                 # Change waypoint height.
                 if path.selected_wp is not None:
-                    path.selected_wp.metres_z += event.y/10
+                    path.change_waypoint_height(path.selected_index, event.y/10)
                 else:
                     path.actual_height += event.y/10
 
@@ -244,10 +360,14 @@ if __name__ == "__main__":
                     center_latlon = data[0]["transformer.center_latlon"]
                     transformer = Transformer(width, height, zoom, center_latlon)
                     path.load_path_json(data)
+                    mission_path = image_path
                     drone.transform = transformer
                     corrector.transform = transformer
+                    corrector_renderer.transform = transformer
                     path.transformer = transformer
                     carrot.transform = transformer
+                    if DISTANCE_FIELD:
+                        corrector.use_distance_field(DistanceField.for_mission(image_path, path), path)
 
 
                 except pygame.error:
@@ -259,79 +379,67 @@ if __name__ == "__main__":
                 file_dialog = None
 
             manager.process_events(event)
+        profiler.mark('events')
 
         manager.update(time_delta)
         text(dis, str(int(clock.get_fps())) + ' FPS', 30, [200, 700])
+        text(dis, "control: {} Hz, missed: {}".format(CONTROL_RATE, control_scheduler.missed_deadlines),
+             25, [200, 730])
+        # Live zone compliance of the logged flight.
+        if logger.is_logging:
+            flight_stats = logger.statistics
+            text(dis, "free zone: {:.1f} %, left {}   warning zone: {:.1f} %, left {}".format(
+                flight_stats.free_zone.time_in_percent(), flight_stats.free_zone.left_count,
+                flight_stats.warning_zone.time_in_percent(), flight_stats.warning_zone.left_count), 20, [200, 755])
         path.update(mouse)
         path.display(surface=dis)
 
-        t = pygame.time.get_ticks()
-        deltaTime = (t - getTicksLastFrame) / 1000.0  # deltaTime in seconds.
-        getTicksLastFrame = t
-
-        """ UPDATE PHASE """
-        drone.update()
+        profiler.mark('gui')
 
         # Draws squares.
         visualise_metrics(dis, dis_width, dis_height, zoom)
 
         visualise_joystick(dis, [600, 700], 50, joystick)
 
-        # Get pilot command.
-        left_right, fwd_back, up_down, yaw = drone.map_joystick_to_speed(joystick)
-
-        """ ROTATION """
-        left_right, fwd_back = drone.rotate_command_by_yaw([left_right, fwd_back])
-        original_command = [left_right, fwd_back, up_down, yaw]
-
-        """ CORRECTOR PHASE """
-
-        command_speed = np.array([left_right, fwd_back, up_down])
-
-        velocity = drone.speed
-        location = drone.position
-
-        # Compute block.
-        if len(path.waypoints) > 1:
-            save_command_speed = corrector.adjust_command(location, velocity, command_speed, path)
-            save_command_speed = np.array([save_command_speed[0], save_command_speed[1], save_command_speed[2]])
-        else:
-            save_command_speed = command_speed
-
-        """ SEND COMMAND """
-        if not enable_assistant:
-            left_right, fwd_back, up_down, yaw = original_command
-        else:
-            _, _, _, yaw = original_command
-            left_right, fwd_back, up_down = map_vec3_to_int_list(save_command_speed)
-
-        command = left_right, fwd_back, up_down, yaw
+        if len(path.waypoints) > 1 and corrector.visualisation is not None:
+            corrector_renderer.draw(corrector.visualisation, path)
+            profiler.mark('corrector.draw')
 
         text(dis, "original_command :" + str(trunc(np.array(original_command))), 25, (450, 175))
         text(dis, "safe_command :" + str(trunc(np.array(command))), 25, (450, 200))
 
-        # Send command to drone.
-        drone.move(command, deltaTime)
-
         drone.display()
 
         # Displays path in AirSim.
         if VISUALISER:
             drone.plot_to_airsim(path, mouse)
-
-        # Logging.
-        logger.log(drone, corrector)
+        profiler.mark('airsim.plot')
 
         # Video to the GUI.
         if enable_video:
             drone.display_video()
+            if drone.video is not None:
+                text(dis, "video: {:.1f} FPS, dropped {}".format(drone.video.fps(), drone.video.dropped), 20,
+                     (10, 330))
+        profiler.mark('video')
 
-        clock.tick(60)
-
+        profiler.draw(dis, (560, 240))
         manager.draw_ui(dis)
         pygame.display.update()
-
-
+        profiler.mark('display')
+        profiler.end_frame()
+        profiler.begin_frame()
+
+    if drone.telemetry is not None:
+        if drone.telemetry.connection is not None:
+            drone.telemetry.connection.print_report(drone.telemetry.sequence)
+        drone.stop_telemetry()
+    drone.stop_video()
+    drone.stop_photos()
+    # Flight logged until the exit is saved as when logging is switched off (log, binary log and summary).
+    if logger.is_logging:
+        switch_logging()
+    drone.client.print_report(drone.updates)
     pygame.quit()
     quit()
     sys.exit()
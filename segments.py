@@ -0,0 +1,170 @@
+"""
+Precomputed geometry of path segments for nearest point queries on arrays.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+
+import numpy as np
+
+
+class SegmentGeometry:
+    """
+    Segments of the path with direction, length and inverse squared length computed once.
+
+    Queries accept np arrays and return np arrays, no tuples are built per segment.
+    Results are the same as ``distances.pnt2line`` over the segments, which stays
+    as the reference implementation.
+    """
+
+    def __init__(self, starts, ends):
+        """
+        :param starts: np array (N, 3) of start points of the segments
+        :param ends: np array (N, 3) of end points of the segments
+
+        """
+        self.starts = np.array(starts, dtype=float).reshape(-1, 3)
+        self.ends = np.array(ends, dtype=float).reshape(-1, 3)
+        self.direction = np.empty((0, 3))
+        self.length = np.empty(0)
+        self.inv_len_sq = np.empty(0)
+        self.compute(slice(None))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def compute(self, ids):
+        """
+        Computes direction, length and inverse squared length of the segments.
+
+        :param ids: slice or np array of segment indexes
+
+        """
+        if isinstance(ids, slice) and ids == slice(None):
+            self.direction = self.ends - self.starts
+            self.length = np.empty(len(self.starts))
+            self.inv_len_sq = np.empty(len(self.starts))
+        self.direction[ids] = self.ends[ids] - self.starts[ids]
+        len_sq = np.einsum('ij,ij->i', self.direction[ids], self.direction[ids])
+        self.length[ids] = np.sqrt(len_sq)
+
+        # Zero-length segments are reduced to their start point.
+        self.inv_len_sq[ids] = np.divide(1.0, len_sq, out=np.zeros_like(len_sq), where=len_sq > 0)
+
+    def update(self, ids, starts, ends):
+        """
+        Moves some of the segments in place.
+
+        :param ids: np array of segment indexes
+        :param starts: np array (M, 3) of new start points
+        :param ends: np array (M, 3) of new end points
+
+        """
+        ids = np.asarray(ids, dtype=int)
+        self.starts[ids] = starts
+        self.ends[ids] = ends
+        self.compute(ids)
+
+    def nearest_all(self, pnt, ids=slice(None)):
+        """
+        Gets the nearest points of the segments to the free point.
+
+        Returns np array of squared distances and np array of the nearest points,
+        one row per selected segment.
+
+        :param pnt: free point [x, y, z]
+        :param ids: slice or np array of segment indexes (Default value = all segments)
+
+        """
+        pnt = np.asarray(pnt, dtype=float)
+        starts = self.starts[ids]
+        line_vec = self.direction[ids]
+        t = np.einsum('ij,ij->i', line_vec, pnt - starts) * self.inv_len_sq[ids]
+        np.clip(t, 0.0, 1.0, out=t)
+
+        nearest = starts + line_vec * t[:, None]
+        at_end = t == 1.0
+        nearest[at_end] = self.ends[ids][at_end]
+        diff = nearest - pnt
+        return np.einsum('ij,ij->i', diff, diff), nearest
+
+    def nearest(self, pnt, ids=slice(None)):
+        """
+        Gets the nearest point of the selected segments.
+
+        Returns the shortest distance, the nearest point and the index of the nearest
+        segment in the whole path. On ties the first segment wins.
+
+        :param pnt: free point [x, y, z]
+        :param ids: slice or np array of segment indexes (Default value = all segments)
+
+        """
+        dist_sq, nearest = self.nearest_all(pnt, ids)
+        i = int(np.argmin(dist_sq))
+        return math.sqrt(dist_sq[i]), nearest[i], self.global_index(ids, i)
+
+    def nearest_batch(self, pnts, ids=slice(None), max_elements=1 << 20):
+        """
+        Gets the nearest points of the selected segments for many free points at once.
+
+        Returns np arrays of the shortest distances (M,), the nearest points (M, 3)
+        and the indexes of the nearest segments (M,). Points are processed in chunks
+        so that at most ``max_elements`` point-segment pairs are held in memory.
+
+        :param pnts: np array (M, 3) of free points
+        :param ids: slice or np array of segment indexes (Default value = all segments)
+        :param max_elements: int (Default value = 1 << 20)
+
+        """
+        pnts = np.asarray(pnts, dtype=float).reshape(-1, 3)
+        starts = self.starts[ids]
+        ends = self.ends[ids]
+        line_vec = self.direction[ids]
+        inv_len_sq = self.inv_len_sq[ids]
+
+        dist = np.empty(len(pnts))
+        nearest = np.empty((len(pnts), 3))
+        index = np.empty(len(pnts), dtype=int)
+        chunk = max(1, max_elements // max(len(starts), 1))
+        for first in range(0, len(pnts), chunk):
+            p = pnts[first:first + chunk]
+            t = np.einsum('jk,ijk->ij', line_vec, p[:, None, :] - starts[None, :, :]) * inv_len_sq
+            np.clip(t, 0.0, 1.0, out=t)
+
+            points = starts[None, :, :] + line_vec[None, :, :] * t[:, :, None]
+            at_end = t == 1.0
+            points[at_end] = np.broadcast_to(ends, points.shape)[at_end]
+            diff = points - p[:, None, :]
+            dist_sq = np.einsum('ijk,ijk->ij', diff, diff)
+
+            i = np.argmin(dist_sq, axis=1)
+            rows = np.arange(len(p))
+            dist[first:first + chunk] = np.sqrt(dist_sq[rows, i])
+            nearest[first:first + chunk] = points[rows, i]
+            index[first:first + chunk] = self.global_index(ids, i)
+        return dist, nearest, index
+
+    def regions(self, pnts, ids):
+        """
+        Gets where the nearest points lie on the segments: 0 start, 1 inside, 2 end.
+
+        :param pnts: np array (M, 3) of free points
+        :param ids: np array (M,) of segment index for every point
+
+        """
+        t = np.einsum('ij,ij->i', self.direction[ids], pnts - self.starts[ids]) * self.inv_len_sq[ids]
+        return np.where(t <= 0, 0, np.where(t >= 1, 2, 1))
+
+    def global_index(self, ids, index):
+        """
+        Converts index into the selected segments to index in the whole path.
+
+        :param ids: slice or np array of segment indexes
+        :param index: int or np array of indexes into the selection
+
+        """
+        if isinstance(ids, slice):
+            return index * (ids.step or 1) + (ids.start or 0)
+        return np.asarray(ids)[index] if np.ndim(index) else int(np.asarray(ids)[index])
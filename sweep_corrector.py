@@ -0,0 +1,247 @@
+"""
+Script for tuning parameters of the corrector on the recorded flights.
+
+Grid or random search of the parameters is spread across a process pool. Every worker
+loads the flight logs and the mission once and then simulates all flights for each trial:
+the logged pilot commands are corrected and a first-order velocity model of the drone
+follows the safe commands (closed loop), or the logged trajectories are just re-scored
+(open loop). Flights are summarised by ``Logger.compute_summary`` and all trials
+are ranked in one table.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import argparse
+import functools
+import glob
+import itertools
+import multiprocessing
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from Corrector import adjust_commands_batch
+from Logger import Logger
+from replay_flights import INPUT_FIELDS, load_mission
+from SimulatedDroneModel import velocity_response_step
+
+# Values of the grid search.
+GRID = {
+    'gain_command': [1],
+    'gain_lc': [0.5, 1, 2],
+    'gain_fc': [2, 5, 8],
+    'future_time': [1, 2, 3],
+    'free_range': [1],
+    'warning_range': [2],
+    'cubic_center': [2],
+    'cubic_divisor': [5, 10],
+    'cubic_offset': [0.5],
+}
+
+# Ranges of the random search.
+RANGES = {
+    'gain_command': (0.5, 1.5),
+    'gain_lc': (0, 3),
+    'gain_fc': (0, 10),
+    'future_time': (0.5, 4),
+    'free_range': (0.5, 1.5),
+    'warning_range': (2, 2),
+    'cubic_center': (1, 3),
+    'cubic_divisor': (2, 20),
+    'cubic_offset': (0, 1),
+}
+
+# Flights and path segments loaded once in every worker.
+_flights = None
+_segments = None
+
+
+def load_flights(log_filenames):
+    """
+    Loads flight logs to padded np arrays.
+
+    Flights shorter than the longest one repeat their last time, so their time step is zero.
+
+    :param log_filenames: list of paths to the log.csv files
+
+    """
+    logs = [pd.read_csv(f, skipinitialspace=True, usecols=INPUT_FIELDS) for f in log_filenames]
+    length = max(len(df) for df in logs)
+
+    def padded(df, columns):
+        values = df[columns].to_numpy(dtype=float)
+        return np.concatenate((values, np.repeat(values[-1:], length - len(values), axis=0)))
+
+    return {
+        'names': log_filenames,
+        'lengths': np.array([len(df) for df in logs]),
+        'times': np.stack([padded(df, ['fly_time_s'])[:, 0] for df in logs]),
+        'locations': np.stack([padded(df, ['x', 'y', 'z']) for df in logs]),
+        'velocities': np.stack([padded(df, ['vx', 'vy', 'vz']) for df in logs]),
+        'commands': np.stack([padded(df, ['cx', 'cy', 'cz']) for df in logs]),
+    }
+
+
+def init_worker(log_filenames, mission_filename):
+    """
+    Loads the flights and the mission once per worker process.
+
+    :param log_filenames: list of paths to the log.csv files
+    :param mission_filename: path to the mission json
+
+    """
+    global _flights, _segments
+    _flights = load_flights(log_filenames)
+    path, _ = load_mission(mission_filename)
+    starts, ends = path.get_segment_arrays()
+    _segments = (starts.copy(), ends.copy())
+
+
+def corrector_params(trial):
+    """
+    Gets keyword arguments of ``adjust_commands_batch`` from the trial.
+
+    :param trial: dict of parameters
+
+    """
+    return {
+        'gain_command': trial['gain_command'],
+        'gain_lc': trial['gain_lc'],
+        'gain_fc': trial['gain_fc'],
+        'free_range': trial['free_range'],
+        'correction_cubic': (trial['cubic_center'], trial['cubic_divisor'], trial['cubic_offset']),
+        'future_time': trial['future_time'],
+    }
+
+
+def simulate_flights(flights, segments, params, closed_loop=True, response_time=0.8, max_speed=10,
+                     integer_commands=True):
+    """
+    Simulates all flights at once, one vectorized corrector call per time step.
+
+    Returns np arrays (F, T) of distances from the path and of deviations of the safe
+    commands from the pilot commands.
+
+    :param flights: dict from ``load_flights``
+    :param segments: tuple of np arrays (N, 3) of segment starts and ends
+    :param params: keyword arguments of ``adjust_commands_batch``
+    :param closed_loop: drone follows safe commands, otherwise logged trajectory is used (Default value = True)
+    :param response_time: time constant of the velocity response in seconds (Default value = 0.8)
+    :param max_speed: safe commands are limited to this speed in m/s (Default value = 10)
+    :param integer_commands: safe commands are truncated to ints as sent by the app (Default value = True)
+
+    """
+    times, commands = flights['times'], flights['commands']
+    if not closed_loop:
+        # Logged trajectories, all samples in one call.
+        count, length = times.shape
+        safe_commands, _, dist, _, _, _ = adjust_commands_batch(
+            flights['locations'].reshape(-1, 3), flights['velocities'].reshape(-1, 3),
+            commands.reshape(-1, 3), segments, **params)
+        deviation = np.linalg.norm(safe_commands - commands.reshape(-1, 3), axis=1)
+        return dist.reshape(count, length), deviation.reshape(count, length)
+
+    locations = flights['locations'][:, 0].copy()
+    velocities = flights['velocities'][:, 0].copy()
+    dist = np.zeros(times.shape)
+    deviation = np.zeros(times.shape)
+    dt = np.diff(times, axis=1, append=times[:, -1:])
+    for k in range(times.shape[1]):
+        safe_commands, _, dist[:, k], _, _, _ = adjust_commands_batch(
+            locations, velocities, commands[:, k], segments, **params)
+        deviation[:, k] = np.linalg.norm(safe_commands - commands[:, k], axis=1)
+
+        # First-order response of the velocity to the command.
+        sent = np.trunc(safe_commands) if integer_commands else safe_commands
+        speed = np.linalg.norm(sent, axis=1)
+        sent *= np.minimum(1, max_speed / np.maximum(speed, 1e-9))[:, None]
+        velocity_response_step(locations, velocities, sent, dt[:, k], response_time)
+    return dist, deviation
+
+
+def run_trial(trial, closed_loop=True):
+    """
+    Simulates all flights of the worker with one set of parameters and summarises them.
+
+    :param trial: dict of parameters
+    :param closed_loop: see ``simulate_flights`` (Default value = True)
+
+    """
+    start = time.perf_counter()
+    dist, deviation = simulate_flights(_flights, _segments, corrector_params(trial), closed_loop)
+
+    summaries = []
+    for i, length in enumerate(_flights['lengths']):
+        summaries.append(Logger.compute_summary(dist[i, :length].tolist(), _flights['times'][i, :length].tolist(),
+                                                trial['free_range'], trial['warning_range']))
+
+    result = dict(trial)
+    result['% time_out_warning_zone'] = np.mean([s['% time_out_warning_zone'] for s in summaries])
+    result['time_out_warning_zone'] = sum(s['time_out_warning_zone'] for s in summaries)
+    result['warning_zone_left_count'] = sum(s['warning_zone_left_count'] for s in summaries)
+    result['free_zone_left_count'] = sum(s['free_zone_left_count'] for s in summaries)
+    result['mean_d'] = np.mean([s['mean_d'] for s in summaries])
+    result['mean_dw'] = np.mean([s['mean_dw'] for s in summaries])
+    result['maximum_d'] = max(s['maximum_d'] for s in summaries)
+    result['mean_command_deviation'] = float(np.mean(np.concatenate(
+        [deviation[i, :length] for i, length in enumerate(_flights['lengths'])])))
+    result['trial_time_s'] = time.perf_counter() - start
+    return result
+
+
+def grid_trials(grid):
+    """
+    Gets all combinations of the grid values.
+
+    :param grid: dict of lists of values
+
+    """
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def random_trials(ranges, count, seed=None):
+    """
+    Gets uniformly sampled parameters.
+
+    :param ranges: dict of (low, high) tuples
+    :param count: number of trials
+    :param seed: seed of the generator (Default value = None)
+
+    """
+    rng = np.random.default_rng(seed)
+    return [{k: float(rng.uniform(low, high)) for k, (low, high) in ranges.items()} for _ in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Sweeps parameters of the corrector on the recorded flights.')
+    parser.add_argument('--logs', default='logs/test_users/*/*/log.csv', help='glob of the flight logs')
+    parser.add_argument('--mission', default='missions/test1-14-04-2022_13-51-55.json', help='mission json')
+    parser.add_argument('--output', default='logs/test_users_results/sweep.csv', help='ranked table of the trials')
+    parser.add_argument('--random', type=int, default=0, help='number of random trials instead of the grid')
+    parser.add_argument('--seed', type=int, default=None, help='seed of the random search')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='number of processes')
+    parser.add_argument('--open-loop', action='store_true', help='re-score logged trajectories only')
+    parser.add_argument('--sort', default='% time_out_warning_zone', help='column used for ranking')
+    args = parser.parse_args()
+
+    log_filenames = sorted(glob.glob(args.logs))
+    trials = random_trials(RANGES, args.random, args.seed) if args.random > 0 else grid_trials(GRID)
+    print("{} trials, {} flights, {} workers".format(len(trials), len(log_filenames), args.workers))
+
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers, initializer=init_worker,
+                              initargs=(log_filenames, args.mission)) as pool:
+        results = []
+        for result in pool.imap_unordered(functools.partial(run_trial, closed_loop=not args.open_loop), trials):
+            results.append(result)
+            print("{}/{} {} = {:.3f}".format(len(results), len(trials), args.sort, result[args.sort]))
+    elapsed = time.perf_counter() - start
+
+    table = pd.DataFrame(results).sort_values([args.sort, 'mean_d']).reset_index(drop=True)
+    table.to_csv(args.output, index_label='rank')
+    print(table.head(10).to_string())
+    print("\n{} trials in {:.1f} s, {:.2f} trials/s".format(len(trials), elapsed, len(trials) / elapsed))
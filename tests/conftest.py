@@ -0,0 +1,11 @@
+"""
+Modules of the application are imported from the root folder of the repository.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
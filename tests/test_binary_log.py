@@ -0,0 +1,78 @@
+"""
+Round trip of the flight logs between log.csv and ``BinaryFlightLog``.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import glob
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from BinaryFlightLog import BinaryFlightLog, LOG_FOLDER
+from FlightRecorder import LOG_FIELDS
+from Logger import Logger
+from test_logger import flight_state
+
+LOGS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'logs', 'test_users', '*', '*', 'log.csv')))
+
+
+def read_csv(filename):
+    """
+    Reads log.csv with numbers parsed exactly as written.
+
+    :param filename: path to log.csv
+
+    """
+    return pd.read_csv(filename, skipinitialspace=True, usecols=LOG_FIELDS, float_precision='round_trip')
+
+
+@pytest.mark.parametrize('log_filename', LOGS[:3])
+def test_csv_round_trip(tmp_path, log_filename):
+    shutil.copy(log_filename, tmp_path / 'log.csv')
+    header = {'mission': 'mission.json', 'free_range': 1, 'warning_range': 2, 'gains': None}
+    BinaryFlightLog.from_csv(str(tmp_path / 'log.csv'), str(tmp_path / LOG_FOLDER), header)
+
+    log = BinaryFlightLog.load(str(tmp_path))
+    df = read_csv(log_filename)
+    assert isinstance(log, BinaryFlightLog)
+    assert len(log) == len(df)
+    assert log.header['mission'] == 'mission.json' and log.header['source'] == 'log.csv'
+    assert isinstance(log['d'], np.memmap)
+    for name in LOG_FIELDS:
+        if name in ('date', 'fly_time'):
+            assert list(log[name]) == df[name].astype(str).tolist()
+        else:
+            assert np.array_equal(log[name], df[name].to_numpy(dtype=np.float64)), name
+
+
+def test_load_falls_back_to_csv(tmp_path):
+    shutil.copy(LOGS[0], tmp_path / 'log.csv')
+    log = BinaryFlightLog.load(str(tmp_path), fields=['fly_time_s', 'd'])
+    assert isinstance(log, pd.DataFrame)
+    assert list(log.columns) == ['fly_time_s', 'd']
+
+
+def test_logger_binary_log_matches_csv(tmp_path):
+    rng = np.random.default_rng(22)
+    times = iter(np.arange(0, 100, 0.02))
+    logger = Logger(1, 2, clock=lambda: next(times))
+    logger.path = str(tmp_path)
+    logger.is_logging = True
+    for _ in range(500):
+        logger.log(*flight_state(rng))
+    logger.recorder.save_csv(str(tmp_path / 'log.csv'))
+    logger.save_binary({'mission': None, 'gains': None})
+
+    log = BinaryFlightLog.load(str(tmp_path))
+    df = read_csv(tmp_path / 'log.csv')
+    assert log.header['free_range'] == 1 and log.header['warning_range'] == 2
+    for name in LOG_FIELDS:
+        if name in ('date', 'fly_time'):
+            assert list(log[name]) == df[name].astype(str).tolist()
+        else:
+            assert np.array_equal(log[name], df[name].to_numpy(dtype=np.float64)), name
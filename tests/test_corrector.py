@@ -0,0 +1,126 @@
+"""
+Nearest points of ``Corrector`` compared with ``distances.pnt2line``, the reference implementation.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import numpy as np
+import pytest
+
+from Corrector import Corrector
+from DistanceField import DistanceField
+from Path import Path
+from Waypoint import Waypoint
+from test_segments import random_path, random_points, reference
+
+
+def make_path(starts, ends):
+    """
+    Creates path with waypoints at the given segments.
+
+    :param starts: np array (N, 3) of start points
+    :param ends: np array (N, 3) of end points
+
+    """
+    path = Path(None)
+    for x, y, z in np.vstack([starts, ends[-1:]]):
+        path.waypoints.append(Waypoint(None, 0, 0, x, y, z))
+    path.invalidate_segments()
+    return path
+
+
+@pytest.mark.parametrize('seed, segments, grid_threshold', [(11, 1, 1000), (12, 120, 1000), (13, 120, 10)])
+def test_nearest_point_matches_pnt2line(seed, segments, grid_threshold):
+    rng = np.random.default_rng(seed)
+    starts, ends = random_path(rng, segments)
+    path = make_path(starts, ends)
+    corrector = Corrector(None, None)
+    corrector.tracking = False
+    corrector.segment_grid_threshold = grid_threshold
+
+    for pnt in random_points(rng, starts, 60):
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        nearest, dist, segment = corrector.get_nearest_point(pnt, path)
+        assert dist == pytest.approx(ref_dist, abs=1e-9)
+        assert np.allclose(nearest, ref_nearest, atol=1e-9)
+        # Nearest point lies on the returned segment.
+        assert reference(nearest, segment[:1], segment[1:])[0] == pytest.approx(0, abs=1e-9)
+
+
+@pytest.mark.parametrize('grid_threshold', [1000, 10])
+def test_tracking_matches_exhaustive_search(grid_threshold):
+    rng = np.random.default_rng(14)
+    starts, ends = random_path(rng, 300)
+    path = make_path(starts, ends)
+    tracked, exhaustive = Corrector(None, None), Corrector(None, None)
+    exhaustive.tracking = False
+    tracked.segment_grid_threshold = exhaustive.segment_grid_threshold = grid_threshold
+
+    # Drone following the path, with jumps and a waypoint moved in flight.
+    location = starts[0].copy()
+    velocity = np.zeros(3)
+    for step in range(300):
+        target = ends[min(step // 2, len(ends) - 1)]
+        velocity = (target - location) * 0.3 + rng.normal(0, 0.3, 3)
+        location = location + velocity
+        if step % 83 == 0:
+            location = location + rng.normal(0, 15, 3)
+        if step == 150:
+            path.change_waypoint_height(step // 2, 4.0)
+
+        command = rng.normal(0, 1, 3)
+        safe = tracked.adjust_command(location, velocity, command, path)
+        assert np.allclose(safe, exhaustive.adjust_command(location, velocity, command, path), atol=1e-9)
+        assert tracked.nearest_point_dist == pytest.approx(exhaustive.nearest_point_dist, abs=1e-9)
+        assert np.allclose(tracked.future_nearest_point, exhaustive.future_nearest_point, atol=1e-9)
+    assert tracked.present_tracker.local_searches > 0
+
+
+@pytest.mark.parametrize('horizons', [None, np.linspace(0.25, 3, 6)])
+def test_batch_matches_adjust_command(horizons):
+    rng = np.random.default_rng(15)
+    starts, ends = random_path(rng, 50)
+    path = make_path(starts, ends)
+    corrector = Corrector(None, None)
+    corrector.future_horizons = horizons
+    corrector.future_weights = None if horizons is None else np.linspace(2, 1, len(horizons))
+
+    locations = random_points(rng, starts, 100)
+    velocities = rng.normal(0, 2, (100, 3))
+    commands = rng.normal(0, 1, (100, 3))
+    safe_commands, nearest_points, dist, gc_pow, gpc_pow, gfc_pow = corrector.adjust_commands(
+        locations, velocities, commands, path)
+
+    for i in range(len(locations)):
+        safe = corrector.adjust_command(locations[i], velocities[i], commands[i], path)
+        assert np.allclose(safe_commands[i], safe, atol=1e-9)
+        assert np.allclose(nearest_points[i], corrector.nearest_point, atol=1e-9)
+        assert dist[i] == pytest.approx(corrector.nearest_point_dist, abs=1e-9)
+        assert np.allclose(gc_pow[i], corrector.gain_command_power, atol=1e-9)
+        assert np.allclose(gpc_pow[i], corrector.gain_present_correction_power, atol=1e-9)
+        assert np.allclose(gfc_pow[i], corrector.gain_future_correction_power, atol=1e-9)
+
+
+@pytest.mark.parametrize('backend', ['scan', 'grid', 'field'])
+def test_horizons_match_on_every_backend(backend):
+    rng = np.random.default_rng(17)
+    starts, ends = random_path(rng, 40)
+    path = make_path(starts, ends)
+    corrector = Corrector(None, None)
+    corrector.future_horizons = np.linspace(0.25, 3, 8)
+    if backend == 'grid':
+        corrector.segment_grid_threshold = 10
+    elif backend == 'field':
+        corrector.use_distance_field(DistanceField(starts, ends, resolution=1.0, margin=8.0), path)
+
+    locations = random_points(rng, starts, 50)
+    velocities = rng.normal(0, 1.5, (50, 3))
+    commands = rng.normal(0, 1, (50, 3))
+    # Batch API always scans all segments exactly.
+    safe_commands = corrector.adjust_commands(locations, velocities, commands, path)[0]
+    # Field interpolates float32 offsets.
+    atol = 1e-4 if backend == 'field' else 1e-9
+    for i in range(len(locations)):
+        safe = corrector.adjust_command(locations[i], velocities[i], commands[i], path)
+        assert np.allclose(safe, safe_commands[i], atol=atol)
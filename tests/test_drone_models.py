@@ -0,0 +1,74 @@
+"""
+Optional hooks of the drone models and the kinematics of the simulated drone.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from SimulatedDroneModel import SimulatedDroneModel, velocity_response_step
+
+
+class FetchingDroneModel(SimulatedDroneModel):
+    """ Simulated drone which also implements the telemetry hook. """
+
+    def fetch_state(self, client):
+        return self.time
+
+
+@pytest.mark.parametrize('start, hook', [('start_telemetry', 'fetch_state'), ('start_video', 'fetch_frame'),
+                                         ('start_photos', 'fetch_photo')])
+def test_missing_hook_refuses_to_start(start, hook):
+    drone = SimulatedDroneModel(None, None)
+    assert not drone.implements(hook)
+    with pytest.raises(RuntimeError, match=hook):
+        getattr(drone, start)()
+    assert drone.telemetry is None and drone.video is None and drone.photos is None
+
+
+def test_implemented_hook_starts_thread():
+    drone = FetchingDroneModel(None, None, time_step=0.01)
+    assert drone.implements('fetch_state')
+    drone.start_telemetry()
+    try:
+        assert drone.telemetry.wait_ready(timeout=2.0)
+        assert drone.telemetry.error is None
+    finally:
+        drone.stop_telemetry()
+    assert drone.telemetry is None
+
+
+def test_simulated_velocity_follows_first_order_response():
+    drone = SimulatedDroneModel(None, None, time_step=0.01, response_time=0.5, takeoff_altitude=10)
+    drone.takeoff()
+    drone.move([2, -1, 0.5, 0], 0.01)
+    for _ in range(100):
+        drone.update()
+
+    expected = np.array([2, -1, 0.5]) * (1 - math.exp(-1.0 / 0.5))
+    assert drone.time == pytest.approx(1.0)
+    assert np.allclose(drone.speed, expected)
+
+
+def test_batch_step_matches_simulated_drones():
+    rng = np.random.default_rng(18)
+    commands = rng.normal(0, 3, (5, 3))
+    delta_times = rng.uniform(0.01, 0.05, 5)
+    drones = [SimulatedDroneModel(None, None, time_step=dt, response_time=0.8, takeoff_altitude=100)
+              for dt in delta_times]
+    positions, velocities = np.zeros((5, 3)), np.zeros((5, 3))
+    for drone, command in zip(drones, commands):
+        drone.reset(position=(0, 0, 100))
+        drone.move(list(command) + [0], 0)
+    positions[:, 2] = 100
+
+    for _ in range(50):
+        velocity_response_step(positions, velocities, commands, delta_times, 0.8)
+        for drone in drones:
+            drone.update()
+    assert np.allclose(positions, [drone.position for drone in drones])
+    assert np.allclose(velocities, [drone.speed for drone in drones])
@@ -0,0 +1,181 @@
+"""
+Recording of the flight log by ``Logger`` into ``FlightRecorder`` and streaming it by ``LogWriter``.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+import functools
+import threading
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from FlightRecorder import LOG_FIELDS
+from Logger import Logger
+
+
+def flight_state(rng, nearest=True):
+    """
+    Gets drone and corrector with random values of the attributes read by ``Logger.update``.
+
+    :param rng: np random generator
+    :param nearest: corrector has the nearest point (Default value = True)
+
+    """
+    drone = SimpleNamespace(position=rng.normal(size=3), speed=rng.normal(size=3),
+                            GPS=SimpleNamespace(latitude=49.2, longitude=16.6, altitude=230.0),
+                            pitch=0.1, roll=0.2, yaw=30.0)
+    corrector = SimpleNamespace(command=[1, 2, 0], safe_command=rng.normal(size=3),
+                                nearest_point=rng.normal(size=3) if nearest else None,
+                                gain_command_power=rng.normal(size=3),
+                                gain_present_correction_power=rng.normal(size=3),
+                                gain_future_correction_power=rng.normal(size=3))
+    return drone, corrector
+
+
+def test_frames_hold_drone_and_corrector_values():
+    rng = np.random.default_rng(19)
+    times = iter(np.arange(0, 100, 0.02))
+    logger = Logger(1, 2, clock=lambda: next(times))
+    logger.is_logging = True
+
+    states = [flight_state(rng, nearest=i % 4 != 3) for i in range(50)]
+    for drone, corrector in states:
+        logger.log(drone, corrector)
+    assert len(logger.recorder) == 50
+
+    column = logger.recorder.column
+    positions = np.array([drone.position for drone, _ in states])
+    speeds = np.array([drone.speed for drone, _ in states])
+    assert np.allclose(column('fly_time_s'), np.arange(1, 51) * 0.02)
+    assert np.array_equal(np.column_stack([column('x'), column('y'), column('z')]), positions)
+    assert np.array_equal(column('z_max'), np.maximum.accumulate(np.maximum(positions[:, 2], 0)))
+    assert np.array_equal(column('vy_max'), np.maximum.accumulate(np.maximum(speeds[:, 1], 0)))
+    assert np.array_equal(column('gfc_pow_z'), [c.gain_future_correction_power[2] for _, c in states])
+
+    # Without the nearest point the distance of the previous frame is kept.
+    for i, (drone, corrector) in enumerate(states):
+        j = i - 1 if corrector.nearest_point is None else i
+        nearest, position = states[j][1].nearest_point, states[j][0].position
+        assert column('d')[i] == pytest.approx(np.linalg.norm(nearest - position))
+        assert column('dx')[i] == nearest[0] - position[0]
+
+    row = logger.get_log_dict()
+    assert list(row) == LOG_FIELDS
+    assert row['scy'] == states[-1][1].safe_command[1]
+    assert row['latitude'] == 49.2
+
+
+def test_update_keeps_no_objects_per_frame():
+    rng = np.random.default_rng(20)
+    drone, corrector = flight_state(rng)
+    logger = Logger(1, 2)
+    # The first frame allocates the chunk.
+    logger.update(drone, corrector)
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    for _ in range(2000):
+        logger.update(drone, corrector)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert after - before < 2000
+
+
+def read_rows(filename):
+    """
+    Reads rows of the csv file.
+
+    :param filename: path to the csv file
+
+    """
+    with open(filename, newline='') as f:
+        return list(csv.reader(f))
+
+
+def start_flight(folder):
+    """
+    Starts logging to the folder with the simulated clock, returns the logger.
+
+    :param folder: folder of the log
+
+    """
+    times = iter(np.arange(0, 1000, 0.02))
+    logger = Logger(1, 2, clock=lambda: next(times))
+    logger.flush_records = 100
+    logger.start_logging(str(folder))
+    return logger
+
+
+def log_frames(logger, count, seed=21):
+    """
+    Logs frames with random values.
+
+    :param logger: object ``Logger``
+    :param count: number of frames
+    :param seed: seed of the values (Default value = 21)
+
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(count):
+        logger.log(*flight_state(rng))
+
+
+def test_log_is_streamed_while_flying(tmp_path):
+    logger = start_flight(tmp_path)
+    log_frames(logger, 1050)
+
+    # Batches of 100 frames reach the disk before logging stops.
+    deadline = time.monotonic() + 5
+    while logger.writer.written < 1000 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(read_rows(tmp_path / 'log.csv')) - 1 >= 1000
+    assert logger.writer.checkpoints > 10
+
+    logger.stop_logging()
+    logger.recorder.save_csv(str(tmp_path / 'at_once.csv'))
+    rows = read_rows(tmp_path / 'log.csv')
+    assert rows[0] == LOG_FIELDS
+    assert len(rows) == 1051
+    assert rows == read_rows(tmp_path / 'at_once.csv')
+    assert not (tmp_path / 'log_recovered.csv').exists()
+
+
+def test_failed_writer_log_is_saved_at_stop(tmp_path):
+    logger = start_flight(tmp_path)
+
+    def fail(row):
+        raise OSError('disk full')
+
+    logger.writer.writer = SimpleNamespace(writerow=fail)
+    log_frames(logger, 300)
+
+    start = time.monotonic()
+    logger.stop_logging()
+    assert time.monotonic() - start < 2
+    assert len(read_rows(tmp_path / 'log.csv')) == 301
+
+
+def test_stuck_writer_log_is_recovered(tmp_path):
+    logger = start_flight(tmp_path)
+    released = threading.Event()
+    writer = logger.writer.writer
+
+    def stuck(row):
+        released.wait(10)
+        writer.writerow(row)
+
+    logger.writer.writer = SimpleNamespace(writerow=stuck)
+    log_frames(logger, 300)
+    logger.writer.stop = functools.partial(logger.writer.stop, timeout=0.2)
+    logger.stop_logging()
+    released.set()
+
+    # log.csv is still held by the writer, the whole log is saved next to it.
+    rows = read_rows(tmp_path / 'log_recovered.csv')
+    assert rows[0] == LOG_FIELDS and len(rows) == 301
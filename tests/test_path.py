@@ -0,0 +1,98 @@
+"""
+Cached segments of the path compared with segments built again from the waypoints.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from replay_flights import load_mission
+from segments import SegmentGeometry
+
+MISSION = os.path.join(os.path.dirname(__file__), '..', 'missions', 'test1-14-04-2022_13-51-55.json')
+
+
+def rebuilt_segments(path):
+    """
+    Segments built from the waypoints without the cache.
+
+    :param path: object ``Path``
+
+    """
+    positions = np.array([wp.position_metres() for wp in path.waypoints])
+    return positions[:-1], positions[1:]
+
+
+def assert_cache_valid(path):
+    """
+    Checks cached arrays and geometry against the waypoints.
+
+    :param path: object ``Path``
+
+    """
+    starts, ends = path.get_segment_arrays()
+    ref_starts, ref_ends = rebuilt_segments(path)
+    assert np.array_equal(starts, ref_starts)
+    assert np.array_equal(ends, ref_ends)
+    geometry = path.get_segment_geometry()
+    fresh = SegmentGeometry(ref_starts, ref_ends)
+    assert np.allclose(geometry.direction, fresh.direction)
+    assert np.allclose(geometry.inv_len_sq, fresh.inv_len_sq)
+
+
+@pytest.fixture
+def path():
+    path, _ = load_mission(MISSION)
+    assert len(path.waypoints) > 3
+    assert_cache_valid(path)
+    return path
+
+
+def test_drag_updates_neighbour_segments(path):
+    i = len(path.waypoints) // 2
+    version = path.segments_version
+    path.selected_wp = path.waypoints[i]
+    path.selected_index = i
+    path.selected_wp_locked = True
+
+    x, y = path.waypoints[i].position_visual()
+    path.update([x + 40, y + 25])
+
+    assert path.get_changed_segments(version) == {i - 1, i}
+    assert_cache_valid(path)
+
+
+@pytest.mark.parametrize('where', ['first', 'last'])
+def test_height_change_of_end_waypoints(path, where):
+    i = 0 if where == 'first' else len(path.waypoints) - 1
+    version = path.segments_version
+    path.change_waypoint_height(i, 1.5)
+
+    assert path.get_changed_segments(version) == ({0} if i == 0 else {i - 1})
+    assert_cache_valid(path)
+
+
+def test_add_and_delete_rebuild_all_segments(path):
+    version = path.segments_version
+    path.add_waypoint_by_pixel([10, 20])
+    assert path.get_changed_segments(version) is None
+    assert_cache_valid(path)
+
+    path.delete_path()
+    starts, ends = path.get_segment_arrays()
+    assert starts.shape == (0, 3) and ends.shape == (0, 3)
+    assert path.selected_index is None
+
+
+def test_segments_are_read_only(path):
+    starts, ends = path.get_segment_arrays()
+    with pytest.raises(ValueError):
+        starts[0] = 0
+    start, end = path.get_segments()[0]
+    with pytest.raises(ValueError):
+        end += 1
+    assert_cache_valid(path)
@@ -0,0 +1,62 @@
+"""
+Draining and stopping of ``PhotoQueue`` with a stuck and a released camera.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import csv
+import threading
+import time
+
+import pytest
+
+from PhotoQueue import PhotoQueue
+
+POSE = {'x': 1, 'y': 2, 'z': 3, 'yaw': 0, 'pitch': 0, 'roll': 0, 'latitude': 0, 'longitude': 0, 'altitude': 0}
+
+
+@pytest.fixture
+def camera():
+    """ Fetch blocking until the camera is released. """
+    released = threading.Event()
+
+    def fetch(connection):
+        released.wait(10)
+        return b'png'
+
+    return released, fetch
+
+
+def test_drain_returns_at_deadline(tmp_path, camera):
+    released, fetch = camera
+    photos = PhotoQueue(lambda: 1, fetch, workers=2, capacity=8)
+    names = [photos.submit(str(tmp_path), POSE) for _ in range(5)]
+    assert None not in names and len(set(names)) == 5
+
+    start = time.monotonic()
+    assert photos.drain(0.2) == 5
+    assert time.monotonic() - start < 1.0
+
+    released.set()
+    assert photos.drain(5.0) == 0
+    assert photos.stop() == 0
+    assert not any(worker.is_alive() for worker in photos.workers)
+    with open(tmp_path / 'index.csv', newline='') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(row['name'] for row in rows) == sorted(names)
+    assert photos.saved == 5 and photos.failed == 0
+
+
+def test_stop_leaves_stuck_workers(tmp_path, camera):
+    released, fetch = camera
+    photos = PhotoQueue(lambda: 1, fetch, workers=1, capacity=2)
+    photos.submit(str(tmp_path), POSE)
+    photos.submit(str(tmp_path), POSE)
+    photos.submit(str(tmp_path), POSE)
+    assert photos.submitted + photos.dropped == 3
+
+    start = time.monotonic()
+    assert photos.stop(timeout=0.2) > 0
+    assert time.monotonic() - start < 1.0
+    released.set()
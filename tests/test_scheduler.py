@@ -0,0 +1,67 @@
+"""
+Catch-up and drift of ``FixedRateScheduler`` on a simulated clock.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import pytest
+
+import FixedRateScheduler as scheduler_module
+from FixedRateScheduler import FixedRateScheduler
+
+PERIOD_NS = 10000000
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """ Simulated ``time.perf_counter_ns`` of the scheduler, advanced by the test. """
+    clock = {'now': 10 ** 12}
+    monkeypatch.setattr(scheduler_module.time, 'perf_counter_ns', lambda: clock['now'])
+    return clock
+
+
+def run_due(scheduler):
+    """
+    Runs all due steps.
+
+    :param scheduler: object ``FixedRateScheduler``
+
+    """
+    steps = scheduler.due()
+    for _ in range(steps):
+        scheduler.tick()
+    return steps
+
+
+@pytest.mark.parametrize('max_catch_up, steps, missed', [(3, 3, 4), (1, 1, 4)])
+def test_catch_up_after_delay(clock, max_catch_up, steps, missed):
+    scheduler = FixedRateScheduler(100, max_catch_up=max_catch_up)
+    assert run_due(scheduler) == 1
+
+    # Loop stalls for five periods, the oldest steps are skipped.
+    clock['now'] += 5 * PERIOD_NS
+    assert run_due(scheduler) == steps
+    assert scheduler.skipped == 5 - steps
+    assert scheduler.missed_deadlines == missed
+    assert run_due(scheduler) == 0
+
+    # Schedule stays on the original time grid.
+    clock['now'] += PERIOD_NS
+    assert run_due(scheduler) == 1
+    assert scheduler.ticks == 2 + steps
+    assert scheduler.stats()['jitter_max_ms'] == pytest.approx((steps - 1) * PERIOD_NS / 1e6)
+
+
+def test_no_drift_when_late(clock):
+    scheduler = FixedRateScheduler(100)
+    start = clock['now']
+    run_due(scheduler)
+
+    # Step starts 3 ms late, the following one is still due at its original time.
+    clock['now'] = start + PERIOD_NS + 3000000
+    assert run_due(scheduler) == 1
+    clock['now'] = start + 2 * PERIOD_NS
+    assert run_due(scheduler) == 1
+    assert scheduler.missed_deadlines == 0
+    assert scheduler.stats()['jitter_max_ms'] == pytest.approx(3)
@@ -0,0 +1,165 @@
+"""
+Nearest point queries of the path compared with ``distances.pnt2line``, the reference implementation.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from DistanceField import DistanceField
+from distances import pnt2line
+from segments import SegmentGeometry
+from SegmentGrid import SegmentGrid
+from SegmentTracker import SegmentTracker
+
+
+def random_path(rng, segments):
+    """
+    Random walk of waypoints, returns np arrays (N, 3) of start and end points.
+
+    :param rng: np random generator
+    :param segments: number of segments
+
+    """
+    steps = rng.normal(0, 5, (segments, 3))
+    steps[:, 2] *= 0.2
+    waypoints = np.cumsum(np.vstack([np.zeros(3), steps]), axis=0)
+    return waypoints[:-1], waypoints[1:]
+
+
+def reference(pnt, starts, ends):
+    """
+    Shortest distance and nearest point by looping ``pnt2line`` over the segments.
+
+    :param pnt: free point [x, y, z]
+    :param starts: np array (N, 3) of start points
+    :param ends: np array (N, 3) of end points
+
+    """
+    results = [pnt2line(list(pnt), list(start), list(end)) for start, end in zip(starts, ends)]
+    return min(results, key=lambda result: result[0])
+
+
+def random_points(rng, starts, count):
+    """
+    Points around the path.
+
+    :param rng: np random generator
+    :param starts: np array (N, 3) of start points
+    :param count: number of points
+
+    """
+    return starts[rng.integers(len(starts), size=count)] + rng.normal(0, 3, (count, 3))
+
+
+@pytest.mark.parametrize('seed, segments', [(0, 1), (1, 7), (2, 60), (3, 400)])
+def test_geometry_matches_pnt2line(seed, segments):
+    rng = np.random.default_rng(seed)
+    starts, ends = random_path(rng, segments)
+    geometry = SegmentGeometry(starts, ends)
+    points = random_points(rng, starts, 50)
+
+    dist, nearest, index = geometry.nearest_batch(points)
+    for i, pnt in enumerate(points):
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        single_dist, single_nearest, single_index = geometry.nearest(pnt)
+        assert dist[i] == pytest.approx(ref_dist, abs=1e-9)
+        assert single_dist == pytest.approx(ref_dist, abs=1e-9)
+        assert np.allclose(nearest[i], ref_nearest, atol=1e-9)
+        assert np.allclose(single_nearest, ref_nearest, atol=1e-9)
+        assert index[i] == single_index
+
+
+@pytest.mark.parametrize('seed, segments', [(4, 30), (5, 1500)])
+def test_grid_matches_pnt2line(seed, segments):
+    rng = np.random.default_rng(seed)
+    starts, ends = random_path(rng, segments)
+    grid = SegmentGrid(starts, ends)
+    # Points near the path and far from it (outside of the searched cubes).
+    points = np.vstack([random_points(rng, starts, 40), rng.normal(0, 200, (10, 3))])
+
+    for pnt in points:
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        dist, nearest, _ = grid.query(pnt)
+        assert dist == pytest.approx(ref_dist, abs=1e-9)
+        assert np.allclose(nearest, ref_nearest, atol=1e-9)
+
+
+@pytest.mark.parametrize('seed, segments', [(7, 30), (8, 1500)])
+def test_grid_batch_matches_pnt2line(seed, segments):
+    rng = np.random.default_rng(seed)
+    starts, ends = random_path(rng, segments)
+    grid = SegmentGrid(starts, ends)
+    points = np.vstack([random_points(rng, starts, 40), rng.normal(0, 200, (10, 3))])
+
+    dist, nearest, index = grid.query_batch(points)
+    for i, pnt in enumerate(points):
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        assert dist[i] == pytest.approx(ref_dist, abs=1e-9)
+        assert np.allclose(nearest[i], ref_nearest, atol=1e-9)
+        assert dist[i] == pytest.approx(grid.query(pnt)[0], abs=1e-12)
+
+
+@pytest.mark.parametrize('seed, segments', [(9, 10), (10, 80)])
+def test_distance_field_matches_pnt2line(seed, segments):
+    rng = np.random.default_rng(seed)
+    starts, ends = random_path(rng, segments)
+    field = DistanceField(starts, ends, resolution=1.0, margin=3.0)
+    # Points inside of the field and outside of it.
+    points = np.vstack([random_points(rng, starts, 200), rng.normal(0, 100, (10, 3))])
+
+    # Field stores float32 offsets, interpolation is exact up to their rounding.
+    dist, nearest, index = field.query_batch(points)
+    for i, pnt in enumerate(points):
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        single_dist, single_nearest, single_index = field.query(pnt)
+        assert dist[i] == pytest.approx(ref_dist, abs=1e-5)
+        assert np.allclose(nearest[i], ref_nearest, atol=1e-5)
+        assert dist[i] == pytest.approx(single_dist, abs=1e-5)
+        assert np.allclose(nearest[i], single_nearest, atol=1e-5)
+        assert index[i] == single_index
+
+
+def test_distance_field_cache_checks_parameters(tmp_path):
+    rng = np.random.default_rng(16)
+    starts, ends = random_path(rng, 20)
+    path = SimpleNamespace(get_segment_arrays=lambda: (starts, ends))
+    mission = str(tmp_path / 'mission.json')
+
+    field = DistanceField.for_mission(mission, path, resolution=1.0, margin=2.0)
+    assert DistanceField.load(DistanceField.cache_filename(mission)).matches(starts, ends, 1.0, 2.0)
+    assert DistanceField.for_mission(mission, path, resolution=1.0, margin=2.0).resolution == field.resolution
+
+    # Other parameters bake a new field and replace the cache.
+    finer = DistanceField.for_mission(mission, path, resolution=0.5, margin=2.0)
+    assert finer.resolution == 0.5
+    assert not field.matches(starts, ends, 0.5, 2.0)
+    assert DistanceField.load(DistanceField.cache_filename(mission)).matches(starts, ends, 0.5, 2.0)
+    assert not finer.matches(starts + 1, ends, 0.5, 2.0)
+
+
+@pytest.mark.parametrize('use_grid', [False, True])
+def test_tracker_matches_pnt2line(use_grid):
+    rng = np.random.default_rng(6)
+    starts, ends = random_path(rng, 200)
+    geometry = SegmentGeometry(starts, ends)
+    path = SimpleNamespace(get_segment_geometry=lambda: geometry, segments_version=0)
+    grid = SegmentGrid(starts, ends) if use_grid else None
+    tracker = SegmentTracker()
+
+    # Drone flying along the path with a drift, some jumps force the global search.
+    pnt = starts[0].copy()
+    for step in range(400):
+        target = ends[min(step // 2, len(ends) - 1)]
+        pnt = pnt + (target - pnt) * 0.3 + rng.normal(0, 0.3, 3)
+        if step % 97 == 0:
+            pnt = pnt + rng.normal(0, 20, 3)
+        ref_dist, ref_nearest = reference(pnt, starts, ends)
+        dist, nearest, _ = tracker.query(pnt, path, grid)
+        assert dist == pytest.approx(ref_dist, abs=1e-9)
+        assert np.allclose(nearest, ref_nearest, atol=1e-9)
+    assert tracker.local_searches > 0
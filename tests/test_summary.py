@@ -0,0 +1,144 @@
+"""
+Summary of the flight by ``Logger.compute_summary`` against the per-sample loop it replaced
+and against ``FlightStatistics`` kept while flying.
+
+Adam Ferencz
+VUT FIT 2022
+"""
+
+import glob
+import os
+import statistics
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from FlightStatistics import FlightStatistics, make_summary
+from Logger import Logger
+from test_logger import flight_state
+
+LOGS = sorted(glob.glob(os.path.join(os.path.dirname(__file__), '..', 'logs', 'test_users', '*', '*', 'log.csv')))
+FREE_RANGE, WARNING_RANGE = 1, 2
+
+
+def read_flight(filename):
+    """
+    Reads distances and times of the flight with the path data from log.csv.
+
+    :param filename: path to log.csv
+
+    """
+    df = pd.read_csv(filename, skipinitialspace=True, usecols=['fly_time_s', 'd'], float_precision='round_trip')
+    return df['d'].tolist(), df['fly_time_s'].tolist()
+
+
+FLIGHTS = [flight for flight in map(read_flight, LOGS) if sum(flight[0]) != 0][:4]
+
+
+def reference_statistics(values):
+    """
+    Statistics of the values computed one by one.
+
+    :param values: list of values
+
+    """
+    return (min(values), max(values), sum(values) / len(values), statistics.variance(values),
+            statistics.stdev(values))
+
+
+def reference_zone(d, fly_time_s, zone_range):
+    """
+    Time in and out of the zone, number of leaving and durations out of the zone computed sample by sample.
+
+    :param d: list of distances from the path
+    :param fly_time_s: list of times of the samples
+    :param zone_range: edge of the zone
+
+    """
+    is_in_zone = True
+    time_in, time_out, left_count, time_out_list = 0, 0, 0, [0]
+    prev_fly_time_s = fly_time_s[0]
+    for distance, curr_fly_time_s in zip(d, fly_time_s):
+        delta_time = curr_fly_time_s - prev_fly_time_s
+        if distance < zone_range:
+            is_in_zone = True
+            time_in += delta_time
+        else:
+            if is_in_zone:
+                left_count += 1
+                time_out_list.append(0)
+                is_in_zone = False
+            time_out += delta_time
+            time_out_list[left_count - 1] += delta_time
+        prev_fly_time_s = curr_fly_time_s
+    return time_in, time_out, left_count, time_out_list
+
+
+def reference_summary(d, fly_time_s):
+    """
+    Summary of the flight computed sample by sample.
+
+    :param d: list of distances from the path
+    :param fly_time_s: list of times of the samples
+
+    """
+    free_zone = reference_zone(d, fly_time_s, FREE_RANGE)
+    time_in, time_out, left_count, time_out_list = reference_zone(d, fly_time_s, WARNING_RANGE)
+    warning_zone = (time_in, time_out, left_count, [i for i in time_out_list if i != 0])
+    return make_summary(free_zone, warning_zone, reference_statistics(d),
+                        reference_statistics([max(i - FREE_RANGE, 0) for i in d]),
+                        reference_statistics([max(i - WARNING_RANGE, 0) for i in d]))
+
+
+def assert_summaries_match(summary, expected):
+    """
+    Asserts same keys and values up to the rounding of the sums.
+
+    :param summary: summary to check
+    :param expected: reference summary
+
+    """
+    assert list(summary) == list(expected)
+    for key, value in expected.items():
+        if isinstance(value, list):
+            assert summary[key] == pytest.approx(value, rel=1e-9, abs=1e-9), key
+        else:
+            assert summary[key] == pytest.approx(value, rel=1e-9, abs=1e-12), key
+
+
+@pytest.mark.parametrize('d, fly_time_s', FLIGHTS)
+def test_summary_matches_per_sample_loop(d, fly_time_s):
+    summary = Logger.compute_summary(d, fly_time_s, FREE_RANGE, WARNING_RANGE)
+    assert_summaries_match(summary, reference_summary(d, fly_time_s))
+
+
+def test_flight_without_leaving_zones():
+    d = [0.1, 0.5, 0.3, 0.9]
+    fly_time_s = [0, 0.5, 1.0, 1.5]
+    summary = Logger.compute_summary(d, fly_time_s, FREE_RANGE, WARNING_RANGE)
+    assert_summaries_match(summary, reference_summary(d, fly_time_s))
+    assert summary['time_out_free_zone_list'] == [0] and summary['time_out_warning_zone_list'] == []
+    assert summary['maximum_df'] == 0 and summary['variance_dw'] == 0
+
+
+@pytest.mark.parametrize('d, fly_time_s', FLIGHTS)
+def test_flight_statistics_match_summary_of_log(d, fly_time_s):
+    flight_stats = FlightStatistics(FREE_RANGE, WARNING_RANGE)
+    for distance, time_s in zip(d, fly_time_s):
+        flight_stats.update(distance, time_s)
+    assert flight_stats.has_path_data()
+    assert_summaries_match(flight_stats.summary(), Logger.compute_summary(d, fly_time_s, FREE_RANGE, WARNING_RANGE))
+
+
+def test_logger_statistics_match_summary_of_recorder():
+    rng = np.random.default_rng(25)
+    times = iter(np.arange(0, 100, 0.02))
+    logger = Logger(FREE_RANGE, WARNING_RANGE, clock=lambda: next(times))
+    logger.is_logging = True
+    for i in range(400):
+        logger.log(*flight_state(rng, nearest=i % 5 != 4))
+
+    d, fly_time_s = logger.recorder.column('d'), logger.recorder.column('fly_time_s')
+    assert_summaries_match(logger.statistics.summary(),
+                           Logger.compute_summary(d, fly_time_s, FREE_RANGE, WARNING_RANGE))